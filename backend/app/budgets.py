@@ -0,0 +1,166 @@
+"""
+Process-wide resource budgets shared by every scan in the process: DNS
+queries in flight (and optionally per second), HTTP requests in flight,
+browser tabs and nmap processes. When a budget is exhausted, the next free
+slot goes to the waiting scan that currently holds the fewest, so one
+large target cannot starve the others.
+"""
+import asyncio
+import os
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Hashable, Optional
+
+from .metrics import BUDGET_IN_USE, BUDGET_WAITING, register_collector
+from .ratelimit import RateLimiter
+
+_owner: ContextVar[Hashable] = ContextVar("recon_budget_owner", default=None)
+
+
+@contextmanager
+def budget_owner(owner: Hashable):
+    """
+    Charge budget slots taken in this context (and the tasks it starts) to
+    `owner`, e.g. a scan id.
+    """
+    token = _owner.set(owner)
+    try:
+        yield
+    finally:
+        _owner.reset(token)
+
+
+class FairSemaphore:
+    """
+    Counting semaphore whose waiters are grouped by owner. A released slot
+    is handed to the waiting owner holding the fewest slots (the earliest
+    waiter on ties), so concurrent scans converge on equal shares.
+    `rate` additionally caps acquisitions per second (see pace()).
+    """
+
+    def __init__(self, name: str, limit: int, rate: Optional[float] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self.held: Dict[Hashable, int] = {}
+        # owner -> its waiters; dict order is the round-robin order
+        self.waiters: Dict[Hashable, Deque[asyncio.Future]] = {}
+        self.limiter = RateLimiter(rate, burst=max(1, int(rate or 0) // 10))
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self.waiters.values())
+
+    def _grant(self, owner: Hashable):
+        self.in_use += 1
+        self.held[owner] = self.held.get(owner, 0) + 1
+
+    def _wake(self):
+        while self.waiters and self.in_use < self.limit:
+            owner = min(self.waiters, key=lambda o: self.held.get(o, 0))
+            queue = self.waiters.pop(owner)
+            future = queue.popleft()
+            if queue:
+                # Back of the line among owners with the same share
+                self.waiters[owner] = queue
+            if future.done():
+                continue
+            self._grant(owner)
+            future.set_result(None)
+
+    async def acquire(self) -> Hashable:
+        """
+        Take a slot for the current owner; returns the owner to release with.
+        """
+        owner = _owner.get()
+        if self.in_use < self.limit and not self.waiters:
+            self._grant(owner)
+            return owner
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(owner, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: pass it on
+                self.release(owner)
+            else:
+                queue = self.waiters.get(owner)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.waiters[owner]
+            raise
+        return owner
+
+    def release(self, owner: Hashable):
+        self.in_use -= 1
+        self.held[owner] -= 1
+        if not self.held[owner]:
+            del self.held[owner]
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        owner = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(owner)
+
+    async def pace(self):
+        """
+        Wait for the budget's rate limit, if it has one.
+        """
+        await self.limiter.acquire()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_use": self.in_use, "waiting": self.waiting, "owners": len(self.held)}
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+# name -> (limit, rate) read from the environment when the budget is created
+BUDGET_CONFIG = {
+    "dns": lambda: (_env_int("RECON_DNS_INFLIGHT", 1000), _env_float("RECON_DNS_QPS")),
+    "http": lambda: (_env_int("RECON_HTTP_CONNECTIONS", 200), None),
+    "browser": lambda: (_env_int("RECON_BROWSER_TABS", 8), None),
+    "nmap": lambda: (_env_int("RECON_NMAP_PROCESSES", 4), None),
+}
+
+_budgets: Dict[str, FairSemaphore] = {}
+_loop = None
+
+
+def get_budget(name: str) -> FairSemaphore:
+    global _loop
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        # Waiters and the rate limiter's lock belong to one event loop
+        _budgets.clear()
+        _loop = loop
+    if name not in _budgets:
+        limit, rate = BUDGET_CONFIG[name]()
+        _budgets[name] = FairSemaphore(name, limit, rate)
+    return _budgets[name]
+
+
+def budget_stats() -> Dict[str, dict]:
+    return {name: budget.stats() for name, budget in _budgets.items()}
+
+
+def _export_metrics():
+    for name, budget in _budgets.items():
+        BUDGET_IN_USE.set(budget.in_use, resource=name)
+        BUDGET_WAITING.set(budget.waiting, resource=name)
+
+
+register_collector(_export_metrics)
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .metrics import CACHE_LOOKUPS, CACHE_SIZE, ERRORS, register_collector
+
+_MISSING = object()
+
+
+class MongoCacheStore:
+    """
+    Optional second tier shared by every process, in a collection with a TTL
+    index so expired entries are purged by MongoDB itself.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexed = False
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return (True, doc["value"]) if doc else (False, None)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        if not self._indexed:
+            self._indexed = True
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.replace_one(
+            {"_id": key},
+            {"_id": key, "value": value, "expires_at": datetime.utcnow() + timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry expiry. A loader returning None is a
+    negative result (NXDOMAIN, unreachable) and is kept for `negative_ttl`
+    only. Concurrent lookups of the same missing key share one load
+    (single-flight), so overlapping scans never repeat an in-progress query.
+    """
+
+    def __init__(self, name: str, maxsize: int = 10000, ttl: float = 300, negative_ttl: float = 60,
+                 store: Optional[MongoCacheStore] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.store = store
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (expires, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                if value is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            # wait() rather than await: if the loading caller was cancelled,
+            # take over the load instead of failing too
+            await asyncio.wait([pending])
+            if not pending.cancelled():
+                return pending.result()
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await self._load(key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        store_key = f"{self.name}:{key}"
+        if self.store:
+            try:
+                found, value = await self.store.get(store_key)
+                if found:
+                    self.store_hits += 1
+                    self.set(key, value)
+                    return value
+            except Exception as e:
+                print(f"Cache store read failed: {e}")
+                ERRORS.inc(component="cache")
+        value = await loader()
+        self.set(key, value)
+        if self.store:
+            try:
+                await self.store.set(store_key, value, self.negative_ttl if value is None else self.ttl)
+            except Exception as e:
+                print(f"Cache store write failed: {e}")
+                ERRORS.inc(component="cache")
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "store_hits": self.store_hits,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.negative_hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+
+# name -> settings. "persistent" caches also use the Mongo tier when
+# RECON_CACHE_STORE=mongo.
+CACHE_CONFIG = {
+    # CT log sources are slow and rate limit us; failures back off for 5 minutes
+    "ct_logs": {"maxsize": 1000, "ttl": 6 * 3600, "negative_ttl": 300, "persistent": True},
+    "dns": {"maxsize": 200000, "ttl": 300, "negative_ttl": 60},
+    "tech": {"maxsize": 5000, "ttl": 600, "negative_ttl": 60},
+}
+
+_caches: Dict[str, TTLCache] = {}
+
+
+def get_cache(name: str) -> TTLCache:
+    if name not in _caches:
+        config = dict(CACHE_CONFIG.get(name, {}))
+        store = None
+        if config.pop("persistent", False) and os.environ.get("RECON_CACHE_STORE") == "mongo":
+            from .database import db
+            store = MongoCacheStore(db.cache)
+        _caches[name] = TTLCache(name, store=store, **config)
+    return _caches[name]
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def _export_metrics():
+    for name, stats in cache_stats().items():
+        CACHE_SIZE.set(stats["size"], cache=name)
+        for result in ("hits", "negative_hits", "misses", "coalesced", "store_hits"):
+            CACHE_LOOKUPS.set(stats[result], cache=name, result=result)
+
+
+register_collector(_export_metrics)
@@ -0,0 +1,70 @@
+"""
+Campaigns: many domains submitted at once. Each domain becomes an ordinary
+queued scan tagged with the campaign id; progress is counted from those
+scans, so there is no separate campaign state to keep in sync.
+"""
+import os
+import re
+from typing import Dict, Iterable, List, Tuple
+
+MAX_DOMAINS = int(os.environ.get("RECON_CAMPAIGN_MAX_DOMAINS", "5000"))
+# Uploaded domain lists are read whole; this keeps that bounded
+MAX_UPLOAD_BYTES = 1024 * 1024
+
+_DOMAIN_RE = re.compile(r"^(?=.{1,253}$)(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z0-9-]{2,63}$")
+_SEPARATORS = re.compile(r"[\s,;]+")
+
+
+def normalize_domain(value: str) -> str:
+    """
+    "https://WWW.Example.com:8443/login" -> "www.example.com". Returns ""
+    for anything that is not a hostname.
+    """
+    value = value.strip().lower()
+    value = re.sub(r"^[a-z][a-z0-9+.-]*://", "", value)
+    value = re.split(r"[/?#]", value, 1)[0]
+    value = value.rsplit("@", 1)[-1].split(":", 1)[0].rstrip(".")
+    if value.startswith("*."):
+        value = value[2:]
+    try:
+        value = value.encode("idna").decode("ascii")
+    except UnicodeError:
+        return ""
+    return value if _DOMAIN_RE.match(value) else ""
+
+
+def parse_domains(entries: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Unique normalized domains (in order) and the entries that are not
+    domains. Entries may hold several domains separated by whitespace,
+    commas or semicolons; "#" starts a comment.
+    """
+    domains: Dict[str, None] = {}
+    invalid = []
+    for entry in entries:
+        for token in _SEPARATORS.split(entry.split("#", 1)[0]):
+            if not token:
+                continue
+            domain = normalize_domain(token)
+            if domain:
+                domains[domain] = None
+            else:
+                invalid.append(token)
+    return list(domains), invalid
+
+
+def progress(counts: Dict[str, int]) -> dict:
+    """
+    Aggregate campaign progress from per-status scan counts.
+    """
+    total = sum(counts.values())
+    finished = counts.get("completed", 0) + counts.get("failed", 0)
+    return {
+        "total": total,
+        "pending": counts.get("pending", 0),
+        "running": counts.get("running", 0),
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "progress": round(finished / total, 3) if total else 0.0,
+        "done": bool(total) and finished == total,
+    }
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Dict, Optional, Set
+
+# Pushed in place of dropped events; the consumer should re-send a snapshot
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """
+    One listener's bounded queue. Publishing never blocks: when a slow
+    consumer falls `maxsize` events behind, its backlog is discarded and
+    replaced by a single RESYNC marker, and later events are dropped until
+    the consumer reaches it (its fresh snapshot will include them).
+    """
+
+    def __init__(self, bus: "EventBus", key: str, maxsize: int):
+        self.bus = bus
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.lagged = False
+
+    def push(self, event: dict):
+        if self.lagged:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.lagged = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Next event, or None if nothing arrived within `timeout` seconds.
+        """
+        try:
+            event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is RESYNC:
+            self.lagged = False
+        return event
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class EventBus:
+    """
+    In-process pub/sub keyed by topic (a scan id). Events are plain dicts.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, key: str) -> Subscription:
+        sub = Subscription(self, key, self.maxsize)
+        self.subscribers.setdefault(key, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription):
+        subs = self.subscribers.get(sub.key)
+        if subs:
+            subs.discard(sub)
+            if not subs:
+                del self.subscribers[sub.key]
+
+    def publish(self, key: str, event: dict):
+        for sub in list(self.subscribers.get(key, ())):
+            sub.push(event)
+
+
+scan_events = EventBus()
@@ -0,0 +1,129 @@
+import base64
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+# Newest first; id breaks ties between scans started in the same millisecond
+SORT = [("timestamp", DESCENDING), ("id", DESCENDING)]
+
+
+def encode_cursor(timestamp: datetime, scan_id: str) -> str:
+    raw = f"{timestamp.isoformat()}|{scan_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Raises ValueError for anything that is not a cursor we handed out.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, scan_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), scan_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def history_filter(domain: Optional[str] = None, status: Optional[str] = None, cursor: Optional[str] = None,
+                   campaign: Optional[str] = None) -> dict:
+    query = {}
+    if domain:
+        query["domain"] = domain
+    if campaign:
+        query["campaign_id"] = campaign
+    if status:
+        query["status"] = status
+    if cursor:
+        timestamp, scan_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": scan_id}},
+        ]
+    return query
+
+
+def _size(field: str, empty) -> dict:
+    return {"$ifNull": [field, empty]}
+
+
+def summary_pipeline(query: dict, limit: int) -> List[dict]:
+    """
+    Aggregation returning one page of scan summaries. Counts are computed on
+    the server, so the heavy arrays never leave the database.
+    """
+    return [
+        {"$match": query},
+        {"$sort": dict(SORT)},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "domain": 1,
+            "status": 1,
+            "timestamp": 1,
+            "campaign_id": 1,
+            "subdomain_count": _size("$subdomains.count", 0),
+            "port_count": {"$sum": {"$map": {
+                "input": _size("$ports", []),
+                "in": {"$size": _size("$$this.ports", [])},
+            }}},
+            "technology_count": {"$size": _size("$technologies", [])},
+            "directory_count": {"$size": _size("$directories", [])},
+            "screenshot_count": {"$size": {"$objectToArray": _size("$screenshots", {})}},
+            "vulnerability_count": {"$size": _size("$vulnerabilities", [])},
+        }},
+    ]
+
+
+def summarize(doc: dict) -> dict:
+    """
+    Python equivalent of the $project stage, for in-memory results.
+    """
+    return {
+        "id": doc["id"],
+        "domain": doc["domain"],
+        "status": doc.get("status", "pending"),
+        "timestamp": doc["timestamp"],
+        "campaign_id": doc.get("campaign_id"),
+        "subdomain_count": (doc.get("subdomains") or {}).get("count", 0),
+        "port_count": sum(len(host.get("ports") or []) for host in doc.get("ports") or []),
+        "technology_count": len(doc.get("technologies") or []),
+        "directory_count": len(doc.get("directories") or []),
+        "screenshot_count": len(doc.get("screenshots") or {}),
+        "vulnerability_count": len(doc.get("vulnerabilities") or []),
+    }
+
+
+def page_in_memory(docs: Iterable[dict], limit: int, domain: Optional[str] = None,
+                   status: Optional[str] = None, cursor: Optional[str] = None,
+                   campaign: Optional[str] = None) -> List[dict]:
+    after = decode_cursor(cursor) if cursor else None
+    matching = [
+        d for d in docs
+        if (not domain or d["domain"] == domain)
+        and (not campaign or d.get("campaign_id") == campaign)
+        and (not status or d.get("status") == status)
+        and (after is None or (d["timestamp"], d["id"]) < after)
+    ]
+    matching.sort(key=lambda d: (d["timestamp"], d["id"]), reverse=True)
+    return [summarize(d) for d in matching[:limit]]
+
+
+async def ensure_indexes(collection):
+    """
+    Indexes backing scan lookups by id and the paginated history listing.
+    Best effort: the API keeps working (slower) without them.
+    """
+    indexes = [
+        ([("id", ASCENDING)], {"unique": True}),
+        (SORT, {}),
+        ([("domain", ASCENDING)] + SORT, {}),
+        ([("status", ASCENDING)] + SORT, {}),
+        ([("campaign_id", ASCENDING), ("status", ASCENDING)], {"sparse": True}),
+    ]
+    for keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            print(f"Index {keys} not created: {e}")
@@ -0,0 +1,266 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from .history import ensure_indexes, history_filter, page_in_memory, summary_pipeline
+from .metrics import CACHE_LOOKUPS, CACHE_SIZE, PERSIST_PENDING, register_collector
+from .persistence import MemoryBackend, MongoBackend, ScanWriter
+
+# A scan whose lease ran out this many times is marked failed instead of retried
+MAX_ATTEMPTS = 3
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+class _BufferedResults:
+    """
+    Result writes and reads shared by both queues, through a ScanWriter:
+    items streamed by running stages are buffered, checkpoints and finishes
+    are written (lease-guarded) together with the scan's buffered changes.
+    """
+
+    writer: ScanWriter
+
+    async def get(self, scan_id: str) -> Optional[dict]:
+        return await self.writer.get(scan_id)
+
+    async def append(self, scan_id: str, field: str, items: List):
+        """
+        Add items to a list field of the result (once each).
+        """
+        await self.writer.add_to_set(scan_id, field, items)
+
+    async def checkpoint(self, scan_id: str, worker_id: str, stage: str, fields: dict):
+        await self.writer.write(
+            {"id": scan_id, "lease_owner": worker_id},
+            {"$set": fields, "$addToSet": {"completed_stages": stage}},
+        )
+
+    async def finish(self, scan_id: str, worker_id: str, status: str, fields: Optional[dict] = None):
+        await self.writer.write(
+            {"id": scan_id, "lease_owner": worker_id},
+            {"$set": {**(fields or {}), "status": status}, "$unset": {"lease_owner": "", "lease_until": ""}},
+        )
+
+    async def release(self, scan_id: str, worker_id: str):
+        """
+        Hand an unfinished scan back (worker shutting down) without using up
+        one of its attempts.
+        """
+        await self.writer.write(
+            {"id": scan_id, "lease_owner": worker_id},
+            {"$set": {"lease_until": _now()}, "$inc": {"attempts": -1}},
+        )
+        self.writer.forget(scan_id)
+
+    async def flush(self):
+        """
+        Write every buffered change now (shutting down).
+        """
+        await self.writer.flush()
+
+
+class MongoJobQueue(_BufferedResults):
+    """
+    Scan jobs stored in the scans collection itself: a "pending" document is
+    a queued job. A worker claims one by atomically flipping it to "running"
+    with a lease (lease_owner, lease_until) that it keeps extending with
+    heartbeats. If the worker dies the lease runs out and another worker
+    claims the scan again, skipping the stages listed in completed_stages.
+    """
+
+    def __init__(self, collection, max_attempts: int = MAX_ATTEMPTS):
+        self.collection = collection
+        self.max_attempts = max_attempts
+        self.writer = ScanWriter(MongoBackend(collection))
+
+    async def ensure_indexes(self):
+        await ensure_indexes(self.collection)
+        try:
+            await self.collection.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+        except Exception as e:
+            print(f"Job index not created: {e}")
+
+    async def enqueue(self, doc: dict):
+        await self.collection.insert_one({**doc, "status": "pending", "attempts": 0, "completed_stages": []})
+
+    async def enqueue_many(self, docs: List[dict]):
+        await self.collection.insert_many(
+            [{**doc, "status": "pending", "attempts": 0, "completed_stages": []} for doc in docs], ordered=False,
+        )
+
+    async def latest(self, domain: str, before: datetime) -> Optional[dict]:
+        """
+        Most recent completed scan of `domain` older than `before`.
+        """
+        return await self.collection.find_one(
+            {"domain": domain, "status": "completed", "timestamp": {"$lt": before}},
+            {"_id": 0},
+            sort=[("timestamp", -1)],
+        )
+
+    async def page(self, limit: int, domain: Optional[str] = None, status: Optional[str] = None,
+                   cursor: Optional[str] = None, campaign: Optional[str] = None) -> List[dict]:
+        query = history_filter(domain, status, cursor, campaign)
+        return await self.collection.aggregate(summary_pipeline(query, limit)).to_list(length=limit)
+
+    async def campaign_counts(self, campaign_id: str) -> Dict[str, int]:
+        """
+        Number of the campaign's scans in each status.
+        """
+        pipeline = [{"$match": {"campaign_id": campaign_id}}, {"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {row["_id"]: row["count"] async for row in self.collection.aggregate(pipeline)}
+
+    async def depth(self) -> int:
+        """
+        Number of scans waiting to be claimed.
+        """
+        return await self.collection.count_documents({"status": "pending"})
+
+    async def claim(self, worker_id: str, lease: float) -> Optional[dict]:
+        """
+        Take the oldest pending scan, or a running one whose lease expired.
+        """
+        now = _now()
+        await self.collection.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed"}, "$unset": {"lease_owner": "", "lease_until": ""}},
+        )
+        doc = await self.collection.find_one_and_update(
+            {
+                "$or": [{"status": "pending"}, {"status": "running", "lease_until": {"$lt": now}}],
+                "attempts": {"$not": {"$gte": self.max_attempts}},
+            },
+            {
+                "$set": {"status": "running", "lease_owner": worker_id, "lease_until": now + timedelta(seconds=lease)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("timestamp", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc:
+            self.writer.track(doc)
+        return doc
+
+    async def heartbeat(self, scan_id: str, worker_id: str, lease: float) -> bool:
+        """
+        Extend the lease. False means the scan was taken over by someone else.
+        """
+        until = _now() + timedelta(seconds=lease)
+        result = await self.collection.update_one(
+            {"id": scan_id, "lease_owner": worker_id, "status": "running"},
+            {"$set": {"lease_until": until}},
+        )
+        if result.matched_count != 1:
+            self.writer.forget(scan_id)
+            return False
+        self.writer.renew(scan_id, until)
+        return True
+
+
+class MemoryJobQueue(_BufferedResults):
+    """
+    Same interface kept in a dict, for tests and for running without MongoDB.
+    Only shared within one process.
+    """
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.docs: Dict[str, dict] = {}
+        self.writer = ScanWriter(MemoryBackend(self.docs))
+
+    async def ensure_indexes(self):
+        pass
+
+    async def enqueue(self, doc: dict):
+        self.docs[doc["id"]] = {**doc, "status": "pending", "attempts": 0, "completed_stages": []}
+
+    async def enqueue_many(self, docs: List[dict]):
+        for doc in docs:
+            await self.enqueue(doc)
+
+    async def latest(self, domain: str, before: datetime) -> Optional[dict]:
+        done = [d for d in self.docs.values()
+                if d["domain"] == domain and d["status"] == "completed" and d["timestamp"] < before]
+        return dict(max(done, key=lambda d: d["timestamp"])) if done else None
+
+    async def page(self, limit: int, domain: Optional[str] = None, status: Optional[str] = None,
+                   cursor: Optional[str] = None, campaign: Optional[str] = None) -> List[dict]:
+        return page_in_memory(self.docs.values(), limit, domain, status, cursor, campaign)
+
+    async def campaign_counts(self, campaign_id: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for doc in self.docs.values():
+            if doc.get("campaign_id") == campaign_id:
+                counts[doc["status"]] = counts.get(doc["status"], 0) + 1
+        return counts
+
+    async def depth(self) -> int:
+        return sum(1 for d in self.docs.values() if d["status"] == "pending")
+
+    def _owned(self, scan_id: str, worker_id: str) -> Optional[dict]:
+        doc = self.docs.get(scan_id)
+        return doc if doc and doc.get("lease_owner") == worker_id else None
+
+    async def claim(self, worker_id: str, lease: float) -> Optional[dict]:
+        now = _now()
+        candidates = []
+        for doc in self.docs.values():
+            expired = doc["status"] == "running" and doc.get("lease_until") and doc["lease_until"] < now
+            if expired and doc["attempts"] >= self.max_attempts:
+                doc["status"] = "failed"
+                doc.pop("lease_owner", None)
+                doc.pop("lease_until", None)
+            elif (doc["status"] == "pending" or expired) and doc["attempts"] < self.max_attempts:
+                candidates.append(doc)
+        if not candidates:
+            return None
+        doc = min(candidates, key=lambda d: d["timestamp"])
+        doc.update(status="running", lease_owner=worker_id, lease_until=now + timedelta(seconds=lease))
+        doc["attempts"] += 1
+        self.writer.track(doc)
+        return dict(doc)
+
+    async def heartbeat(self, scan_id: str, worker_id: str, lease: float) -> bool:
+        doc = self._owned(scan_id, worker_id)
+        if not doc or doc["status"] != "running":
+            self.writer.forget(scan_id)
+            return False
+        doc["lease_until"] = _now() + timedelta(seconds=lease)
+        self.writer.renew(scan_id, doc["lease_until"])
+        return True
+
+
+_queue = None
+
+
+def get_job_queue():
+    """
+    Process-wide queue: the Mongo scans collection, or an in-memory queue
+    when RECON_QUEUE=memory (API and workers must then share one process).
+    """
+    global _queue
+    if _queue is None:
+        if os.environ.get("RECON_QUEUE", "mongo") == "memory":
+            _queue = MemoryJobQueue()
+        else:
+            from .database import scan_collection
+            _queue = MongoJobQueue(scan_collection)
+    return _queue
+
+
+def _export_metrics():
+    if _queue is not None:
+        stats = _queue.writer.stats()
+        PERSIST_PENDING.set(stats["pending_changes"])
+        CACHE_SIZE.set(stats["live"] + stats["cached"], cache="results")
+        CACHE_LOOKUPS.set(stats["hits"], cache="results", result="hits")
+        CACHE_LOOKUPS.set(stats["misses"], cache="results", result="misses")
+
+
+register_collector(_export_metrics)
@@ -1,7 +1,12 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
+import json
+import os
 import sys
+from contextlib import asynccontextmanager
 
 # Fix for Playwright on Windows
 if sys.platform == 'win32':
@@ -9,19 +14,51 @@ if sys.platform == 'win32':
 
 from uuid import uuid4
 from datetime import datetime
-from typing import Dict, List
+from typing import List, Optional
 
-from .schemas import ScanRequest, ScanResult, SubdomainResult, PortResult
-from .services.subdomain import SubdomainService
-from .services.port_scan import PortScanService
-from .services.osint import OsintService
-from .services.fuzzing import FuzzingService
+from .schemas import CampaignRequest, CampaignStatus, ScanRequest, ScanResult, ScanPage
+from .campaigns import MAX_DOMAINS, MAX_UPLOAD_BYTES, parse_domains, progress
+from .history import decode_cursor, encode_cursor
+from .jobs import get_job_queue
+from .worker import ScanWorker
+from .stages import stages_for
+from .services.connect_scan import parse_ports
 from .services.visual_recon import VisualReconService
-from .database import scan_collection
+from .services.blob_store import BLOB_ID_RE, content_type, get_blob_store
+from .events import RESYNC, scan_events
+from .cache import cache_stats
+from .metrics import ERRORS, QUEUE_DEPTH, render
 
-import asyncio
+# Scans are queued and run by workers (python -m app.worker). Unless
+# RECON_EMBEDDED_WORKER=0, the API process runs one as well, so a single
+# uvicorn process is still a complete setup.
+queue = get_job_queue()
+embedded_worker: Optional[ScanWorker] = None
 
-app = FastAPI(title="Red Team Recon API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global embedded_worker
+    # In the background: an unreachable DB must not hold up startup
+    asyncio.ensure_future(queue.ensure_indexes())
+    runner = None
+    if os.environ.get("RECON_EMBEDDED_WORKER", "1") != "0":
+        # One Chromium for the whole process, shared by every scan's screenshots
+        await VisualReconService.start_pool()
+        embedded_worker = ScanWorker(queue, concurrency=int(os.environ.get("RECON_WORKER_CONCURRENCY", "2")))
+        runner = asyncio.ensure_future(embedded_worker.run())
+    yield
+    if runner:
+        await embedded_worker.stop()
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        embedded_worker = None
+        await VisualReconService.stop_pool()
+    try:
+        await queue.flush()
+    except Exception as e:
+        print(f"Final result flush failed: {e}")
+
+app = FastAPI(title="Red Team Recon API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -31,121 +68,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage for scan results (for quick access before DB persistence)
-SCAN_RESULTS: Dict[str, dict] = {}
-
-async def run_scan_task(scan_id: str, domain: str):
-    """
-    Background task to run ALL recon services and update MongoDB.
-    """
-    print(f"Starting scan for {domain} (ID: {scan_id})")
-    try:
-        # Update Status to Running (In-Memory)
-        if scan_id in SCAN_RESULTS:
-            SCAN_RESULTS[scan_id]["status"] = "running"
-        
-        # Update DB (Best Effort)
-        try:
-             await scan_collection.update_one({"id": scan_id}, {"$set": {"status": "running"}})
-        except: pass
-
-        # 1. Subdomain Discovery
-        print("Running Subdomain Discovery...")
-        passive_subs = SubdomainService.get_subdomains_crtsh(domain)
-        # Fallback if passive fails: use the domain itself
-        if not passive_subs:
-            print("Passive subdomain discovery failed or returned 0. Using main domain only.")
-            all_subs = [domain]
-        else:
-            all_subs = list(set(passive_subs))
-
-        sub_result = SubdomainResult(subdomains=all_subs, count=len(all_subs))
-        
-        # 2. Port Scanning
-        print("Running Port Scan...")
-        import socket
-        ports_list = []
-        try:
-            # Resolve main domain
-            ip = socket.gethostbyname(domain)
-            print(f"Accquired IP: {ip}")
-            open_ports = PortScanService.scan_common_ports(ip)
-            print(f"Found ports: {open_ports}")
-            port_result = PortResult(ip=ip, ports=open_ports)
-            ports_list = [port_result]
-        except Exception as e:
-            print(f"Port scan failed: {e}")
-
-        # 3. OSINT / Tech Stack & WAF
-        print("Running OSINT...")
-        try:
-            tech_stack = OsintService.get_tech_stack(domain)
-        except:
-            tech_stack = []
-
-        # 4. Directory Fuzzing relative to domain
-        print("Running Directory Fuzzing...")
-        try:
-           directories = FuzzingService.brute_force_directories(domain)
-        except:
-            directories = []
-
-        # 5. Visual Recon (Screenshots)
-        print("Running Visual Recon...")
-        screenshots = {}
-        try:
-            # Screenshot main domain + top 4 subdomains
-            targets_for_screen = [domain] + [s for s in all_subs if s != domain][:4]
-            screenshots = await VisualReconService.take_screenshots(targets_for_screen)
-        except Exception as e:
-             print(f"Visual recon failed: {e}")
-
-        # 6. Vuln Scan (Mock for now or integrate searching)
-        # Simple version check mock
-        vulns = []
-        for tech in tech_stack:
-            if "Apache" in tech:
-                vulns.append("Apache: Check for Path Traversal (CVE-2021-41773)")
-            if "PHP" in tech:
-                 vulns.append("PHP: Check for Info Disclosure")
-
-        # Update Result in DB
-        result_update = {
-            "status": "completed",
-            "subdomains": sub_result.dict(),
-            "ports": [p.dict() for p in ports_list],
-            "technologies": tech_stack,
-            "directories": directories,
-            "screenshots": screenshots,
-            "vulnerabilities": vulns
-        }
-        
-        # Save to In-Memory
-        if scan_id in SCAN_RESULTS:
-            SCAN_RESULTS[scan_id].update(result_update)
-
-        # Save to DB (Best Effort)
-        try:
-            await scan_collection.update_one(
-                {"id": scan_id},
-                {"$set": result_update}
-            )
-        except Exception as e:
-            print(f"DB Final Update Failed: {e}")
-            
-        print(f"Scan {scan_id} completed.")
-
-    except Exception as e:
-        print(f"Scan failed: {e}")
-        # Failure update
-        if scan_id in SCAN_RESULTS:
-             SCAN_RESULTS[scan_id]["status"] = "failed"
-        try:
-            await scan_collection.update_one(
-                {"id": scan_id},
-                {"$set": {"status": "failed"}}
-            )
-        except: pass
+TERMINAL_STATUSES = ("completed", "failed")
+# Seconds between SSE keep-alive comments on an idle stream
+EVENT_HEARTBEAT = 15.0
+# Seconds between snapshot checks for a scan running in another process
+EVENT_POLL = 3.0
 
 @app.get("/")
 def read_root():
@@ -155,53 +82,262 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+def validate_options(scan_types: List[str], ports: Optional[str]):
+    try:
+        stages_for(scan_types)
+        if ports:
+            parse_ports(ports)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/scan", response_model=ScanResult)
-async def start_scan(request: ScanRequest, background_tasks: BackgroundTasks):
+async def start_scan(request: ScanRequest):
+    validate_options(request.scan_types, request.ports)
+
     scan_id = str(uuid4())
     new_scan = ScanResult(
         id=scan_id,
         domain=request.domain,
         status="pending",
-        timestamp=datetime.now()
+        timestamp=datetime.now(),
+        scan_types=request.scan_types,
     )
-    
-    # Save to In-Memory
-    SCAN_RESULTS[scan_id] = new_scan.dict()
 
-    # Save to MongoDB (Best Effort)
     try:
-        await scan_collection.insert_one(new_scan.dict())
+        await queue.enqueue({**new_scan.dict(), "port_spec": request.ports, "incremental": request.incremental})
     except Exception as e:
-        print(f"DB Write Failed: {e}")
-    
-    background_tasks.add_task(run_scan_task, scan_id, request.domain)
+        print(f"Enqueue Failed: {e}")
+        raise HTTPException(status_code=503, detail="Scan queue unavailable")
+
+    if embedded_worker:
+        embedded_worker.notify()
     return new_scan
 
+async def start_campaign(entries: List[str], scan_types: List[str], ports: Optional[str],
+                         incremental: bool) -> CampaignStatus:
+    validate_options(scan_types, ports)
+    domains, invalid = parse_domains(entries)
+    if not domains:
+        raise HTTPException(status_code=400, detail="No valid domains")
+    if len(domains) > MAX_DOMAINS:
+        raise HTTPException(status_code=400, detail=f"Too many domains ({len(domains)}, at most {MAX_DOMAINS})")
+
+    campaign_id = str(uuid4())
+    now = datetime.now()
+    docs = [
+        {**ScanResult(id=str(uuid4()), domain=domain, timestamp=now, scan_types=scan_types,
+                      campaign_id=campaign_id).dict(),
+         "port_spec": ports, "incremental": incremental}
+        for domain in domains
+    ]
+    try:
+        await queue.enqueue_many(docs)
+    except Exception as e:
+        print(f"Enqueue Failed: {e}")
+        raise HTTPException(status_code=503, detail="Scan queue unavailable")
+
+    if embedded_worker:
+        embedded_worker.notify()
+    return CampaignStatus(id=campaign_id, invalid=invalid, **progress({"pending": len(docs)}))
+
+@app.post("/api/campaigns", response_model=CampaignStatus)
+async def create_campaign(request: CampaignRequest):
+    """
+    Queue one scan per domain as a campaign. Scans of all campaigns share
+    the process-wide DNS, HTTP, browser and nmap budgets.
+    """
+    return await start_campaign(request.domains, request.scan_types, request.ports, request.incremental)
+
+@app.post("/api/campaigns/upload", response_model=CampaignStatus)
+async def upload_campaign(
+    request: Request,
+    scan_types: List[str] = Query(["all"]),
+    ports: Optional[str] = None,
+    incremental: bool = False,
+):
+    """
+    Same as POST /api/campaigns for a domain list file sent as the raw
+    request body (one domain per line, "#" comments allowed), e.g.
+    `curl --data-binary @scope.txt ".../api/campaigns/upload?scan_types=subdomains"`.
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Domain list larger than {MAX_UPLOAD_BYTES} bytes")
+    try:
+        text = bytes(body).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Domain list must be UTF-8 text")
+    return await start_campaign(text.splitlines(), scan_types, ports, incremental)
+
+@app.get("/api/campaigns/{campaign_id}", response_model=CampaignStatus)
+async def get_campaign(campaign_id: str):
+    """
+    Aggregate progress. The scans themselves are listed by /api/scans?campaign=<id>.
+    """
+    try:
+        counts = await queue.campaign_counts(campaign_id)
+    except Exception as e:
+        print(f"DB Read Failed: {e}")
+        raise HTTPException(status_code=503, detail="Scan store unavailable")
+    if not counts:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return CampaignStatus(id=campaign_id, **progress(counts))
+
 @app.get("/api/scan/{scan_id}", response_model=ScanResult)
 async def get_scan_result(scan_id: str):
-    # Try DB first
     try:
-        scan = await scan_collection.find_one({"id": scan_id})
-        if scan:
-            return ScanResult(**scan)
+        scan = await queue.get(scan_id)
     except Exception as e:
-        print(f"DB Read Failed: {e}. Checking in-memory.")
-    
-    # Fallback to in-memory
-    if scan_id in SCAN_RESULTS:
-        return ScanResult(**SCAN_RESULTS[scan_id])
-        
+        print(f"DB Read Failed: {e}")
+        raise HTTPException(status_code=503, detail="Scan store unavailable")
+    if scan:
+        return ScanResult(**scan)
     raise HTTPException(status_code=404, detail="Scan not found")
 
-@app.get("/api/scans", response_model=List[ScanResult])
-async def get_scan_history():
+async def scan_snapshot(scan_id: str) -> Optional[dict]:
+    try:
+        scan = await queue.get(scan_id)
+        if scan:
+            return jsonable_encoder(ScanResult(**scan))
+    except Exception as e:
+        print(f"DB Read Failed: {e}")
+        ERRORS.inc(component="api")
+    return None
+
+@app.get("/api/scan/{scan_id}/events")
+async def stream_scan_events(scan_id: str):
+    """
+    Server-sent events for one scan: a snapshot first, then status, stage and
+    partial-result events until the scan completes or fails.
+    """
+    # Subscribe before the snapshot so nothing published in between is lost
+    sub = scan_events.subscribe(scan_id)
+    snapshot = await scan_snapshot(scan_id)
+    if snapshot is None:
+        sub.close()
+        raise HTTPException(status_code=404, detail="Scan not found")
+
+    def frame(event: dict) -> str:
+        return f"data: {json.dumps(jsonable_encoder(event))}\n\n"
+
+    async def stream():
+        nonlocal snapshot
+        # Until an event arrives the scan may be running in a separate worker
+        # process, whose events never reach this bus: poll its snapshot instead
+        remote = True
+        try:
+            yield frame({"type": "snapshot", "scan": snapshot})
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            while True:
+                event = await sub.get(timeout=EVENT_POLL if remote else EVENT_HEARTBEAT)
+                if event is None:
+                    if not remote:
+                        yield ": ping\n\n"
+                        continue
+                    latest = await scan_snapshot(scan_id)
+                    if latest is None or latest == snapshot:
+                        yield ": ping\n\n"
+                        continue
+                    snapshot = latest
+                    yield frame({"type": "snapshot", "scan": snapshot})
+                    if snapshot["status"] in TERMINAL_STATUSES:
+                        return
+                    continue
+                if event is RESYNC:
+                    # This client fell behind and missed events; start it over
+                    latest = await scan_snapshot(scan_id)
+                    if latest is None:
+                        # Keep the last good snapshot and poll until the store answers
+                        remote = True
+                        continue
+                    snapshot = latest
+                    event = {"type": "snapshot", "scan": snapshot}
+                remote = False
+                yield frame(event)
+                if event["type"] == "status" and event["status"] in TERMINAL_STATUSES:
+                    return
+                if event["type"] == "snapshot" and snapshot["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            sub.close()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+@app.get("/api/scans", response_model=ScanPage)
+async def get_scan_history(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    domain: Optional[str] = None,
+    status: Optional[str] = None,
+    campaign: Optional[str] = None,
+):
+    """
+    One page of scan summaries, newest first. Follow `next_cursor` for older scans.
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        items = await queue.page(limit, domain, status, cursor, campaign)
+    except Exception as e:
+        print(f"DB List Failed: {e}")
+        raise HTTPException(status_code=503, detail="Scan store unavailable")
+
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1]["timestamp"], items[-1]["id"])
+    return ScanPage(items=items, next_cursor=next_cursor)
+
+@app.get("/api/blobs/{blob_id}")
+async def get_blob(blob_id: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Stream a stored screenshot. Blobs are content-addressed, so they never
+    change and can be cached forever.
+    """
+    store = get_blob_store()
+    size = await store.size(blob_id) if BLOB_ID_RE.match(blob_id) else None
+    if size is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{blob_id}"'}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    chunks = store.open(blob_id)
+    first = await anext(chunks, b"")
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(body(), media_type=content_type(first), headers=headers)
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """
+    Hit/miss counters of the lookup caches in this process (CT logs, DNS, tech
+    stack). Workers started with `python -m app.worker` keep their own.
+    """
+    return cache_stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus text format: stage timings, DNS/HTTP/connect counters, queue
+    depth and scans in flight. Counters cover the scans run by this process;
+    separate workers serve theirs with --metrics-port.
+    """
     try:
-        cursor = scan_collection.find({}).sort("timestamp", -1)
-        scans = []
-        async for document in cursor:
-            document.pop("_id", None) # Remove MongoDB's _id field
-            scans.append(document)
-        return [ScanResult(**scan) for scan in scans]
+        QUEUE_DEPTH.set(await queue.depth())
     except Exception as e:
-        print(f"DB List Failed: {e}. Returning in-memory.")
-        return [ScanResult(**scan) for scan in SCAN_RESULTS.values()]
+        print(f"Queue depth unavailable: {e}")
+    return Response(render(), media_type="text/plain; version=0.0.4")
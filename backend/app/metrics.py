@@ -0,0 +1,174 @@
+"""
+Process-wide metrics, rendered in the Prometheus text format by /metrics
+(and by a worker's --metrics-port). Counters incremented while a scan is
+running are also added to that scan's own tally (see scan_metrics), which
+is saved with the scan.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+_current_scan: ContextVar[Optional[Dict[str, float]]] = ContextVar("recon_scan_metrics", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.values: Dict[tuple, float] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        # Name in per-scan tallies: recon_dns_queries_total -> dns_queries
+        self.short_name = name.removeprefix("recon_").removesuffix("_total")
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+        scan = _current_scan.get()
+        if scan is not None:
+            name = ".".join((self.short_name,) + key)
+            scan[name] = scan.get(name, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: Dict[tuple, List[int]] = {}
+        self.sums: Dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for key, counts in sorted(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, f'le="{le}"'), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), self.sums[key]
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), cumulative
+
+
+REGISTRY: List[_Metric] = []
+# Called before rendering, to refresh gauges that mirror other state
+_collectors: List[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]):
+    _collectors.append(collector)
+
+
+def render() -> str:
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+@contextmanager
+def scan_metrics():
+    """
+    Tally counters incremented in this context (and the tasks and threads it
+    starts) separately, e.g. `with scan_metrics() as tally: ...`.
+    """
+    tally: Dict[str, float] = {}
+    token = _current_scan.set(tally)
+    try:
+        yield tally
+    finally:
+        _current_scan.reset(token)
+
+
+DNS_QUERIES = Counter("recon_dns_queries_total", "DNS queries sent.")
+DNS_TIMEOUTS = Counter("recon_dns_timeouts_total", "DNS queries that got no answer in time.")
+DNS_RETRIES = Counter("recon_dns_retries_total", "DNS queries re-sent after a timeout or server failure.")
+HTTP_REQUESTS = Counter("recon_http_requests_total", "HTTP requests sent by the HTTP engine.")
+HTTP_ERRORS = Counter("recon_http_errors_total", "HTTP requests that failed.", ["kind"])
+HTTP_RETRIES = Counter("recon_http_retries_total", "HTTP requests retried on a fresh connection.")
+CONNECT_ATTEMPTS = Counter("recon_connect_attempts_total", "TCP connect probes.")
+CONNECT_TIMEOUTS = Counter("recon_connect_timeouts_total", "TCP connect probes that timed out.")
+CT_QUERIES = Counter("recon_ct_queries_total", "Certificate Transparency source queries.", ["source", "result"])
+SCREENSHOTS = Counter("recon_screenshots_total", "Screenshot captures.", ["result"])
+ERRORS = Counter("recon_errors_total", "Errors that were handled and logged instead of raised.", ["component"])
+
+STAGE_SECONDS = Histogram("recon_stage_seconds", "Wall time of each recon stage.", ["stage"])
+STAGE_RUNS = Counter("recon_stage_runs_total", "Recon stage runs by outcome.", ["stage", "result"])
+SCANS = Counter("recon_scans_total", "Scans finished by this process.", ["status"])
+SCANS_IN_FLIGHT = Gauge("recon_scans_in_flight", "Scans running in this process.")
+QUEUE_DEPTH = Gauge("recon_queue_depth", "Scans waiting in the job queue.")
+CACHE_LOOKUPS = Gauge("recon_cache_lookups", "Lookup cache results since start.", ["cache", "result"])
+CACHE_SIZE = Gauge("recon_cache_entries", "Entries held by each lookup cache.", ["cache"])
+BUDGET_IN_USE = Gauge("recon_budget_in_use", "Slots of each shared resource budget in use.", ["resource"])
+BUDGET_WAITING = Gauge("recon_budget_waiting", "Requests waiting for a slot of each shared resource budget.", ["resource"])
+PERSIST_FLUSH_SECONDS = Histogram("recon_persist_flush_seconds", "Latency of bulk writes of scan results.", ["result"],
+                                  buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+PERSIST_BATCH_OPERATIONS = Histogram("recon_persist_batch_operations", "Update operations per bulk write.",
+                                     buckets=(1, 2, 5, 10, 25, 50, 100, 250))
+PERSIST_BATCH_CHANGES = Histogram("recon_persist_batch_changes", "Buffered result changes per bulk write.",
+                                  buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 5000))
+PERSIST_PENDING = Gauge("recon_persist_pending_changes", "Result changes buffered and not yet written.")
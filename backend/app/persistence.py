@@ -0,0 +1,307 @@
+"""
+Buffered writes of scan results. Items streamed by a running scan (new
+directories, open ports) are collected per scan, coalesced, and written as
+one bulk_write every FLUSH_INTERVAL seconds or FLUSH_MAX_CHANGES changes,
+with $addToSet for the new items instead of re-writing whole fields.
+Checkpoints and final results go out with the scan's buffered changes in the
+same batch, in order.
+
+Reads of scans this process holds the lease on, and of finished scans, are
+served from memory: nothing else writes to those documents.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .metrics import ERRORS, PERSIST_BATCH_CHANGES, PERSIST_BATCH_OPERATIONS, PERSIST_FLUSH_SECONDS
+
+FLUSH_INTERVAL = float(os.environ.get("RECON_FLUSH_INTERVAL", "1.0"))
+FLUSH_MAX_CHANGES = int(os.environ.get("RECON_FLUSH_MAX_CHANGES", "500"))
+RESULT_CACHE_SIZE = int(os.environ.get("RECON_RESULT_CACHE_SIZE", "1000"))
+TERMINAL_STATUSES = ("completed", "failed")
+
+# (filter, update) in MongoDB syntax
+Operation = Tuple[dict, dict]
+
+
+def _items(value) -> list:
+    return list(value["$each"]) if isinstance(value, dict) and "$each" in value else [value]
+
+
+def apply_update(doc: dict, update: dict):
+    """
+    Apply the subset of MongoDB update operators used here ($set, $unset,
+    $inc, $addToSet; top-level fields only) to `doc` in place.
+    Changed values are replaced rather than mutated, so shallow copies of
+    `doc` are unaffected.
+    """
+    for field, value in update.get("$set", {}).items():
+        doc[field] = value
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+    for field, amount in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + amount
+    for field, value in update.get("$addToSet", {}).items():
+        current = list(doc.get(field) or [])
+        for item in _items(value):
+            if item not in current:
+                current.append(item)
+        doc[field] = current
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """
+    Equality-only MongoDB filter, e.g. {"id": ..., "lease_owner": ...}.
+    """
+    return all(doc.get(field) == value for field, value in query.items())
+
+
+class MongoBackend:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def bulk_write(self, operations: List[Operation]):
+        from pymongo import UpdateOne
+        await self.collection.bulk_write([UpdateOne(q, u) for q, u in operations], ordered=True)
+
+    async def find_one(self, scan_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": scan_id}, {"_id": 0})
+
+
+class MemoryBackend:
+    """
+    Documents in a dict (MemoryJobQueue's), for tests and running without
+    MongoDB. `writes` counts bulk writes.
+    """
+
+    def __init__(self, docs: Optional[Dict[str, dict]] = None):
+        self.docs = docs if docs is not None else {}
+        self.writes = 0
+
+    async def bulk_write(self, operations: List[Operation]):
+        self.writes += 1
+        for query, update in operations:
+            doc = self.docs.get(query["id"])
+            if doc is not None and matches(doc, query):
+                apply_update(doc, update)
+
+    async def find_one(self, scan_id: str) -> Optional[dict]:
+        doc = self.docs.get(scan_id)
+        return dict(doc) if doc else None
+
+
+class _Delta:
+    """
+    One scan's buffered changes: items to add to list fields ($addToSet).
+    """
+
+    def __init__(self):
+        self.adds: Dict[str, list] = {}
+        self.changes = 0
+
+    def add_to_set(self, field: str, items: list):
+        current = self.adds.setdefault(field, [])
+        current.extend(item for item in items if item not in current)
+        self.changes += len(items)
+
+    def merge(self, newer: "_Delta"):
+        """
+        Fold changes made after this delta into it.
+        """
+        changes = self.changes + newer.changes
+        for field, items in newer.adds.items():
+            self.add_to_set(field, items)
+        self.changes = changes
+
+    def update(self) -> dict:
+        return {"$addToSet": {field: {"$each": items} for field, items in self.adds.items()}}
+
+
+class ScanWriter:
+    """
+    Write-behind buffer and read cache in front of the scans collection.
+
+    add_to_set() only buffers; write() sends one operation
+    (a lease-guarded checkpoint, say) together with everything buffered for
+    that scan. Flushes are serialized, so writes reach the database in the
+    order they were made. A failed flush keeps its changes for the next one.
+    """
+
+    def __init__(self, backend, interval: float = FLUSH_INTERVAL, max_changes: int = FLUSH_MAX_CHANGES,
+                 cache_size: int = RESULT_CACHE_SIZE):
+        self.backend = backend
+        self.interval = interval
+        self.max_changes = max_changes
+        self.cache_size = cache_size
+        self.pending: Dict[str, _Delta] = {}
+        self.pending_changes = 0
+        # Scans leased by this process, kept current by every write
+        self.live: Dict[str, dict] = {}
+        # Finished scans, least recently read first
+        self.done: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self._loop = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The lock and the flush timer belong to one event loop
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = None
+
+    # Read cache
+
+    def track(self, doc: dict):
+        """
+        Cache a scan this process just claimed (the document as claimed).
+        """
+        self.live[doc["id"]] = dict(doc)
+        self.done.pop(doc["id"], None)
+
+    def renew(self, scan_id: str, lease_until: datetime):
+        doc = self.live.get(scan_id)
+        if doc is not None:
+            doc["lease_until"] = lease_until
+
+    def forget(self, scan_id: str):
+        """
+        The lease is gone (taken over or handed back): drop the cached copy
+        and any changes not written yet, which would overwrite the new owner's.
+        """
+        self.live.pop(scan_id, None)
+        delta = self.pending.pop(scan_id, None)
+        if delta:
+            self.pending_changes -= delta.changes
+
+    def _remember(self, doc: dict):
+        self.done[doc["id"]] = doc
+        self.done.move_to_end(doc["id"])
+        while len(self.done) > self.cache_size:
+            self.done.popitem(last=False)
+
+    def _cached(self, scan_id: str) -> Optional[dict]:
+        doc = self.live.get(scan_id)
+        if doc is not None:
+            until = doc.get("lease_until")
+            if until and until > datetime.utcnow():
+                return doc
+            # Lease ran out: someone else may have the scan now
+            del self.live[scan_id]
+        doc = self.done.get(scan_id)
+        if doc is not None:
+            self.done.move_to_end(scan_id)
+        return doc
+
+    async def get(self, scan_id: str) -> Optional[dict]:
+        doc = self._cached(scan_id)
+        if doc is not None:
+            self.hits += 1
+            return dict(doc)
+        self.misses += 1
+        doc = await self.backend.find_one(scan_id)
+        if doc and doc.get("status") in TERMINAL_STATUSES:
+            self._remember(dict(doc))
+        return doc
+
+    def _apply(self, scan_id: str, update: dict, query: Optional[dict] = None):
+        doc = self.live.get(scan_id)
+        if doc is not None and (query is None or matches(doc, query)):
+            apply_update(doc, update)
+            if doc.get("status") in TERMINAL_STATUSES:
+                self._remember(self.live.pop(scan_id))
+        else:
+            # Not ours to predict; read it back next time
+            self.live.pop(scan_id, None)
+            self.done.pop(scan_id, None)
+
+    # Buffered writes
+
+    async def add_to_set(self, scan_id: str, field: str, items: Iterable):
+        items = list(items)
+        self._apply(scan_id, {"$addToSet": {field: {"$each": items}}})
+        self.pending.setdefault(scan_id, _Delta()).add_to_set(field, items)
+        self.pending_changes += len(items)
+        if self.pending_changes >= self.max_changes:
+            await self.flush()
+        else:
+            self._schedule()
+
+    async def write(self, query: dict, update: dict):
+        """
+        Write one operation now, after the changes buffered for its scan.
+        """
+        self._apply(query["id"], update, query)
+        await self.flush([query["id"]], [(query, update)])
+
+    def _schedule(self):
+        self._bind_loop()
+        if self._timer is None:
+            self._timer = self._loop.call_later(self.interval, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self._timed_flush())
+
+    async def _timed_flush(self):
+        try:
+            await self.flush()
+        except Exception:
+            pass  # logged by flush(); the changes are retried next time
+
+    async def flush(self, scan_ids: Optional[Iterable[str]] = None, extra: Iterable[Operation] = ()):
+        """
+        Write the buffered changes (of `scan_ids`, or all) and `extra` as one
+        ordered bulk write.
+        """
+        self._bind_loop()
+        async with self._lock:
+            ids = list(self.pending) if scan_ids is None else [i for i in scan_ids if i in self.pending]
+            deltas = {scan_id: self.pending.pop(scan_id) for scan_id in ids}
+            operations = [({"id": scan_id}, delta.update()) for scan_id, delta in deltas.items()]
+            operations += list(extra)
+            if not operations:
+                return
+            changes = sum(delta.changes for delta in deltas.values())
+            self.pending_changes -= changes
+            start = time.perf_counter()
+            try:
+                await self.backend.bulk_write(operations)
+            except Exception as e:
+                print(f"Result write failed ({len(operations)} operations): {e}")
+                ERRORS.inc(component="persistence")
+                PERSIST_FLUSH_SECONDS.observe(time.perf_counter() - start, result="failed")
+                # Back in front of whatever was buffered meanwhile
+                for scan_id, delta in deltas.items():
+                    newer = self.pending.get(scan_id)
+                    if newer:
+                        delta.merge(newer)
+                    self.pending[scan_id] = delta
+                self.pending_changes += changes
+                for query, _ in extra:
+                    # The cached copy already has the write that failed
+                    self.live.pop(query["id"], None)
+                    self.done.pop(query["id"], None)
+                self._schedule()
+                raise
+            self.flushes += 1
+            PERSIST_FLUSH_SECONDS.observe(time.perf_counter() - start, result="ok")
+            PERSIST_BATCH_OPERATIONS.observe(len(operations))
+            PERSIST_BATCH_CHANGES.observe(changes)
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self.live),
+            "cached": len(self.done),
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending_changes": self.pending_changes,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,30 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Async token bucket. `rate` is tokens per second, `burst` the bucket size.
+    A rate of None/0 disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[int] = None):
+        self.rate = rate or 0
+        self.burst = burst or max(1, int(self.rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1):
+        if not self.rate:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
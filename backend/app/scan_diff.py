@@ -0,0 +1,32 @@
+from typing import Dict, List, Set
+
+DIFF_FIELDS = ("subdomains", "ports", "directories", "technologies")
+
+
+def _keys(doc: dict, field: str) -> Set[str]:
+    if field == "subdomains":
+        # Live hosts when known, so subdomains that stopped resolving count as removed
+        if doc.get("hosts") is not None:
+            return set(doc["hosts"])
+        return set((doc.get("subdomains") or {}).get("subdomains") or [])
+    if field == "ports":
+        return {f"{host['ip']}:{port}" for host in doc.get("ports") or [] for port in host.get("ports") or []}
+    if field == "directories":
+        # "url (Status: N)" -> url
+        return {entry.split(" (Status:")[0] for entry in doc.get("directories") or []}
+    return set(doc.get(field) or [])
+
+
+def diff_scans(old: dict, new: dict) -> Dict[str, Dict[str, List[str]]]:
+    """
+    What appeared and disappeared between two scan results of one domain.
+    Fields the new scan did not collect (see scan_types) are left out.
+    """
+    diff = {}
+    for field in DIFF_FIELDS:
+        sources = ("hosts", field) if field == "subdomains" else (field,)
+        if all(new.get(source) is None for source in sources):
+            continue
+        before, after = _keys(old, field), _keys(new, field)
+        diff[field] = {"added": sorted(after - before), "removed": sorted(before - after)}
+    return diff
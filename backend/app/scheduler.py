@@ -0,0 +1,122 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .metrics import ERRORS
+
+
+class Stage:
+    """
+    A single recon step. `func` is awaited with the shared scan context once
+    every stage named in `depends` has finished. `outputs` names the context
+    fields the stage fills in.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Awaitable[None]], depends: Iterable[str] = (),
+                 outputs: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+        self.outputs = tuple(outputs)
+
+
+class StageScheduler:
+    """
+    Runs stages as a DAG: every stage starts as soon as its dependencies are
+    done, so independent stages overlap and total latency is bounded by the
+    slowest dependency chain instead of the sum of all stages.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Stage dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage dependency: {name}")
+            state[name] = 1
+            for dep in self.stages[name].depends:
+                visit(dep, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def only(self, names: Iterable[str]) -> "StageScheduler":
+        """
+        A scheduler with just the named stages and everything they depend on.
+        """
+        keep = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name not in keep:
+                keep.add(name)
+                pending.extend(self.stages[name].depends)
+        return StageScheduler([self.stages[name] for name in self.order if name in keep])
+
+    async def run(self, ctx: Any, on_event: Optional[Callable[[Stage, dict], Awaitable[None]]] = None,
+                  completed: Iterable[str] = ()) -> Dict[str, float]:
+        """
+        Execute all stages and return {stage_name: wall_time_seconds}.
+        A failing stage is recorded and its dependents are skipped; unrelated
+        stages keep running. `on_event` is awaited with stage_started,
+        stage_finished and stage_skipped events. Stages named in `completed`
+        (restored from a checkpoint) are not run again.
+        """
+        completed = set(completed)
+        timings: Dict[str, float] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def emit(stage: Stage, event: dict):
+            if on_event:
+                try:
+                    await on_event(stage, {"stage": stage.name, **event})
+                except Exception as e:
+                    print(f"Stage event handler failed: {e}")
+                    ERRORS.inc(component="scheduler")
+
+        async def run_stage(stage: Stage):
+            if stage.depends:
+                try:
+                    await asyncio.gather(*(tasks[dep] for dep in stage.depends))
+                except Exception:
+                    await emit(stage, {"type": "stage_skipped"})
+                    raise
+            if stage.name in completed:
+                await emit(stage, {"type": "stage_finished", "seconds": 0.0, "ok": True, "restored": True})
+                return
+            await emit(stage, {"type": "stage_started"})
+            start = time.perf_counter()
+            try:
+                await stage.func(ctx)
+            except Exception as e:
+                print(f"Stage '{stage.name}' failed: {e}")
+                timings[stage.name] = round(time.perf_counter() - start, 3)
+                await emit(stage, {"type": "stage_finished", "seconds": timings[stage.name], "ok": False, "error": str(e)})
+                raise
+            # A cancelled stage (worker shutting down) reports nothing
+            timings[stage.name] = round(time.perf_counter() - start, 3)
+            await emit(stage, {"type": "stage_finished", "seconds": timings[stage.name], "ok": True})
+
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(run_stage(self.stages[name]))
+
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        return timings
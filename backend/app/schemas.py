@@ -1,29 +1,110 @@
 from pydantic import BaseModel, HttpUrl
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime
 
 class ScanRequest(BaseModel):
     domain: str
-    scan_types: List[str] = ["subdomains", "ports", "osint"]  # default to all
+    scan_types: List[str] = ["all"]  # or any of subdomains, ports, osint, directories, screenshots, vulnerabilities
+    ports: Optional[str] = None  # e.g. "1-65535"; defaults to common ports
+    incremental: bool = False  # re-check only what changed since the last scan of the domain
+
+class CampaignRequest(BaseModel):
+    domains: List[str]
+    scan_types: List[str] = ["all"]
+    ports: Optional[str] = None
+    incremental: bool = False
+
+class CampaignStatus(BaseModel):
+    id: str
+    total: int
+    pending: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    progress: float = 0.0 # finished (completed or failed) / total
+    done: bool = False
+    invalid: List[str] = [] # entries of the request that were not domains (creation only)
 
 class SubdomainResult(BaseModel):
     subdomains: List[str]
     count: int
 
+class ServiceInfo(BaseModel):
+    service: Optional[str] = None
+    product: Optional[str] = None
+    version: Optional[str] = None
+    tls_version: Optional[str] = None
+    tls_cn: Optional[str] = None
+    tls_san: Optional[List[str]] = None
+
 class PortResult(BaseModel):
     ip: str
     ports: List[int]
-    banners: Optional[Dict[str, str]] = None
+    banners: Optional[Dict[str, str]] = None # port -> raw banner
+    services: Optional[Dict[str, ServiceInfo]] = None # port -> fingerprint
+
+class ScreenshotRef(BaseModel):
+    blob: str # id of the full-size image, served by /api/blobs/{id}
+    thumbnail: Optional[str] = None
+    size: int = 0
+
+class FieldDiff(BaseModel):
+    added: List[str] = []
+    removed: List[str] = []
+
+class ScanDiff(BaseModel):
+    subdomains: FieldDiff = FieldDiff()
+    ports: FieldDiff = FieldDiff() # "ip:port"
+    directories: FieldDiff = FieldDiff() # URLs
+    technologies: FieldDiff = FieldDiff()
+
+class Technology(BaseModel):
+    name: str
+    version: Optional[str] = None
+    categories: List[str] = []
+    hosts: List[str] = [] # live hosts it was detected on
+
+class Vulnerability(BaseModel):
+    id: str # CVE id
+    product: str
+    version: Optional[str] = None
+    score: Optional[float] = None # CVSS base score
+    severity: Optional[str] = None
+    summary: str = ""
+    targets: List[str] = [] # hosts or ip:port where the version was seen
 
 class ScanResult(BaseModel):
     id: str
     domain: str
     status: str = "pending"
     timestamp: datetime
+    scan_types: Optional[List[str]] = None
+    campaign_id: Optional[str] = None # set for scans submitted as part of a campaign
     subdomains: Optional[SubdomainResult] = None
     ports: Optional[List[PortResult]] = None
     technologies: Optional[List[str]] = None
+    tech_stack: Optional[List[Technology]] = None
     directories: Optional[List[str]] = None
-    screenshots: Optional[Dict[str, str]] = None # subdomain -> b64
-    vulnerabilities: Optional[List[str]] = None
+    screenshots: Optional[Dict[str, Union[ScreenshotRef, str]]] = None # subdomain -> blob refs (b64 in old scans)
+    vulnerabilities: Optional[List[Union[Vulnerability, str]]] = None # plain strings in old scans
+    stage_timings: Optional[Dict[str, float]] = None # stage -> wall time (s)
+    metrics: Optional[Dict[str, float]] = None # counter -> value for this scan (dns_queries, http_errors.timeout...)
+    baseline_id: Optional[str] = None # previous scan an incremental scan was compared to
+    diff: Optional[ScanDiff] = None
+
+class ScanSummary(BaseModel):
+    id: str
+    domain: str
+    status: str
+    timestamp: datetime
+    campaign_id: Optional[str] = None
+    subdomain_count: int = 0
+    port_count: int = 0
+    technology_count: int = 0
+    directory_count: int = 0
+    screenshot_count: int = 0
+    vulnerability_count: int = 0
 
+class ScanPage(BaseModel):
+    items: List[ScanSummary]
+    next_cursor: Optional[str] = None # pass back as ?cursor= for the next page
@@ -0,0 +1,239 @@
+import asyncio
+import re
+import ssl
+from typing import Dict, List, Optional, Tuple
+
+from ..schemas import PortResult, ServiceInfo
+
+
+TLS_PORTS = {443, 465, 636, 853, 993, 995, 8443, 9443}
+HTTP_PORTS = {80, 81, 443, 591, 3000, 5000, 8000, 8008, 8080, 8081, 8443, 8888, 9443}
+# Protocols where the server speaks first
+GREETING_PORTS = {21, 22, 23, 25, 110, 143, 465, 587, 993, 995, 3306, 5900}
+
+REDIS_PING = b"*1\r\n$4\r\nPING\r\n"
+
+# Recon needs the certificate even when it does not validate
+TLS_CONTEXT = ssl.create_default_context()
+TLS_CONTEXT.check_hostname = False
+TLS_CONTEXT.verify_mode = ssl.CERT_NONE
+
+# (service, product, regex). A named group "version" is extracted when present.
+SIGNATURES: List[Tuple[str, str, str]] = [
+    ("ssh", "OpenSSH", r"^SSH-[\d.]+-OpenSSH_(?P<version>[\w.]+)"),
+    ("ssh", "Dropbear", r"^SSH-[\d.]+-dropbear_(?P<version>[\w.]+)"),
+    ("ssh", "SSH", r"^SSH-[\d.]+-"),
+    ("ftp", "vsftpd", r"^220[ -].*vsFTPd (?P<version>[\d.]+)"),
+    ("ftp", "ProFTPD", r"^220[ -].*ProFTPD (?P<version>[\d.]+)"),
+    ("ftp", "Pure-FTPd", r"^220[ -].*Pure-FTPd"),
+    ("ftp", "FileZilla Server", r"^220[ -].*FileZilla Server(?: version)? (?P<version>[\d.]+)"),
+    ("smtp", "Postfix", r"^220[ -].*ESMTP Postfix"),
+    ("smtp", "Exim", r"^220[ -].*Exim (?P<version>[\d.]+)"),
+    ("smtp", "Microsoft Exchange", r"^220[ -].*Microsoft ESMTP"),
+    ("smtp", "SMTP", r"^220[ -].*(?:E?SMTP|mail)"),
+    ("ftp", "FTP", r"^220[ -]"),
+    ("pop3", "Dovecot", r"^\+OK.*Dovecot"),
+    ("pop3", "POP3", r"^\+OK"),
+    ("imap", "Dovecot", r"^\* OK.*Dovecot"),
+    ("imap", "IMAP", r"^\* OK"),
+    ("redis", "Redis", r"^\+PONG|^-NOAUTH|^-DENIED"),
+    ("mysql", "MySQL", r"^.{4}\n(?P<version>\d+\.\d+\.\d+)"),
+    ("vnc", "VNC", r"^RFB (?P<version>\d{3}\.\d{3})"),
+    ("http", "nginx", r"^HTTP/[\d.]+ \d+.*?\r\nServer: nginx/?(?P<version>[\d.]*)"),
+    ("http", "Apache httpd", r"^HTTP/[\d.]+ \d+.*?\r\nServer: Apache/?(?P<version>[\d.]*)"),
+    ("http", "Microsoft IIS", r"^HTTP/[\d.]+ \d+.*?\r\nServer: Microsoft-IIS/(?P<version>[\d.]+)"),
+    ("http", "lighttpd", r"^HTTP/[\d.]+ \d+.*?\r\nServer: lighttpd/(?P<version>[\d.]+)"),
+    ("http", "HTTP", r"^HTTP/[\d.]+ \d+"),
+]
+
+
+def _compile_signatures(signatures):
+    """
+    Fold the whole table into one alternation so each banner is matched in a
+    single regex pass; per-signature group names map back to the table.
+    """
+    parts = []
+    for i, (_, _, pattern) in enumerate(signatures):
+        pattern = pattern.replace("(?P<version>", f"(?P<v{i}>")
+        parts.append(f"(?P<s{i}>{pattern})")
+    return re.compile("|".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+SIGNATURE_RE = _compile_signatures(SIGNATURES)
+
+
+def match_banner(banner: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Return (service, product, version) for the first signature that matches.
+    """
+    m = SIGNATURE_RE.match(banner)
+    if not m:
+        return None
+    # The outer s<i> group closes last, so it is always lastgroup
+    index = int(m.lastgroup[1:])
+    service, product, _ = SIGNATURES[index]
+    version = m.groupdict().get(f"v{index}") or None
+    return service, product, version
+
+
+def _der_read(data: bytes, pos: int) -> Tuple[int, int, int]:
+    """
+    Read one DER TLV header at `pos`; returns (tag, content_start, content_end).
+    """
+    tag = data[pos]
+    length = data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        count = length & 0x7F
+        length = int.from_bytes(data[pos:pos + count], "big")
+        pos += count
+    return tag, pos, pos + length
+
+
+def _der_children(data: bytes, start: int, end: int):
+    pos = start
+    while pos < end:
+        tag, cstart, cend = _der_read(data, pos)
+        yield tag, cstart, cend
+        pos = cend
+
+
+OID_COMMON_NAME = bytes([0x55, 0x04, 0x03])
+OID_SUBJECT_ALT_NAME = bytes([0x55, 0x1D, 0x11])
+
+
+def parse_certificate_names(der: bytes) -> Tuple[Optional[str], List[str]]:
+    """
+    Pull the subject CN and the SAN dNSNames out of a DER certificate without
+    needing a full X.509 library. getpeercert() returns nothing useful when
+    verification is off, which it has to be for recon.
+    """
+    common_name, alt_names = None, []
+    try:
+        _, cert_start, cert_end = _der_read(der, 0)
+        _, tbs_start, tbs_end = _der_read(der, cert_start)
+        fields = list(_der_children(der, tbs_start, tbs_end))
+        if fields and fields[0][0] == 0xA0:  # explicit version
+            fields = fields[1:]
+        # serial, signature, issuer, validity, subject, spki, [extensions...]
+        _, subj_start, subj_end = fields[4]
+        for _, set_start, set_end in _der_children(der, subj_start, subj_end):
+            for _, atv_start, atv_end in _der_children(der, set_start, set_end):
+                (oid_tag, oid_start, oid_end), (_, val_start, val_end) = list(_der_children(der, atv_start, atv_end))[:2]
+                if der[oid_start:oid_end] == OID_COMMON_NAME:
+                    common_name = der[val_start:val_end].decode("utf-8", "replace")
+        for tag, ext_start, ext_end in fields[6:]:
+            if tag != 0xA3:
+                continue
+            _, seq_start, seq_end = _der_read(der, ext_start)
+            for _, e_start, e_end in _der_children(der, seq_start, seq_end):
+                parts = list(_der_children(der, e_start, e_end))
+                if der[parts[0][1]:parts[0][2]] != OID_SUBJECT_ALT_NAME:
+                    continue
+                _, octet_start, octet_end = parts[-1]
+                _, names_start, names_end = _der_read(der, octet_start)
+                for name_tag, n_start, n_end in _der_children(der, names_start, names_end):
+                    if name_tag == 0x82:  # dNSName
+                        alt_names.append(der[n_start:n_end].decode("ascii", "replace"))
+    except (IndexError, ValueError):
+        pass
+    return common_name, alt_names
+
+
+class BannerService:
+    """
+    Concurrent banner grabbing and service fingerprinting for open ports.
+    """
+
+    @staticmethod
+    async def _read(reader: asyncio.StreamReader, timeout: float, limit: int = 2048) -> bytes:
+        try:
+            return await asyncio.wait_for(reader.read(limit), timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return b""
+
+    @staticmethod
+    async def grab(ip: str, port: int, hostname: Optional[str] = None, timeout: float = 3.0,
+                   tls: Optional[bool] = None) -> Optional[Tuple[str, ServiceInfo]]:
+        """
+        Connect to one port, send the probe that fits it and fingerprint the
+        reply. Returns (raw_banner, ServiceInfo) or None if nothing answered.
+        """
+        use_tls = port in TLS_PORTS if tls is None else tls
+        ssl_ctx = TLS_CONTEXT if use_tls else None
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port, ssl=ssl_ctx, server_hostname=(hostname or ip) if use_tls else None),
+                timeout,
+            )
+        except (OSError, asyncio.TimeoutError, ssl.SSLError):
+            return None
+
+        info = ServiceInfo()
+        try:
+            if use_tls:
+                ssl_object = writer.get_extra_info("ssl_object")
+                der = ssl_object.getpeercert(binary_form=True) if ssl_object else None
+                if der:
+                    info.tls_cn, info.tls_san = parse_certificate_names(der)
+                info.tls_version = ssl_object.version() if ssl_object else None
+
+            data = b""
+            if port in GREETING_PORTS or port not in HTTP_PORTS | {6379}:
+                data = await BannerService._read(reader, timeout / 2)
+            if not data:
+                if port == 6379:
+                    writer.write(REDIS_PING)
+                else:
+                    writer.write(f"HEAD / HTTP/1.0\r\nHost: {hostname or ip}\r\nUser-Agent: Mozilla/5.0\r\n\r\n".encode())
+                await writer.drain()
+                data = await BannerService._read(reader, timeout / 2)
+        except (OSError, ssl.SSLError):
+            data = b""
+        finally:
+            writer.close()
+
+        banner = data.decode("latin-1", "replace").strip()
+        if not banner and not info.tls_cn:
+            return None
+        match = match_banner(banner) if banner else None
+        if match:
+            info.service, info.product, info.version = match
+        elif use_tls:
+            info.service = "tls"
+        if use_tls and info.service == "http":
+            info.service = "https"
+        return banner[:512], info
+
+    @staticmethod
+    async def grab_banners(ports: List[PortResult], hostnames: Optional[Dict[str, str]] = None,
+                           concurrency: int = 100, budget: float = 30.0):
+        """
+        Fill `banners` and `services` on every PortResult in place. All hosts
+        are probed in parallel through one bounded pool; anything still
+        running when the time budget is spent is cancelled.
+        """
+        hostnames = hostnames or {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def probe(result: PortResult, port: int):
+            async with semaphore:
+                grabbed = await BannerService.grab(result.ip, port, hostnames.get(result.ip))
+            if grabbed:
+                banner, info = grabbed
+                if result.banners is None:
+                    result.banners = {}
+                if result.services is None:
+                    result.services = {}
+                result.banners[str(port)] = banner
+                result.services[str(port)] = info
+
+        tasks = [asyncio.ensure_future(probe(r, p)) for r in ports for p in r.ports]
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f"Banner grabbing budget exhausted, {len(pending)} probes cancelled.")
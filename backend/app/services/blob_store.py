@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+from typing import AsyncIterator, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are skipped without Pillow
+    Image = None
+
+BLOB_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (320, 180)
+DEFAULT_BLOB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "blobs")
+
+
+def blob_id(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def content_type(head: bytes) -> str:
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    return "application/octet-stream"
+
+
+def make_thumbnail(data: bytes, size=THUMBNAIL_SIZE, quality: int = 60) -> Optional[bytes]:
+    """
+    Downscaled JPEG copy of an image, or None when Pillow is missing or the
+    image cannot be decoded.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(size)
+            out = io.BytesIO()
+            image.convert("RGB").save(out, format="JPEG", quality=quality)
+            return out.getvalue()
+    except Exception as e:
+        print(f"Thumbnail failed: {e}")
+        return None
+
+
+class FileBlobStore:
+    """
+    Content-addressed blobs on the local filesystem, sharded by the first two
+    hex digits of the SHA-256 id. Writing the same bytes twice stores them once.
+    """
+
+    def __init__(self, root: str = DEFAULT_BLOB_DIR):
+        self.root = root
+
+    def _path(self, bid: str) -> str:
+        return os.path.join(self.root, bid[:2], bid)
+
+    def _write(self, bid: str, data: bytes):
+        path = self._path(bid)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def put(self, data: bytes) -> str:
+        bid = blob_id(data)
+        await asyncio.to_thread(self._write, bid, data)
+        return bid
+
+    async def size(self, bid: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self._path(bid))
+        except OSError:
+            return None
+
+    async def open(self, bid: str) -> AsyncIterator[bytes]:
+        with open(self._path(bid), "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class GridFSBlobStore:
+    """
+    Same interface backed by a GridFS bucket, with the blob id as the file _id.
+    """
+
+    def __init__(self, db, bucket_name: str = "blobs"):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    async def put(self, data: bytes) -> str:
+        from pymongo.errors import DuplicateKeyError
+        bid = blob_id(data)
+        if await self.files.find_one({"_id": bid}, {"_id": 1}):
+            return bid
+        try:
+            await self.bucket.upload_from_stream_with_id(bid, bid, data)
+        except DuplicateKeyError:
+            pass
+        return bid
+
+    async def size(self, bid: str) -> Optional[int]:
+        doc = await self.files.find_one({"_id": bid}, {"length": 1})
+        return doc["length"] if doc else None
+
+    async def open(self, bid: str) -> AsyncIterator[bytes]:
+        stream = await self.bucket.open_download_stream(bid)
+        while True:
+            chunk = await stream.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+
+_store = None
+
+
+def get_blob_store():
+    """
+    Process-wide store: GridFS when RECON_BLOB_BACKEND=gridfs, otherwise the
+    filesystem under RECON_BLOB_DIR.
+    """
+    global _store
+    if _store is None:
+        if os.environ.get("RECON_BLOB_BACKEND", "fs") == "gridfs":
+            from ..database import db
+            _store = GridFSBlobStore(db)
+        else:
+            _store = FileBlobStore(os.environ.get("RECON_BLOB_DIR", DEFAULT_BLOB_DIR))
+    return _store
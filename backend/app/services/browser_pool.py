@@ -0,0 +1,153 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+from ..metrics import SCREENSHOTS
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium shared by every scan. `tabs` workers each
+    own a browser context with one reusable page and pull capture jobs from
+    a single queue, so concurrent scans share the same capacity. If the
+    browser crashes it is relaunched and the interrupted job retried once.
+    """
+
+    def __init__(self, tabs: int = 8, timeout_ms: int = 10000, viewport: Tuple[int, int] = (1280, 720), quality: int = 50):
+        self.tabs = tabs
+        self.timeout_ms = timeout_ms
+        self.viewport = {"width": viewport[0], "height": viewport[1]}
+        self.quality = quality
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.playwright = None
+        self.browser: Optional[Browser] = None
+        self.generation = 0  # bumped on every (re)launch
+        self.workers: List[asyncio.Task] = []
+        self.running = False
+        self.relaunches = 0
+        self.captured = 0
+        self._launch_lock = asyncio.Lock()
+
+    async def start(self):
+        if self.running:
+            return
+        self.playwright = await async_playwright().start()
+        try:
+            await self._launch()
+        except Exception:
+            await self.playwright.stop()
+            self.playwright = None
+            raise
+        self.running = True
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(self.tabs)]
+        print(f"Browser pool started with {self.tabs} tabs.")
+
+    async def stop(self):
+        self.running = False
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        if self.browser:
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def _launch(self):
+        self.browser = await self.playwright.chromium.launch(headless=True)
+        self.browser.on("disconnected", self._on_disconnected)
+        self.generation += 1
+
+    def _on_disconnected(self, browser: Browser):
+        # Relaunch right away instead of waiting for the next job to fail
+        if self.running and browser is self.browser:
+            print("Browser disconnected.")
+            asyncio.ensure_future(self._relaunch())
+
+    async def _relaunch(self):
+        try:
+            await self._ensure_browser()
+        except Exception as e:
+            print(f"Browser relaunch failed: {e}")
+
+    async def _ensure_browser(self):
+        """
+        Relaunch the browser if it died. Only the first worker to notice does
+        the relaunch; the rest see a connected browser and only reopen their tab.
+        """
+        async with self._launch_lock:
+            if self.browser and self.browser.is_connected():
+                return
+            print("Relaunching browser...")
+            self.relaunches += 1
+            await self._launch()
+
+    async def _new_tab(self) -> Tuple[int, BrowserContext, Page]:
+        generation = self.generation
+        context = await self.browser.new_context(viewport=self.viewport, ignore_https_errors=True)
+        page = await context.new_page()
+        return generation, context, page
+
+    async def _worker(self):
+        generation, context, page = 0, None, None
+        while True:
+            url, future = await self.queue.get()
+            if future.done():
+                continue
+            error: Optional[BaseException] = None
+            for attempt in range(2):
+                try:
+                    if page is None or page.is_closed() or generation != self.generation:
+                        if context:
+                            try:
+                                await context.close()
+                            except Exception:
+                                pass
+                        generation, context, page = await self._new_tab()
+                    await page.goto(url, timeout=self.timeout_ms, wait_until="domcontentloaded")
+                    image = await page.screenshot(type="jpeg", quality=self.quality)
+                    self.captured += 1
+                    if not future.done():
+                        future.set_result(image)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    if self.browser is not None and self.browser.is_connected():
+                        # The page failed (timeout, DNS, ...), not the browser
+                        break
+                    # Crash: relaunch and retry this job once on a fresh tab
+                    context, page = None, None
+                    try:
+                        await self._ensure_browser()
+                    except Exception as launch_error:
+                        error = launch_error
+                        break
+            if error is not None and not future.done():
+                future.set_exception(error)
+
+    async def capture(self, url: str) -> bytes:
+        """
+        Queue a screenshot job and wait for the JPEG bytes.
+        """
+        if not self.running:
+            raise RuntimeError("Browser pool is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((url, future))
+        try:
+            image = await future
+        except Exception:
+            SCREENSHOTS.inc(result="failed")
+            raise
+        SCREENSHOTS.inc(result="ok")
+        return image
@@ -0,0 +1,175 @@
+import asyncio
+import errno
+import socket
+import struct
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from ..metrics import CONNECT_ATTEMPTS, CONNECT_TIMEOUTS
+from ..schemas import PortResult
+from ..streams import bounded_map
+
+# Seconds to wait before retrying a probe that could not get a socket
+SOCKET_BACKOFF = 0.05
+
+
+def parse_ports(spec: str) -> List[int]:
+    """
+    Parse a port spec such as "22,80,8000-8100" or "1-65535" into a sorted list.
+    """
+    ports = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            low, high = part.split("-", 1)
+            low, high = int(low or 1), int(high or 65535)
+        else:
+            low = high = int(part)
+        if not 1 <= low <= high <= 65535:
+            raise ValueError(f"Invalid port range: {part}")
+        ports.update(range(low, high + 1))
+    return sorted(ports)
+
+
+class _HostState:
+    """
+    Smoothed RTT estimate per host (RFC 6298 style). Both accepted and
+    refused connects are full round trips, so both feed the estimate.
+    """
+
+    def __init__(self, initial_timeout: float):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.initial_timeout = initial_timeout
+        self.open_ports: List[int] = []
+        self.remaining = 0
+
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, minimum: float, maximum: float) -> float:
+        if self.srtt is None:
+            return self.initial_timeout
+        return min(maximum, max(minimum, self.srtt + 4 * self.rttvar))
+
+
+class ConnectScanner:
+    """
+    Asyncio TCP connect scanner. Probes are interleaved across hosts, the
+    number of open sockets is capped, and each host gets its own timeout
+    derived from the RTTs measured so far. A probe that times out is tried
+    once more with `max_timeout` before the port counts as closed, since a
+    busy host (or a busy scanner) can be slower than the estimate. Nothing
+    here touches global socket state (no setdefaulttimeout).
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 2000,
+        timeout: float = 1.0,
+        min_timeout: float = 0.25,
+        max_timeout: float = 3.0,
+    ):
+        self.concurrency = min(concurrency, self._fd_budget())
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.probes = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.socket_errors = 0
+
+    @staticmethod
+    def _fd_budget() -> int:
+        try:
+            import resource  # not available on Windows
+            soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+            return max(16, soft - 128)
+        except Exception:
+            return 1000
+
+    async def _probe(self, ip: str, port: int, host: _HostState, timeout: Optional[float] = None) -> Optional[bool]:
+        """
+        True if the port accepted, False if it refused (or is unreachable),
+        None if it did not answer within the timeout or no socket could be
+        opened for it.
+        """
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        sock = None
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            # RST on close: no TIME_WAIT pile-up during large scans
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except OSError:
+            # Out of file descriptors (EMFILE/ENFILE) or buffers: give the
+            # probes in flight a moment to close theirs; the caller retries
+            if sock is not None:
+                sock.close()
+            self.socket_errors += 1
+            await asyncio.sleep(SOCKET_BACKOFF)
+            return None
+        self.probes += 1
+        CONNECT_ATTEMPTS.inc()
+        start = loop.time()
+        try:
+            if timeout is None:
+                timeout = host.timeout(self.min_timeout, self.max_timeout)
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+            host.observe(loop.time() - start)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            CONNECT_TIMEOUTS.inc()
+            return None
+        except ConnectionRefusedError:
+            host.observe(loop.time() - start)
+            return False
+        except OSError as e:
+            if e.errno == errno.ECONNREFUSED:
+                host.observe(loop.time() - start)
+            return False
+        finally:
+            sock.close()
+
+    async def scan(self, ips: Iterable[str], ports: Iterable[int]) -> AsyncIterator[PortResult]:
+        """
+        Scan every (ip, port) pair and yield one PortResult per host as soon
+        as all of that host's probes have finished.
+        """
+        ips = list(dict.fromkeys(ips))
+        ports = list(ports)
+        if not ips or not ports:
+            return
+        hosts: Dict[str, _HostState] = {}
+        for ip in ips:
+            hosts[ip] = _HostState(self.timeout)
+            hosts[ip].remaining = len(ports)
+
+        async def probe(item) -> Optional[PortResult]:
+            ip, port = item
+            host = hosts[ip]
+            found = await self._probe(ip, port, host)
+            if found is None:
+                self.retries += 1
+                found = await self._probe(ip, port, host, self.max_timeout)
+            if found:
+                host.open_ports.append(port)
+            host.remaining -= 1
+            if host.remaining == 0:
+                return PortResult(ip=ip, ports=sorted(host.open_ports))
+            return None
+
+        # Port-major order spreads consecutive probes over different hosts
+        work = ((ip, port) for port in ports for ip in ips)
+        async for result in bounded_map(work, probe, min(self.concurrency, len(ips) * len(ports))):
+            yield result
+        if self.socket_errors:
+            print(f"Connect scan: {self.socket_errors} probes could not open a socket")
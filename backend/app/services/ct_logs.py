@@ -0,0 +1,177 @@
+import codecs
+import json
+import os
+from typing import Any, Iterable, Iterator, List, Optional, Set
+
+import requests
+
+from ..metrics import CT_QUERIES
+
+# Overridable with RECON_CRTSH_URL / RECON_CERTSPOTTER_URL (mirrors, local stand-ins)
+CRTSH_URL = "https://crt.sh/"
+CERTSPOTTER_URL = "https://api.certspotter.com/v1/issuances"
+CHUNK_SIZE = 64 * 1024
+# Certspotter pages are 100 issuances; stop a runaway pagination somewhere
+MAX_PAGES = 200
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array as its bytes arrive, holding
+    only the current element (plus one chunk) in memory.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            # Skip whitespace and separators up to the next value
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element continues in the next chunk
+                break
+            # A number cut off by the chunk boundary still decodes; wait for more
+            if end == len(buffer) and not isinstance(value, (dict, list, str)):
+                break
+            yield value
+            pos = end
+    if not started:
+        raise ValueError("Empty response")
+    if buffer[pos:].strip() not in ("", "]"):
+        raise ValueError("Truncated JSON array")
+
+
+def normalize_name(name: str, domain: str) -> Optional[str]:
+    """
+    Lowercased hostname under `domain`, or None for anything else (names of
+    other domains on the same certificate, e-mail addresses). Wildcard
+    entries count as their parent name.
+    """
+    name = name.strip().lower().rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]
+    if not name or "*" in name or "@" in name or " " in name:
+        return None
+    if name != domain and not name.endswith("." + domain):
+        return None
+    return name
+
+
+class NameSet:
+    """
+    Deduplicated names under one domain, stored as their label prefix only
+    ("www" for www.example.com) so millions of entries stay small.
+    """
+
+    def __init__(self, domain: str):
+        self.domain = domain.lower()
+        self._suffix_len = len(self.domain) + 1
+        self._prefixes: Set[str] = set()
+        self.apex = False
+
+    def add(self, name: str):
+        name = normalize_name(name, self.domain)
+        if name is None:
+            return
+        if name == self.domain:
+            self.apex = True
+        else:
+            self._prefixes.add(name[:-self._suffix_len])
+
+    def __len__(self) -> int:
+        return len(self._prefixes) + self.apex
+
+    def names(self) -> List[str]:
+        names = [f"{prefix}.{self.domain}" for prefix in self._prefixes]
+        if self.apex:
+            names.append(self.domain)
+        return names
+
+
+class CTLogService:
+    """
+    Certificate Transparency sources for subdomain discovery. Each source
+    streams name lists into a NameSet instead of loading whole responses.
+    """
+
+    @staticmethod
+    def crtsh_names(domain: str, session=None) -> Iterator[str]:
+        """
+        crt.sh returns everything in one (possibly huge) JSON array; parse it
+        as it downloads.
+        """
+        session = session or requests
+        params = {"q": f"%.{domain}", "output": "json"}
+        url = os.environ.get("RECON_CRTSH_URL", CRTSH_URL)
+        with session.get(url, params=params, headers=HEADERS, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            for entry in iter_json_array(response.iter_content(CHUNK_SIZE)):
+                yield from (entry.get("name_value") or "").split("\n")
+
+    @staticmethod
+    def certspotter_names(domain: str, session=None) -> Iterator[str]:
+        """
+        Cert Spotter issuances, one page at a time (`after` = last id seen).
+        """
+        session = session or requests
+        params = {"domain": domain, "include_subdomains": "true", "expand": "dns_names"}
+        url = os.environ.get("RECON_CERTSPOTTER_URL", CERTSPOTTER_URL)
+        for _ in range(MAX_PAGES):
+            with session.get(url, params=params, headers=HEADERS, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                last_id = None
+                for issuance in iter_json_array(response.iter_content(CHUNK_SIZE)):
+                    last_id = issuance.get("id")
+                    yield from issuance.get("dns_names") or []
+            if last_id is None:
+                return
+            params["after"] = last_id
+
+    SOURCES = {
+        "crtsh": crtsh_names,
+        "certspotter": certspotter_names,
+    }
+
+    @staticmethod
+    def collect_names(domain: str, sources: Iterable[str] = ("crtsh", "certspotter"), session=None) -> Optional[List[str]]:
+        """
+        Union of all sources. A source failing part way keeps the names it
+        already produced; None means every source failed.
+        """
+        names = NameSet(domain)
+        failures = 0
+        sources = list(sources)
+        for source in sources:
+            before = len(names)
+            try:
+                for name in CTLogService.SOURCES[source](domain, session):
+                    names.add(name)
+            except (requests.RequestException, ValueError) as e:
+                print(f"Error querying {source}: {e}")
+                CT_QUERIES.inc(source=source, result="error")
+                failures += 1
+                continue
+            CT_QUERIES.inc(source=source, result="ok")
+            print(f"{source}: {len(names) - before} new names.")
+        if sources and failures == len(sources):
+            return None
+        return names.names()
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import os
+import random
+import struct
+from typing import AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+
+from ..budgets import get_budget
+from ..metrics import DNS_QUERIES, DNS_RETRIES, DNS_TIMEOUTS
+from ..ratelimit import RateLimiter
+from ..streams import bounded_map
+
+
+class Resolution(NamedTuple):
+    name: str
+    addresses: List[str]
+    cnames: List[str]
+
+
+def build_query(qid: int, name: str, rdtype: int) -> bytes:
+    """
+    Hand-rolled wire format for a single-question recursive query. Much cheaper
+    than dns.message.make_query().to_wire() in the hot loop.
+    """
+    qname = b"".join(
+        bytes([len(label)]) + label for label in name.rstrip(".").encode("idna").split(b".")
+    ) + b"\x00"
+    return struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0) + qname + struct.pack("!HH", rdtype, 1)
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    """
+    One UDP socket multiplexing many outstanding queries, matched on query ID.
+    """
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        qid = struct.unpack("!H", data[:2])[0]
+        future = self.pending.pop(qid, None)
+        if future and not future.done():
+            future.set_result((data, addr))
+
+    def error_received(self, exc):
+        pass
+
+    def new_id(self) -> int:
+        while True:
+            qid = random.getrandbits(16)
+            if qid not in self.pending:
+                return qid
+
+
+class _Unanswered(Exception):
+    """
+    Every attempt timed out or failed (as opposed to a definite answer).
+    """
+
+
+class AsyncResolver:
+    """
+    Asyncio-native stub resolver built for mass resolution: queries are spread
+    over a small pool of UDP sockets, in-flight queries are capped, failed
+    attempts are retried against the next nameserver in the rotation and an
+    optional token bucket limits overall QPS. With a `cache`, answers and
+    NXDOMAINs are reused across lookups (and scans) until they expire.
+    """
+
+    def __init__(
+        self,
+        nameservers: Optional[List[str]] = None,
+        port: Optional[int] = None,
+        concurrency: int = 500,
+        timeout: float = 1.0,
+        retries: int = 2,
+        rate_limit: Optional[float] = None,
+        sockets: int = 4,
+        cache=None,
+    ):
+        # RECON_NAMESERVERS / RECON_DNS_PORT override the system resolvers
+        # (internal DNS, or a local stand-in for benchmarks)
+        if not nameservers and os.environ.get("RECON_NAMESERVERS"):
+            nameservers = [ns.strip() for ns in os.environ["RECON_NAMESERVERS"].split(",") if ns.strip()]
+        port = port or int(os.environ.get("RECON_DNS_PORT", "53"))
+        if not nameservers:
+            try:
+                nameservers = dns.resolver.Resolver().nameservers
+            except Exception:
+                nameservers = []
+        nameservers = nameservers or ["8.8.8.8", "1.1.1.1"]
+        # All sockets share one address family; prefer IPv4 servers when mixed
+        ipv4 = [ns for ns in nameservers if ":" not in ns]
+        self.bind_address = "0.0.0.0" if ipv4 else "::"
+        self.nameservers = [(ns, port) for ns in (ipv4 or nameservers)]
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = RateLimiter(rate_limit, burst=max(1, concurrency // 10))
+        self.socket_count = sockets
+        self.protocols: List[_DnsProtocol] = []
+        self._ns_cycle = itertools.cycle(range(len(self.nameservers)))
+        self._proto_cycle = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.queries_sent = 0
+        self.cache = cache
+
+    async def open(self):
+        if self.protocols:
+            return
+        loop = asyncio.get_running_loop()
+        for _ in range(self.socket_count):
+            _, protocol = await loop.create_datagram_endpoint(
+                _DnsProtocol, local_addr=(self.bind_address, 0)
+            )
+            self.protocols.append(protocol)
+        self._proto_cycle = itertools.cycle(self.protocols)
+
+    async def close(self):
+        for protocol in self.protocols:
+            for future in protocol.pending.values():
+                if not future.done():
+                    future.cancel()
+            if protocol.transport:
+                protocol.transport.close()
+        self.protocols = []
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _query_once(self, name: str, rdtype: int, nameserver) -> Optional[bytes]:
+        protocol = next(self._proto_cycle)
+        qid = protocol.new_id()
+        query = build_query(qid, name, rdtype)
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[qid] = future
+        await self.limiter.acquire()
+        await get_budget("dns").pace()
+        protocol.transport.sendto(query, nameserver)
+        self.queries_sent += 1
+        DNS_QUERIES.inc()
+        try:
+            data, addr = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            DNS_TIMEOUTS.inc()
+            return None
+        finally:
+            protocol.pending.pop(qid, None)
+        return data
+
+    async def resolve(self, name: str, rdtype: str = "A") -> Optional[Resolution]:
+        """
+        Resolve one name. Returns None for NXDOMAIN, empty answers and
+        exhausted retries.
+        """
+        if self.cache is None:
+            return await self._resolve(name, rdtype)
+        try:
+            return await self.cache.get_or_load((name, rdtype), lambda: self._resolve(name, rdtype, strict=True))
+        except _Unanswered:
+            # Timeouts and server failures say nothing about the name; don't cache them
+            return None
+
+    async def _resolve(self, name: str, rdtype: str, strict: bool = False) -> Optional[Resolution]:
+        if not self.protocols:
+            await self.open()
+        qtype = dns.rdatatype.from_text(rdtype)
+        async with self._semaphore, get_budget("dns").slot():
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    DNS_RETRIES.inc()
+                nameserver = self.nameservers[next(self._ns_cycle)]
+                try:
+                    response = await self._query_once(name, qtype, nameserver)
+                except (UnicodeError, ValueError):
+                    # Not a valid DNS name (empty or oversized label)
+                    return None
+                if response is None:
+                    continue
+                # Read the rcode straight from the header; most brute-force
+                # answers are NXDOMAIN and never need a full parse
+                rcode = response[3] & 0x0F
+                if rcode == dns.rcode.NXDOMAIN:
+                    return None
+                if rcode != dns.rcode.NOERROR:
+                    # SERVFAIL/REFUSED: try the next nameserver
+                    continue
+                try:
+                    response = dns.message.from_wire(response)
+                except Exception:
+                    continue
+                addresses, cnames = [], []
+                for rrset in response.answer:
+                    for rdata in rrset:
+                        if rrset.rdtype == dns.rdatatype.CNAME:
+                            cnames.append(rdata.target.to_text().rstrip(".").lower())
+                        elif rrset.rdtype == qtype:
+                            addresses.append(rdata.to_text())
+                if not addresses:
+                    return None
+                return Resolution(name, addresses, cnames)
+        if strict:
+            raise _Unanswered(name)
+        return None
+
+    async def resolve_many(self, names: Iterable[str], rdtype: str = "A",
+                           reject: Optional[Callable[[Resolution], bool]] = None) -> AsyncIterator[Resolution]:
+        """
+        Resolve a (possibly huge, lazily produced) iterable of names and yield
+        hits as soon as they arrive. At most `concurrency` queries are in flight.
+        Hits for which `reject` returns True (e.g. wildcard answers) are dropped
+        inside the workers and never reach the consumer.
+        """
+        if not self.protocols:
+            await self.open()
+
+        async def lookup(name: str) -> Optional[Resolution]:
+            result = await self.resolve(name, rdtype)
+            if result and not (reject and reject(result)):
+                return result
+            return None
+
+        async for hit in bounded_map(names, lookup, self.concurrency):
+            yield hit
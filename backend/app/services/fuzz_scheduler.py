@@ -0,0 +1,191 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterator, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from .http_engine import HttpEngine, HttpResponse
+from .soft404 import Soft404Filter
+
+INTERESTING_STATUS = {200, 301, 302, 401, 403}
+REDIRECT_STATUS = {301, 302, 307, 308}
+
+
+class FuzzHit(NamedTuple):
+    base_url: str
+    path: str
+    status: int
+    length: int
+
+    @property
+    def url(self) -> str:
+        return self.base_url + self.path
+
+
+def expand_words(words: Sequence[str], extensions: Sequence[str]) -> Iterator[str]:
+    """
+    Yield each word bare and with every extension. Words that already carry
+    an extension are not expanded again.
+    """
+    for word in words:
+        yield word
+        if "." not in word:
+            for ext in extensions:
+                yield word + ext
+
+
+class _HostQueue:
+    """
+    Pending work for one base URL: a queue of lazy path generators, one per
+    directory still being fuzzed, plus the host's soft-404 calibration.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.work: Deque[Tuple[Iterator[str], str, int]] = deque()  # (paths, prefix, depth)
+        self.in_flight = 0
+        self.soft404 = Soft404Filter()
+        self.ready = False
+        self.abandoned = False
+
+    def next_path(self) -> Optional[Tuple[str, int]]:
+        while self.work:
+            paths, prefix, depth = self.work[0]
+            for path in paths:
+                return prefix + path, depth
+            self.work.popleft()
+        return None
+
+    @property
+    def idle(self) -> bool:
+        return self.abandoned or not self.work
+
+
+class FuzzScheduler:
+    """
+    Fuzzes many hosts at once from one shared worker pool. Workers rotate
+    through the hosts and take the next path from any host that is under
+    its politeness limit, so a slow host only ever ties up `per_host`
+    workers while the rest keep draining the fast ones. Discovered
+    directories are queued for recursion up to `max_depth`.
+    """
+
+    def __init__(self, engine: HttpEngine, words: Sequence[str], extensions: Sequence[str] = (),
+                 max_depth: int = 0, workers: int = 100, per_host: int = 10):
+        self.engine = engine
+        # Kept as is: a compiled Wordlist is read lazily, never copied
+        self.words = words if isinstance(words, Sequence) else list(words)
+        self.extensions = list(extensions)
+        self.max_depth = max_depth
+        self.workers = workers
+        self.per_host = per_host
+        self.hosts: Dict[str, _HostQueue] = {}
+        self._rotation: Deque[_HostQueue] = deque()
+        self._uncalibrated: Deque[_HostQueue] = deque()
+        self._changed = asyncio.Event()
+
+    def add_host(self, base_url: str):
+        base_url = base_url.rstrip("/")
+        if base_url in self.hosts:
+            return
+        host = _HostQueue(base_url)
+        host.work.append((expand_words(self.words, self.extensions), "/", 0))
+        self.hosts[base_url] = host
+        self._rotation.append(host)
+        self._uncalibrated.append(host)
+
+    def _pick(self) -> Optional[Tuple[_HostQueue, str, int]]:
+        for _ in range(len(self._rotation)):
+            host = self._rotation[0]
+            self._rotation.rotate(-1)
+            if not host.ready or host.idle or host.in_flight >= self.per_host:
+                continue
+            item = host.next_path()
+            if item:
+                return (host,) + item
+        return None
+
+    def _finished(self) -> bool:
+        return all(h.idle and not h.in_flight for h in self.hosts.values())
+
+    def _directory(self, host: _HostQueue, path: str, response: HttpResponse) -> bool:
+        if response.status not in REDIRECT_STATUS:
+            return False
+        location = response.headers.get("location", "")
+        target = urlsplit(urljoin(host.base_url + path, location))
+        return target.path == path + "/" and (not target.netloc or target.netloc == urlsplit(host.base_url).netloc)
+
+    async def _calibrate(self, host: _HostQueue):
+        host.in_flight += 1
+        try:
+            await host.soft404.calibrate(self.engine, host.base_url)
+        finally:
+            host.in_flight -= 1
+            host.ready = True
+
+    async def run(self) -> AsyncIterator[FuzzHit]:
+        """
+        Fuzz every added host and yield hits as they are found.
+        """
+        hits: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def probe(host: _HostQueue, path: str, depth: int):
+            response = await self.engine.fetch(host.base_url + path)
+            if response is None:
+                return
+            if host.soft404.is_soft_404(response):
+                if host.soft404.catch_all and not host.abandoned:
+                    print(f"{host.base_url} answers every path the same way, stopping early.")
+                    host.abandoned = True
+                return
+            if response.status not in INTERESTING_STATUS:
+                return
+            await hits.put(FuzzHit(host.base_url, path, response.status, len(response.body)))
+            if depth < self.max_depth and self._directory(host, path, response):
+                host.work.append((expand_words(self.words, self.extensions), path + "/", depth + 1))
+
+        async def worker():
+            while True:
+                if self._uncalibrated:
+                    await self._calibrate(self._uncalibrated.popleft())
+                    self._changed.set()
+                    continue
+                picked = self._pick()
+                if picked is None:
+                    if self._finished():
+                        self._changed.set()
+                        return
+                    # Everything runnable is at its politeness limit
+                    self._changed.clear()
+                    await self._changed.wait()
+                    continue
+                host, path, depth = picked
+                host.in_flight += 1
+                try:
+                    await probe(host, path, depth)
+                finally:
+                    host.in_flight -= 1
+                    self._changed.set()
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.workers)]
+
+        async def run_workers():
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await hits.put(done)
+
+        runner = asyncio.ensure_future(run_workers())
+        try:
+            while True:
+                item = await hits.get()
+                if item is done:
+                    break
+                yield item
+            await runner
+        finally:
+            # As in bounded_map: a failed fetch stops the other workers too
+            pending = [task for task in workers + [runner] if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -1,44 +1,91 @@
-import requests
-import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
+import asyncio
+from typing import AsyncIterator, List, Optional, Sequence
+
+from .http_engine import HttpEngine, HttpResponse
+from .fuzz_scheduler import INTERESTING_STATUS, FuzzHit, FuzzScheduler
+from .wordlists import Wordlist, get_wordlist_store
+
+
+def hit_word(path: str, words: Wordlist, extensions: Sequence[str]) -> Optional[str]:
+    """
+    The wordlist entry a hit came from: "/admin/backup.php" -> "backup".
+    """
+    word = path.rstrip("/").rsplit("/", 1)[-1]
+    if word in words:
+        return word
+    for ext in extensions:
+        if word.endswith(ext) and word[:-len(ext)] in words:
+            return word[:-len(ext)]
+    return None
+
 
 class FuzzingService:
+
+    DEFAULT_EXTENSIONS = [".php", ".bak"]
+
     @staticmethod
-    def brute_force_directories(domain: str, wordlist_path: str = "backend/wordlists/dir_common.txt") -> List[str]:
+    async def fuzz_hosts(base_urls: Sequence[str], wordlist_path: str = "dir_common.txt",
+                         extensions: Sequence[str] = (), max_depth: int = 0,
+                         engine: Optional[HttpEngine] = None, per_host: int = 10) -> AsyncIterator[FuzzHit]:
         """
-        Brute-force common directories and files on the target domain.
+        Brute-force directories and files on every base URL (scheme://host:port)
+        at once, recursing into found directories up to `max_depth`.
+        All hosts share one worker pool; hits are yielded as they arrive.
+        Words that hit are counted, so later runs try them first.
         """
-        found_paths = []
-        base_url = f"http://{domain}"
-        
-        if not os.path.exists(wordlist_path):
-            return []
+        store = get_wordlist_store()
+        words = await asyncio.to_thread(store.get, wordlist_path)
+        if not words or not base_urls:
+            return
 
+        owned = engine is None
+        engine = engine or HttpEngine(concurrency=100, per_host=per_host, timeout=3, max_body=4096)
+        scheduler = FuzzScheduler(engine, words, extensions, max_depth, workers=engine.concurrency, per_host=per_host)
+        for base_url in base_urls:
+            scheduler.add_host(base_url)
+        hits = scheduler.run()
+        found = []
         try:
-            with open(wordlist_path, 'r') as f:
-                paths = [line.strip() for line in f if line.strip()]
-        except Exception:
-            return []
-
-        def check_path(path):
-            url = f"{base_url}/{path}"
-            try:
-                # Use stream=True to avoid downloading large files
-                res = requests.get(url, timeout=3, allow_redirects=False, stream=True)
-                if res.status_code in [200, 301, 302, 401, 403]:
-                    return f"/{path} (Status: {res.status_code})"
-            except:
-                pass
-            return None
-
-        # Threaded execution
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            future_to_url = {executor.submit(check_path, path): path for path in paths}
-            
-            for future in as_completed(future_to_url):
-                result = future.result()
-                if result:
-                    found_paths.append(result)
-        
-        return found_paths
+            async for hit in hits:
+                found.append(hit_word(hit.path, words, extensions))
+                yield hit
+            await asyncio.to_thread(store.record_hits, words, [w for w in found if w])
+        finally:
+            await hits.aclose()
+            if owned:
+                await engine.close()
+
+    @staticmethod
+    async def recheck_paths(urls: Sequence[str], engine: Optional[HttpEngine] = None) -> AsyncIterator[HttpResponse]:
+        """
+        Re-request previously found URLs and yield the ones still interesting.
+        """
+        owned = engine is None
+        engine = engine or HttpEngine(concurrency=100, per_host=10, timeout=3, max_body=4096)
+        responses = engine.fetch_many(urls)
+        try:
+            async for response in responses:
+                if response.status in INTERESTING_STATUS:
+                    yield response
+        finally:
+            await responses.aclose()
+            if owned:
+                await engine.close()
+
+    @staticmethod
+    async def stream_directories(domain: str, wordlist_path: str = "dir_common.txt",
+                                 engine: Optional[HttpEngine] = None) -> AsyncIterator[str]:
+        """
+        Brute-force common directories and files on the target domain,
+        yielding each interesting path as soon as its response arrives.
+        """
+        async for hit in FuzzingService.fuzz_hosts([f"http://{domain}"], wordlist_path, engine=engine):
+            yield f"{hit.path} (Status: {hit.status})"
+
+    @staticmethod
+    async def brute_force_directories(domain: str, wordlist_path: str = "dir_common.txt",
+                                      engine: Optional[HttpEngine] = None) -> List[str]:
+        """
+        Collect every result of stream_directories into a list.
+        """
+        return [found async for found in FuzzingService.stream_directories(domain, wordlist_path, engine)]
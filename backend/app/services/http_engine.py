@@ -0,0 +1,312 @@
+import asyncio
+import ssl
+import zlib
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from ..budgets import get_budget
+from ..metrics import HTTP_ERRORS, HTTP_REQUESTS, HTTP_RETRIES
+from ..ratelimit import RateLimiter
+from ..streams import bounded_map
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+TLS_CONTEXT = ssl.create_default_context()
+TLS_CONTEXT.check_hostname = False
+TLS_CONTEXT.verify_mode = ssl.CERT_NONE
+TLS_CONTEXT.set_alpn_protocols(["http/1.1"])
+
+
+class HttpResponse(NamedTuple):
+    url: str
+    status: int
+    headers: Dict[str, str]  # lower-cased names; repeated Set-Cookie joined by "\n"
+    body: bytes  # at most `max_body` bytes, decompressed
+    elapsed: float
+
+
+def _decode(headers: Dict[str, str], raw: bytes) -> bytes:
+    """
+    Best-effort decompression of a (possibly truncated) raw body prefix.
+    """
+    encoding = headers.get("content-encoding", "").lower()
+    if not raw or encoding not in ("gzip", "deflate"):
+        return raw
+    try:
+        wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+        return zlib.decompressobj(wbits).decompress(raw)
+    except zlib.error:
+        return raw
+
+
+class _Connection:
+    """
+    One keep-alive HTTP/1.1 connection. Requests are written as soon as they
+    are submitted (up to the pipeline depth) and a single reader task
+    matches responses to requests in FIFO order.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_body: int, drain_limit: int):
+        self.reader = reader
+        self.writer = writer
+        self.max_body = max_body
+        self.drain_limit = drain_limit
+        self.pending: Deque[Tuple[asyncio.Future, str]] = deque()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    def submit(self, request: bytes, method: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((future, method))
+        self.writer.write(request)
+        self._wakeup.set()
+        return future
+
+    def close(self, error: Optional[BaseException] = None):
+        if self.closed:
+            return
+        self.closed = True
+        self.writer.close()
+        while self.pending:
+            future, _ = self.pending.popleft()
+            if not future.done():
+                future.set_exception(error or ConnectionResetError("connection closed"))
+        if not self._reader_task.done() and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+
+    async def _read_loop(self):
+        error = None
+        try:
+            while not self.closed:
+                if not self.pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                future, method = self.pending[0]
+                status, headers, body, reusable = await self._read_response(method)
+                self.pending.popleft()
+                if not future.done():
+                    future.set_result((status, headers, body))
+                if not reusable:
+                    break
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            error = e
+        self.close(error)
+
+    async def _read_response(self, method: str):
+        reader = self.reader
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            version, status = lines[0].split(" ", 2)[:2]
+            status = int(status)
+            if not (100 <= status < 200):
+                break
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if ":" not in line:
+                continue
+            name, value = line.split(":", 1)
+            name, value = name.strip().lower(), value.strip()
+            if name in headers:
+                headers[name] += ("\n" if name == "set-cookie" else ", ") + value
+            else:
+                headers[name] = value
+
+        reusable = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        body = bytearray()
+        if method == "HEAD" or status in (204, 304):
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            received = 0
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0].strip(), 16)
+                if size == 0:
+                    # Trailers end with an empty line
+                    while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                if received + size > self.drain_limit:
+                    reusable = False
+                    body += await reader.read(max(0, self.max_body - len(body)))
+                    break
+                chunk = await reader.readexactly(size + 2)
+                received += size
+                if len(body) < self.max_body:
+                    body += chunk[:-2]
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length <= self.drain_limit:
+                # Drain it all so the connection can be reused
+                body += await reader.readexactly(length)
+            else:
+                body += await reader.readexactly(min(length, self.max_body))
+                reusable = False
+        else:
+            # Delimited by connection close
+            body += await reader.read(self.max_body)
+            reusable = False
+        return status, headers, bytes(body[:self.max_body]), reusable
+
+
+class _HostPool:
+    def __init__(self, rate: Optional[float]):
+        self.connections: List[_Connection] = []
+        self.opening = 0
+        self.limiter = RateLimiter(rate)
+        self.changed = asyncio.Event()
+
+
+class HttpEngine:
+    """
+    Async HTTP/1.1 client built for high-volume probing. Connections are kept
+    alive and pooled per host, requests can optionally be pipelined
+    (`pipeline` > 1) on each connection, total and per-host concurrency are
+    capped and each host can be rate limited. Bodies are read only up to
+    `max_body` bytes; small remainders are drained so connections stay
+    reusable, large ones close the connection instead.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 100,
+        per_host: int = 10,
+        per_host_rate: Optional[float] = None,
+        timeout: float = 5.0,
+        max_body: int = 8192,
+        drain_limit: int = 65536,
+        pipeline: int = 1,
+        follow_redirects: bool = False,
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.per_host_rate = per_host_rate
+        self.timeout = timeout
+        self.max_body = max_body
+        self.drain_limit = max(drain_limit, max_body)
+        self.pipeline = max(1, pipeline)
+        self.follow_redirects = follow_redirects
+        self.pools: Dict[Tuple[str, str, int], _HostPool] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self.errors = 0
+
+    async def close(self):
+        for pool in self.pools.values():
+            for conn in pool.connections:
+                conn.close()
+        self.pools = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _connect(self, scheme: str, host: str, port: int) -> _Connection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                host, port,
+                ssl=TLS_CONTEXT if scheme == "https" else None,
+                server_hostname=host if scheme == "https" else None,
+            ),
+            self.timeout,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer, self.max_body, self.drain_limit)
+
+    async def _acquire(self, key: Tuple[str, str, int]) -> _Connection:
+        """
+        Pick a connection for the next request: an idle one, else a new one
+        while under the per-host cap, else the least loaded one that still
+        has pipeline room.
+        """
+        pool = self.pools[key]
+        while True:
+            pool.connections = [c for c in pool.connections if not c.closed]
+            idle = [c for c in pool.connections if not c.pending]
+            if idle:
+                return idle[0]
+            if len(pool.connections) + pool.opening < self.per_host:
+                pool.opening += 1
+                try:
+                    conn = await self._connect(*key)
+                finally:
+                    pool.opening -= 1
+                pool.connections.append(conn)
+                return conn
+            available = [c for c in pool.connections if len(c.pending) < self.pipeline]
+            if available:
+                return min(available, key=lambda c: len(c.pending))
+            pool.changed.clear()
+            await pool.changed.wait()
+
+    async def _request(self, url: str, method: str) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        if key not in self.pools:
+            self.pools[key] = _HostPool(self.per_host_rate)
+        pool = self.pools[key]
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host_header = parts.netloc.rsplit("@", 1)[-1]
+        request = (
+            f"{method} {path} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: {USER_AGENT}\r\n"
+            f"Accept: */*\r\nAccept-Encoding: gzip, deflate\r\nConnection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        await pool.limiter.acquire()
+        # One retry covers keep-alive connections the server closed while idle
+        for attempt in range(2):
+            conn = await self._acquire(key)
+            future = conn.submit(request, method)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                # The response stream is out of sync now; drop the connection
+                conn.close(asyncio.TimeoutError())
+                raise
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if attempt:
+                    raise
+                HTTP_RETRIES.inc()
+            finally:
+                pool.changed.set()
+        raise ConnectionResetError("connection closed")
+
+    async def fetch(self, url: str, method: str = "GET") -> Optional[HttpResponse]:
+        """
+        Issue one request and read a bounded prefix of the body. Returns None
+        on connection errors and timeouts.
+        """
+        async with self._semaphore, get_budget("http").slot():
+            start = asyncio.get_running_loop().time()
+            try:
+                for _ in range(5 if self.follow_redirects else 1):
+                    self.requests_sent += 1
+                    HTTP_REQUESTS.inc()
+                    status, headers, body = await self._request(url, method)
+                    if not (self.follow_redirects and status in (301, 302, 303, 307, 308) and "location" in headers):
+                        break
+                    url = urljoin(url, headers["location"])
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ssl.SSLError, ValueError) as e:
+                self.errors += 1
+                HTTP_ERRORS.inc(kind="timeout" if isinstance(e, asyncio.TimeoutError) else "connection")
+                return None
+            elapsed = asyncio.get_running_loop().time() - start
+            return HttpResponse(url, status, headers, _decode(headers, body)[:self.max_body], elapsed)
+
+    async def fetch_many(self, urls: Iterable[str], method: str = "GET") -> AsyncIterator[HttpResponse]:
+        """
+        Fetch a (possibly lazy) iterable of URLs and yield responses as they
+        complete, keeping at most `concurrency` requests in flight.
+        """
+        async for response in bounded_map(urls, lambda url: self.fetch(url, method), self.concurrency):
+            yield response
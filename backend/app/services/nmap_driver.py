@@ -0,0 +1,166 @@
+import asyncio
+import os
+import xml.etree.ElementTree as ET
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+
+from ..budgets import get_budget
+from ..schemas import PortResult
+
+# Hosts per nmap process. nmap parallelizes within a run, so bigger chunks
+# are cheaper; smaller ones stream results sooner and spread over more CPUs.
+CHUNK_SIZE = 64
+DEFAULT_ARGUMENTS = ("-T4", "-n")
+# Per-host progress elements written next to <host>; dropped like hosts are
+TOP_LEVEL_NOISE = {"hosthint", "taskbegin", "taskprogress", "taskend"}
+
+
+class NmapError(Exception):
+    pass
+
+
+def format_ports(ports: Iterable[int]) -> str:
+    """
+    [22, 80, 81, 82, 443] -> "22,80-82,443" (inverse of parse_ports).
+    """
+    ranges: List[List[int]] = []
+    for port in sorted(set(ports)):
+        if ranges and port == ranges[-1][1] + 1:
+            ranges[-1][1] = port
+        else:
+            ranges.append([port, port])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+class NmapXmlStream:
+    """
+    Incremental reader for nmap -oX output: feed() it bytes as nmap writes
+    them and get a PortResult for every <host> that is complete. Finished
+    host elements are dropped, so memory stays flat however many hosts
+    the run covers.
+    """
+
+    def __init__(self):
+        self.parser = ET.XMLPullParser(events=("start", "end"))
+        self.root = None
+
+    def feed(self, data: bytes) -> List[PortResult]:
+        self.parser.feed(data)
+        results = []
+        for event, elem in self.parser.read_events():
+            if event == "start":
+                if self.root is None:
+                    self.root = elem
+                continue
+            if elem.tag in TOP_LEVEL_NOISE:
+                self.root.remove(elem)
+            if elem.tag != "host":
+                continue
+            ip = next((a.get("addr") for a in elem.iter("address") if a.get("addrtype") in ("ipv4", "ipv6")), None)
+            if ip:
+                ports = []
+                for port in elem.iter("port"):
+                    state = port.find("state")
+                    if port.get("protocol") == "tcp" and state is not None and state.get("state") == "open":
+                        ports.append(int(port.get("portid")))
+                results.append(PortResult(ip=ip, ports=sorted(ports)))
+            self.root.remove(elem)
+        return results
+
+    def close(self):
+        self.parser.close()
+
+
+class NmapDriver:
+    """
+    Runs nmap over many hosts: one process per chunk of CHUNK_SIZE hosts,
+    up to `processes` of them at once (and within the process-wide "nmap"
+    budget). Results stream out per host as nmap finishes it. Hosts of a
+    chunk whose nmap run failed are listed in `failed` afterwards, so the
+    caller can fall back to another scanner for them. Closing the scan
+    iterator (or cancelling the scan) kills the running processes.
+    """
+
+    def __init__(self, command: Optional[Sequence[str]] = None, chunk_size: int = CHUNK_SIZE,
+                 processes: Optional[int] = None, arguments: Sequence[str] = DEFAULT_ARGUMENTS):
+        self.command = list(command or [os.environ.get("RECON_NMAP", "nmap")])
+        self.chunk_size = max(1, chunk_size)
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.arguments = list(arguments)
+        self.failed: List[str] = []
+        self.runs = 0
+
+    async def _run_chunk(self, hosts: List[str], port_spec: str, results: asyncio.Queue):
+        family = ["-6"] if ":" in hosts[0] else []
+        args = self.command + self.arguments + family + ["-p", port_spec, "-oX", "-", *hosts]
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        self.runs += 1
+        # Drained concurrently so a chatty stderr cannot block nmap
+        stderr = asyncio.ensure_future(proc.stderr.read())
+        stream = NmapXmlStream()
+        seen = set()
+        try:
+            while True:
+                data = await proc.stdout.read(65536)
+                if not data:
+                    break
+                for result in stream.feed(data):
+                    seen.add(result.ip)
+                    await results.put(result)
+            code = await proc.wait()
+            if code != 0:
+                message = (await stderr).decode(errors="replace").strip().splitlines()
+                raise NmapError(f"nmap exited with {code}: {message[-1] if message else ''}")
+            stream.close()
+        except (NmapError, ET.ParseError) as e:
+            print(f"Nmap failed for {len(hosts) - len(seen)} hosts ({e})")
+            self.failed.extend(h for h in hosts if h not in seen)
+            return
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            stderr.cancel()
+        # Hosts nmap found down are not in the XML
+        for host in hosts:
+            if host not in seen:
+                await results.put(PortResult(ip=host, ports=[]))
+
+    async def scan(self, ips: Iterable[str], ports: Iterable[int]) -> AsyncIterator[PortResult]:
+        ips = list(dict.fromkeys(ips))
+        port_spec = format_ports(ports)
+        if not ips or not port_spec:
+            return
+        # nmap scans one address family per run
+        chunks = []
+        for family in ([ip for ip in ips if ":" not in ip], [ip for ip in ips if ":" in ip]):
+            chunks += [family[i:i + self.chunk_size] for i in range(0, len(family), self.chunk_size)]
+        results: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.processes)
+        done = object()
+
+        async def run(chunk: List[str]):
+            try:
+                async with semaphore, get_budget("nmap").slot():
+                    await self._run_chunk(chunk, port_spec, results)
+            except OSError as e:
+                # nmap missing or not executable
+                print(f"Could not start nmap: {e}")
+                self.failed.extend(chunk)
+            finally:
+                await results.put(done)
+
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await results.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,52 +1,61 @@
-import requests
-from typing import List
+from typing import Dict, Iterable, List, Optional
+
+from ..cache import get_cache
+from ..streams import bounded_map
+from .http_engine import HttpEngine
+from .tech_fingerprint import BODY_PREFIX, get_tech_matcher
+
+UNREACHABLE = ["Unknown (Host unreachable)"]
 
 class OsintService:
     @staticmethod
-    def get_tech_stack(domain: str) -> List[str]:
+    async def detect_host(target: str, engine: HttpEngine) -> Optional[Dict[str, Optional[str]]]:
         """
-        Detects technologies using HTTP headers and HTML content.
+        Technologies (name -> version) behind one landing page, or None when
+        it does not answer. `target` is a base URL (scheme://host:port) or a
+        bare host, which is fetched over plain HTTP.
         """
-        technologies = set()
-        url = f"http://{domain}"
+        url = target if "://" in target else f"http://{target}"
+        response = await engine.fetch(f"{url}/")
+        if response is None:
+            return None
+        return get_tech_matcher().match(response.headers, response.body)
+
+    @staticmethod
+    async def detect_hosts(hosts: Iterable[str], engine: Optional[HttpEngine] = None) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Fingerprint every host or base URL, through the shared cache. Those
+        that do not answer are left out.
+        """
+        owned = engine is None
+        engine = engine or HttpEngine(concurrency=50, per_host=2, timeout=5, max_body=BODY_PREFIX, follow_redirects=True)
+        cache = get_cache("tech")
+
+        async def probe(host: str):
+            found = await cache.get_or_load(host, lambda: OsintService.detect_host(host, engine))
+            return (host, found) if found is not None else None
+
         try:
-            response = requests.get(url, timeout=5, verify=False)
-            headers = response.headers
-            
-            # 1. Check Headers
-            if 'Server' in headers:
-                technologies.add(f"Server: {headers['Server']}")
-            if 'X-Powered-By' in headers:
-                technologies.add(f"Powered By: {headers['X-Powered-By']}")
-            if 'X-AspNet-Version' in headers:
-                technologies.add("ASP.NET")
-            
-            # 2. Check Cookies
-            cookies = response.cookies.get_dict()
-            if 'PHPSESSID' in cookies:
-                technologies.add("PHP")
-            if 'JSESSIONID' in cookies:
-                technologies.add("Java/JSP")
-            if 'csrftoken' in cookies: # Common in Django
-                technologies.add("Django (Potential)")
-                
-            # 3. Simple HTML Content checks
-            content = response.text.lower()
-            if 'wp-content' in content:
-                technologies.add("WordPress")
-            if 'react' in content:
-                technologies.add("React (Frontend)")
-            # 4. WAF Detection
-            if 'cf-ray' in headers or 'cf-cache-status' in headers:
-                technologies.add("WAF: Cloudflare")
-            if 'x-amz-cf-id' in headers:
-                technologies.add("WAF: AWS CloudFront")
-            if 'server' in headers and 'akamai' in headers['server'].lower():
-                technologies.add("WAF: Akamai")
-            if 'x-sucuri-id' in headers:
-                technologies.add("WAF: Sucuri")
-
-            return list(technologies)
-            
-        except requests.RequestException:
-            return ["Unknown (Host unreachable)"]
+            return dict([pair async for pair in bounded_map(hosts, probe, engine.concurrency)])
+        finally:
+            if owned:
+                await engine.close()
+
+    @staticmethod
+    def merge(detections: Dict[str, Dict[str, Optional[str]]]) -> List[dict]:
+        """
+        One entry per technology and version, listing the hosts it runs on.
+        """
+        matcher = get_tech_matcher()
+        merged: Dict[tuple, dict] = {}
+        for host, found in sorted(detections.items()):
+            for name, version in found.items():
+                entry = merged.setdefault((name, version or ""), {
+                    "name": name, "version": version, "categories": matcher.categories(name), "hosts": [],
+                })
+                entry["hosts"].append(host)
+        return [merged[key] for key in sorted(merged)]
+
+    @staticmethod
+    def labels(tech_stack: List[dict]) -> List[str]:
+        return [f"{t['name']} {t['version']}" if t.get("version") else t["name"] for t in tech_stack]
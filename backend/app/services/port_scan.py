@@ -1,7 +1,11 @@
-import socket
+import os
+import shutil
 import shodan
-import nmap
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional
+
+from ..schemas import PortResult
+from .connect_scan import ConnectScanner
+from .nmap_driver import NmapDriver
 
 class PortScanService:
     
@@ -12,51 +16,26 @@ class PortScanService:
     ]
 
     @staticmethod
-    def scan_common_ports(ip: str) -> List[int]:
+    async def scan_common_ports(ips: List[str], ports: Optional[List[int]] = None) -> AsyncIterator[PortResult]:
         """
-        Attempts to use Nmap first. If not found/fails, falls back to socket scan.
+        Attempts to use Nmap first (batched, see NmapDriver). Hosts Nmap is
+        missing or failed for fall back to an async connect scan.
+        Yields one PortResult per host as each host finishes.
         """
-        try:
-            return PortScanService.scan_nmap(ip)
-        except Exception as e:
-            print(f"Nmap failed ({e}), falling back to socket scan...")
-            
-        # Fallback Socket Scan
-        open_ports = []
-        socket.setdefaulttimeout(0.5)
-        
-        for port in PortScanService.COMMON_PORTS:
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                result = s.connect_ex((ip, port))
-                if result == 0:
-                    open_ports.append(port)
-                s.close()
-            except Exception:
-                pass
-                
-        return open_ports
+        ips = list(dict.fromkeys(ips))
+        ports = ports or PortScanService.COMMON_PORTS
+        fallback = ips
+        if shutil.which(os.environ.get("RECON_NMAP", "nmap")):
+            driver = NmapDriver()
+            async for result in driver.scan(ips, ports):
+                yield result
+            fallback = driver.failed
+            if fallback:
+                print(f"Nmap failed for {len(fallback)} hosts, falling back to connect scan...")
 
-    @staticmethod
-    def scan_nmap(ip: str) -> List[int]:
-        """
-        Scan using Nmap binary. Requires Nmap to be installed on system.
-        """
-        nm = nmap.PortScanner()
-        # Scan common ports with -sS (stealth) or -sT (connect) depending on privs
-        # Using -F (Fast mode) for demo speed, or specific ports
-        ports_str = ",".join(map(str, PortScanService.COMMON_PORTS))
-        nm.scan(ip, ports_str, arguments='-T4')
-        
-        open_ports = []
-        if ip in nm.all_hosts():
-            for proto in nm[ip].all_protocols():
-                lport = nm[ip][proto].keys()
-                for port in lport:
-                    if nm[ip][proto][port]['state'] == 'open':
-                        open_ports.append(port)
-        
-        return open_ports
+        if fallback:
+            async for result in ConnectScanner().scan(fallback, ports):
+                yield result
 
     @staticmethod
     def get_shodan_info(ip: str, api_key: str) -> Dict:
@@ -0,0 +1,119 @@
+import re
+import secrets
+import zlib
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .http_engine import HttpEngine, HttpResponse
+
+WORD_RE = re.compile(rb"\w+")
+# Digits change on every request (timestamps, request ids, CSRF tokens)
+VOLATILE_RE = re.compile(rb"\d+")
+SKETCH_SIZE = 32
+
+
+class ResponseFingerprint(NamedTuple):
+    status: int
+    length: int
+    words: int
+    sketch: frozenset  # bottom-k MinHash of the body's word hashes
+    location: Optional[str]
+
+
+def fingerprint(response: HttpResponse) -> ResponseFingerprint:
+    """
+    Fingerprint a response so that two catch-all pages for different paths
+    compare equal. The requested path is removed first because error pages
+    often echo it back.
+    """
+    path = urlsplit(response.url).path
+    body = response.body
+    if path and path != "/":
+        body = body.replace(path.encode("utf-8", "ignore"), b"").replace(path.lstrip("/").encode("utf-8", "ignore"), b"")
+    body = VOLATILE_RE.sub(b"0", body)
+    words = WORD_RE.findall(body)
+    # crc32 rather than hash(): fingerprints are stored and compared across processes
+    hashes = sorted({zlib.crc32(w) for w in words})
+    location = response.headers.get("location")
+    if location and path:
+        location = location.replace(path.lstrip("/"), "{path}")
+    return ResponseFingerprint(response.status, len(body), len(words), frozenset(hashes[:SKETCH_SIZE]), location)
+
+
+def to_dict(fp: ResponseFingerprint) -> dict:
+    return {"status": fp.status, "length": fp.length, "words": fp.words,
+            "sketch": sorted(fp.sketch), "location": fp.location}
+
+
+def from_dict(data: dict) -> ResponseFingerprint:
+    return ResponseFingerprint(data["status"], data["length"], data["words"], frozenset(data["sketch"]), data.get("location"))
+
+
+def similarity(a: ResponseFingerprint, b: ResponseFingerprint) -> float:
+    """
+    Estimated Jaccard similarity of the two bodies from their bottom-k sketches.
+    """
+    if not a.sketch and not b.sketch:
+        return 1.0
+    union = sorted(a.sketch | b.sketch)[:SKETCH_SIZE]
+    shared = sum(1 for h in union if h in a.sketch and h in b.sketch)
+    return shared / len(union)
+
+
+def same_page(a: ResponseFingerprint, b: ResponseFingerprint, threshold: float = 0.9) -> bool:
+    if a.status != b.status:
+        return False
+    if a.location or b.location:
+        return a.location == b.location
+    if a.length == b.length:
+        return True
+    if abs(a.length - b.length) <= max(32, 0.05 * max(a.length, b.length)) and a.words == b.words:
+        return True
+    return similarity(a, b) >= threshold
+
+
+class Soft404Filter:
+    """
+    Per-host calibration against catch-all responses. A few random paths are
+    fetched up front; later responses that look like one of those baselines
+    are treated as "not found" regardless of their status code.
+    """
+
+    def __init__(self, probes: int = 3, abort_after: int = 200):
+        self.probes = probes
+        self.abort_after = abort_after
+        self.baselines: List[ResponseFingerprint] = []
+        self.seen = 0
+        self.filtered = 0
+
+    async def calibrate(self, engine: HttpEngine, base_url: str):
+        suffixes = ["", ".php", "/"]
+        for i in range(self.probes):
+            url = f"{base_url}/{secrets.token_hex(6)}{suffixes[i % len(suffixes)]}"
+            response = await engine.fetch(url)
+            if response is None or response.status == 404:
+                continue
+            baseline = fingerprint(response)
+            if not any(same_page(baseline, known) for known in self.baselines):
+                self.baselines.append(baseline)
+        if self.baselines:
+            statuses = sorted({b.status for b in self.baselines})
+            print(f"Soft-404 baseline for {base_url}: status {statuses}")
+
+    @property
+    def catch_all(self) -> bool:
+        """
+        True once `abort_after` responses in a row matched a baseline: the
+        host answers everything the same way and is not worth fuzzing further.
+        """
+        return bool(self.baselines) and self.seen >= self.abort_after and self.filtered == self.seen
+
+    def is_soft_404(self, response: HttpResponse) -> bool:
+        self.seen += 1
+        if not self.baselines or response.status == 404:
+            return False
+        current = fingerprint(response)
+        if any(same_page(current, baseline) for baseline in self.baselines):
+            self.filtered += 1
+            return True
+        return False
@@ -1,8 +1,11 @@
-import requests
-import dns.resolver
-import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List
+import asyncio
+from typing import List, Optional
+
+from ..cache import get_cache
+from .ct_logs import CTLogService
+from .dns_resolver import AsyncResolver
+from .wildcard import WildcardFilter
+from .wordlists import get_wordlist_store
 
 class SubdomainService:
     @staticmethod
@@ -10,96 +13,55 @@ class SubdomainService:
         """
         Query crt.sh for subdomains using Certificate Transparency logs.
         """
-        url = f"https://crt.sh/?q=%.{domain}&output=json"
-        
-        try:
-            # Random User-Agent to avoid blocking
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            response = requests.get(url, headers=headers, timeout=30)
-            if response.status_code != 200:
-                print(f"Error fetching from crt.sh: {response.status_code}")
-                return []
-                
-            data = response.json()
-            # Extract name_value and clean up duplicates/wildcards
-            subdomains = set()
-            for entry in data:
-                name_value = entry.get('name_value', '')
-                # Split multiline entries
-                for sub in name_value.split('\n'):
-                    if sub and '*' not in sub:
-                         # Basic cleanup
-                        subdomains.add(sub.lower())
-            
-            return list(subdomains)
-            
-        except requests.RequestException as e:
-            print(f"Exception querying crt.sh: {e}")
-            return []
+        return CTLogService.collect_names(domain, ["crtsh"]) or []
 
     @staticmethod
-    def resolve_domains(domains: List[str]) -> List[str]:
+    async def lookup_ct_logs(domain: str) -> List[str]:
         """
-        Verify which subdomains resolve to an IP address.
+        Names from every CT source, through the shared cache: scans of the
+        same domain reuse one query, and if all sources failed they are not
+        asked again for a few minutes.
         """
-        resolved = []
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 1
-        resolver.lifetime = 1
-        
-        for sub in domains:
-            try:
-                # Try to resolve A record
-                resolver.resolve(sub, 'A')
-                resolved.append(sub)
-            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.Timeout):
-                continue
-            except Exception:
-                continue
-                
-        return resolved
+        subdomains = await get_cache("ct_logs").get_or_load(
+            domain, lambda: asyncio.to_thread(CTLogService.collect_names, domain)
+        )
+        return list(subdomains or [])
 
     @staticmethod
-    def get_subdomains_bruteforce(domain: str, wordlist_path: str = "backend/wordlists/subdomains.txt") -> List[str]:
+    async def get_subdomains_bruteforce(domain: str, wordlist_path: str = "subdomains.txt",
+                                        resolver: Optional[AsyncResolver] = None) -> List[str]:
         """
         Brute-force subdomains using a wordlist and DNS resolution.
-        Uses threading for speed.
+        Queries are pipelined through the async resolver; hits stream in as they resolve.
+        Wildcard zones are learned first so their catch-all answers are dropped.
+        Prefixes that resolved are counted, so later runs try them first.
         """
         found_subdomains = set()
-        
-        if not os.path.exists(wordlist_path):
-            print(f"Wordlist not found at {wordlist_path}")
+        store = get_wordlist_store()
+        # Compiling (or re-ranking) a list can take a while; not on the loop
+        prefixes = await asyncio.to_thread(store.get, wordlist_path)
+        if prefixes is None:
             return []
 
-        # Read wordlist
+        print(f"Starting brute force for {domain} with {len(prefixes)} words...")
+        owned = resolver is None
+        resolver = resolver or AsyncResolver(cache=get_cache("dns"))
         try:
-            with open(wordlist_path, 'r') as f:
-                prefixes = [line.strip() for line in f if line.strip()]
-        except Exception as e:
-            print(f"Error reading wordlist: {e}")
-            return []
-
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 1
-        resolver.lifetime = 1
+            # Learn wildcard answers for the apex and every nested zone the
+            # wordlist reaches into (e.g. "api.dev" -> *.dev.<domain>)
+            zones = {domain} | {f"{suffix}.{domain}" for suffix in prefixes.suffixes()}
+            wildcards = WildcardFilter()
+            await wildcards.learn(resolver, zones)
 
-        def check_subdomain(prefix):
-            full_domain = f"{prefix}.{domain}"
-            try:
-                resolver.resolve(full_domain, 'A')
-                return full_domain
-            except:
-                return None
-
-        # Threaded execution
-        print(f"Starting brute force for {domain} with {len(prefixes)} words...")
-        with ThreadPoolExecutor(max_workers=50) as executor:
-            future_to_domain = {executor.submit(check_subdomain, prefix): prefix for prefix in prefixes}
-            
-            for future in as_completed(future_to_domain):
-                result = future.result()
-                if result:
-                    found_subdomains.add(result)
+            candidates = (f"{prefix}.{domain}" for prefix in prefixes)
+            async for hit in resolver.resolve_many(candidates, reject=wildcards.is_wildcard):
+                found_subdomains.add(hit.name)
+        finally:
+            if owned:
+                await resolver.close()
         
+        suffix = f".{domain}"
+        hits = [name[:-len(suffix)] for name in found_subdomains if name.endswith(suffix)]
+        await asyncio.to_thread(store.record_hits, prefixes, hits)
         print(f"Brute force finished. Found {len(found_subdomains)} subdomains.")
         return list(found_subdomains)
@@ -0,0 +1,228 @@
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern
+
+SIGNATURES_PATH = Path(__file__).resolve().parent.parent / "signatures" / "technologies.json"
+# Only this much of each body is searched; signatures live in the <head> and
+# the first scripts, not in multi-megabyte pages
+BODY_PREFIX = 65536
+# Shorter literals would match almost every page and prefilter nothing
+MIN_KEYWORD = 3
+
+META_RE = re.compile(
+    r"<meta\s[^>]*?(?:name|property)\s*=\s*[\"']([^\"']+)[\"'][^>]*?content\s*=\s*[\"']([^\"']*)"
+    r"|<meta\s[^>]*?content\s*=\s*[\"']([^\"']*)[\"'][^>]*?(?:name|property)\s*=\s*[\"']([^\"']+)",
+    re.I,
+)
+SCRIPT_RE = re.compile(r"<script[^>]+src\s*=\s*[\"']?([^\"'\s>]+)", re.I)
+
+
+class Rule(NamedTuple):
+    tech: str
+    pattern: Pattern
+
+
+def keyword(pattern: str) -> Optional[str]:
+    """
+    Longest literal that every match of `pattern` must contain, or None when
+    there is none worth searching for (top-level alternation, short literal).
+    Only text outside groups counts, since groups may be optional.
+    """
+    runs, run = [], ""
+    depth = i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        literal = None
+        if ch == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped and not escaped.isalnum():
+                literal = escaped
+            i += 2
+        elif ch == "[":
+            # Skip the whole character class
+            i += 2 if pattern[i + 1:i + 2] != "^" else 3
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif ch == "{":
+            # Skip a {m,n} repeat count
+            i = pattern.find("}", i) + 1 or len(pattern)
+        else:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif ch == "|" and depth == 0:
+                return None
+            elif ch not in ".^$*+?{}":
+                literal = ch
+            i += 1
+        if literal is None or depth > 0:
+            runs.append(run)
+            run = ""
+            continue
+        following = pattern[i:i + 1]
+        if following and following in "?*{":
+            # Optional character: it cannot be part of a required literal
+            runs.append(run)
+            run = ""
+        elif following == "+":
+            runs.append(run + literal)
+            run = ""
+        else:
+            run += literal
+    runs.append(run)
+    best = max(runs, key=len).lower()
+    return best if len(best) >= MIN_KEYWORD else None
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """
+    One regex matching any of `words`, factored into a trie so the body is
+    scanned once instead of once per word. At each position the longest word
+    wins (optional suffixes are greedy).
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?" if len(branches) > 1 or len(body) > 1 else f"{body}?"
+        return body
+
+    return build(trie)
+
+
+def _version(match) -> Optional[str]:
+    if match.re.groups and match.group(1):
+        return match.group(1).strip().rstrip(".") or None
+    return None
+
+
+class TechMatcher:
+    """
+    Signature database (technologies.json) compiled for single-pass matching.
+    Header, cookie and meta signatures are indexed by name, so only names a
+    response actually has are checked. Body and script signatures are
+    prefiltered: one combined keyword regex finds which literals occur in the
+    body, and only the signatures requiring those literals are run.
+    """
+
+    def __init__(self, signatures: Dict[str, dict]):
+        self.signatures = signatures
+        self.headers: Dict[str, List[Rule]] = {}
+        self.cookies: Dict[str, List[Rule]] = {}
+        self.meta: Dict[str, List[Rule]] = {}
+        # keyword -> rules needing it; rules without a usable keyword always run
+        self.body: Dict[Optional[str], List[Rule]] = {}
+        self.scripts: Dict[Optional[str], List[Rule]] = {}
+        for tech, sig in signatures.items():
+            for field, index in (("headers", self.headers), ("cookies", self.cookies), ("meta", self.meta)):
+                for name, pattern in (sig.get(field) or {}).items():
+                    key = name if field == "cookies" else name.lower()
+                    index.setdefault(key, []).append(Rule(tech, re.compile(pattern, re.I)))
+            for field, index in (("body", self.body), ("scripts", self.scripts)):
+                for pattern in sig.get(field) or []:
+                    index.setdefault(keyword(pattern), []).append(Rule(tech, re.compile(pattern, re.I)))
+
+        keywords = {k for k in list(self.body) + list(self.scripts) if k}
+        # Words that are prefixes of a longer word match wherever it does
+        self._prefixes = {k: [k[:i] for i in range(MIN_KEYWORD, len(k) + 1) if k[:i] in keywords] for k in keywords}
+        self._keyword_re = re.compile(trie_regex(keywords)) if keywords else None
+
+    @classmethod
+    def load(cls, path: Path = SIGNATURES_PATH) -> "TechMatcher":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _keywords(self, text: str) -> set:
+        found = {None}
+        if self._keyword_re:
+            # Keywords are lower-case; a case-sensitive scan of lowered text is
+            # several times faster than re.I. Restarting one character after
+            # each match also finds keywords overlapping it.
+            text = text.lower()
+            pos = 0
+            while True:
+                m = self._keyword_re.search(text, pos)
+                if not m:
+                    break
+                found.update(self._prefixes[m.group()])
+                pos = m.start() + 1
+        return found
+
+    def match(self, headers: Dict[str, str], body: bytes) -> Dict[str, Optional[str]]:
+        """
+        Technologies found in one response, with their version when a
+        signature captures it. `headers` have lower-cased names.
+        """
+        found: Dict[str, Optional[str]] = {}
+
+        def hit(rule: Rule, value: str):
+            m = rule.pattern.search(value)
+            if m:
+                found[rule.tech] = _version(m) or found.get(rule.tech)
+
+        for name, value in headers.items():
+            for rule in self.headers.get(name, ()):
+                hit(rule, value)
+
+        for line in headers.get("set-cookie", "").split("\n"):
+            name, _, value = line.split(";", 1)[0].partition("=")
+            name = name.strip()
+            # Cookie signatures are name prefixes (BIGipServer<pool>, incap_ses_<id>)
+            for i in range(1, len(name) + 1):
+                for rule in self.cookies.get(name[:i], ()):
+                    hit(rule, value.strip())
+
+        text = body[:BODY_PREFIX].decode("utf-8", "replace")
+        for m in META_RE.finditer(text):
+            name = (m.group(1) or m.group(4)).lower()
+            for rule in self.meta.get(name, ()):
+                hit(rule, m.group(2) if m.group(1) else m.group(3))
+
+        keywords = self._keywords(text)
+        for key in keywords:
+            for rule in self.body.get(key, ()):
+                hit(rule, text)
+        script_rules = [rule for key in keywords for rule in self.scripts.get(key, ())]
+        if script_rules:
+            for src in SCRIPT_RE.findall(text):
+                for rule in script_rules:
+                    hit(rule, src)
+
+        self._add_implied(found)
+        return found
+
+    def _add_implied(self, found: Dict[str, Optional[str]]):
+        pending = list(found)
+        while pending:
+            for implied in self.signatures.get(pending.pop(), {}).get("implies") or []:
+                if implied not in found:
+                    found[implied] = None
+                    pending.append(implied)
+
+    def categories(self, tech: str) -> List[str]:
+        return list(self.signatures.get(tech, {}).get("categories") or [])
+
+
+_matcher: Optional[TechMatcher] = None
+
+
+def get_tech_matcher() -> TechMatcher:
+    """
+    Process-wide matcher, compiled on first use.
+    """
+    global _matcher
+    if _matcher is None:
+        _matcher = TechMatcher.load()
+    return _matcher
@@ -1,42 +1,100 @@
-from playwright.async_api import async_playwright
 import os
-import base64
-from typing import Dict
+import asyncio
+from typing import Dict, Optional
+
+from ..budgets import get_budget
+from .browser_pool import BrowserPool
+from .blob_store import get_blob_store, make_thumbnail
+from .http_engine import HttpEngine
+from .soft404 import fingerprint, to_dict
+from ..streams import bounded_map
 
 class VisualReconService:
+    # Shared pool started by the app lifespan; scans fall back to a
+    # throwaway one when it is not running (scripts, tests)
+    pool: Optional[BrowserPool] = None
+    MAX_TARGETS = int(os.environ.get("RECON_SCREENSHOT_LIMIT", "200"))
+
     @staticmethod
-    async def take_screenshots(subdomains: list[str]) -> Dict[str, str]:
+    async def start_pool(tabs: Optional[int] = None):
         """
-        Takes screenshots of the given subdomains (up to 5 to save time/resources).
-        Returns a dict of {subdomain: base64_image_string}.
+        Launch the shared browser pool for this process. Best effort: without
+        Chromium, scans just come back without screenshots.
         """
+        pool = BrowserPool(tabs=tabs or int(os.environ.get("RECON_BROWSER_TABS", "8")))
+        try:
+            await pool.start()
+            VisualReconService.pool = pool
+        except Exception as e:
+            print(f"Browser pool unavailable: {e}")
+
+    @staticmethod
+    async def stop_pool():
+        pool, VisualReconService.pool = VisualReconService.pool, None
+        if pool:
+            await pool.stop()
+
+    @staticmethod
+    async def take_screenshots(subdomains: list[str], pool: Optional[BrowserPool] = None,
+                               limit: Optional[int] = None, store=None) -> Dict[str, dict]:
+        """
+        Takes screenshots of the given subdomains (up to `limit`, default
+        MAX_TARGETS) on the shared browser pool, all tabs in parallel.
+        Images and their thumbnails go to the blob store.
+        Returns a dict of {subdomain: {"blob", "thumbnail", "size"}}.
+        """
+        store = store or get_blob_store()
         screenshots = {}
-        # Limit to first 5 subdomains for performance in this demo
-        targets = subdomains[:5]
-        
-        async with async_playwright() as p:
-            # Launch browser (headless)
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(viewport={'width': 1280, 'height': 720})
-            
-            for sub in targets:
-                page = await context.new_page()
-                try:
-                    url = f"http://{sub}"
-                    # Timeout after 5s
-                    await page.goto(url, timeout=10000, wait_until="domcontentloaded")
-                    screenshot_bytes = await page.screenshot(type='jpeg', quality=50) # Compress for storage
-                    
-                    # Convert to base64 for easy storage in DB/JSON
-                    b64_img = base64.b64encode(screenshot_bytes).decode('utf-8')
-                    screenshots[sub] = f"data:image/jpeg;base64,{b64_img}"
-                    print(f"Screenshot taken for {sub}")
-                    
-                except Exception as e:
-                    print(f"Failed to screenshot {sub}: {e}")
-                finally:
-                    await page.close()
-            
-            await browser.close()
-            
+        targets = subdomains[:limit or VisualReconService.MAX_TARGETS]
+        pool = pool or VisualReconService.pool
+        owned = pool is None or not pool.running
+        if owned:
+            pool = BrowserPool(tabs=min(8, max(1, len(targets))))
+            try:
+                await pool.start()
+            except Exception as e:
+                print(f"Could not launch browser: {e}")
+                return screenshots
+
+        async def capture(sub: str):
+            try:
+                # Tabs are shared with every other scan in the process
+                async with get_budget("browser").slot():
+                    screenshot_bytes = await pool.capture(f"http://{sub}")
+                thumbnail = await asyncio.to_thread(make_thumbnail, screenshot_bytes)
+                screenshots[sub] = {
+                    "blob": await store.put(screenshot_bytes),
+                    "thumbnail": await store.put(thumbnail) if thumbnail else None,
+                    "size": len(screenshot_bytes),
+                }
+                print(f"Screenshot taken for {sub}")
+            except Exception as e:
+                print(f"Failed to screenshot {sub}: {e}")
+
+        try:
+            await asyncio.gather(*(capture(sub) for sub in targets))
+        finally:
+            if owned:
+                await pool.stop()
+
         return screenshots
+
+    @staticmethod
+    async def fingerprint_hosts(hosts: list[str], engine: Optional[HttpEngine] = None) -> Dict[str, dict]:
+        """
+        Fetch each host's landing page and fingerprint it, so a later scan can
+        tell whether the page (and so its screenshot) changed.
+        Hosts that do not answer over HTTP are left out.
+        """
+        owned = engine is None
+        engine = engine or HttpEngine(concurrency=50, per_host=2, timeout=5, max_body=65536, follow_redirects=True)
+
+        async def probe(host: str):
+            response = await engine.fetch(f"http://{host}/")
+            return (host, to_dict(fingerprint(response))) if response else None
+
+        try:
+            return dict([pair async for pair in bounded_map(hosts, probe, engine.concurrency)])
+        finally:
+            if owned:
+                await engine.close()
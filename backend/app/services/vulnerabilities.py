@@ -0,0 +1,291 @@
+"""
+Offline CVE matching against NVD feed snapshots.
+
+    python -m app.services.vulnerabilities nvdcve-2.0-modified.json.gz [...]
+
+merges feed files (NVD API 2.0 or legacy 1.1 JSON, optionally gzipped)
+into the local database; CVEs already present are replaced by newer
+revisions, so the daily "modified" feed keeps it current.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SIGNATURES_DIR = Path(__file__).resolve().parent.parent / "signatures"
+SEED_FEED = SIGNATURES_DIR / "nvd_seed.json"
+PRODUCTS_PATH = SIGNATURES_DIR / "cpe_products.json"
+DB_DIR = Path(os.environ.get("RECON_CVE_DIR", Path(__file__).resolve().parents[2] / "data" / "cve"))
+DB_FILE = "db.json.gz"
+
+_VERSION_PART_RE = re.compile(r"\d+|[a-z]+")
+
+
+def version_key(version: str) -> tuple:
+    """
+    Sortable form of a version string: 2.4.49 < 2.4.50 < 2.10, 8.9p1 < 9.3.
+    Letters sort below numbers so 9.3 > 9.rc1.
+    """
+    return tuple((1, int(p), "") if p.isdigit() else (0, 0, p) for p in _VERSION_PART_RE.findall(version.lower()))
+
+
+def _open(path: Path):
+    return gzip.open(path, "rt", encoding="utf-8") if str(path).endswith(".gz") else open(path, encoding="utf-8")
+
+
+def _cpe_matches(nodes: list) -> Iterator[dict]:
+    for node in nodes or []:
+        # 1.1 feeds nest nodes under "children" and call the list "cpe_match"
+        yield from node.get("cpeMatch") or node.get("cpe_match") or []
+        yield from _cpe_matches(node.get("children"))
+
+
+def _range(match: dict) -> Optional[list]:
+    """
+    [vendor:product, start, start_inclusive, end, end_inclusive] for one
+    vulnerable CPE match; None bounds are open.
+    """
+    if not match.get("vulnerable", True):
+        return None
+    cpe = (match.get("criteria") or match.get("cpe23Uri") or "").split(":")
+    if len(cpe) < 6:
+        return None
+    product, version = f"{cpe[3]}:{cpe[4]}", cpe[5]
+    if version == "-":
+        # "not applicable": the product has no versions to compare
+        return None
+    start = match.get("versionStartIncluding") or match.get("versionStartExcluding")
+    end = match.get("versionEndIncluding") or match.get("versionEndExcluding")
+    if version not in ("*", ""):
+        if start or end:
+            return None
+        version = version.replace("\\", "")
+        if len(cpe) > 6 and cpe[6] not in ("*", "-", ""):
+            # Update field: openssh:9.3:p1 is version 9.3p1
+            version += cpe[6]
+        return [product, version, True, version, True]
+    return [product, start, "versionStartExcluding" not in match, end, "versionEndExcluding" not in match]
+
+
+def _score(metrics: dict) -> Tuple[Optional[float], Optional[str]]:
+    for name in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV2"):
+        for metric in metrics.get(name) or []:
+            data = metric.get("cvssData") or {}
+            return data.get("baseScore"), data.get("baseSeverity") or metric.get("baseSeverity")
+    return None, None
+
+
+def parse_feed(path: Path) -> Iterator[dict]:
+    """
+    CVE records from an NVD feed file: id, summary, score, severity,
+    last_modified, rejected and version ranges per product.
+    """
+    with _open(path) as f:
+        feed = json.load(f)
+    if "vulnerabilities" in feed:
+        for item in feed["vulnerabilities"]:
+            cve = item["cve"]
+            score, severity = _score(cve.get("metrics") or {})
+            summary = next((d["value"] for d in cve.get("descriptions") or [] if d.get("lang") == "en"), "")
+            nodes = [node for config in cve.get("configurations") or [] for node in config.get("nodes") or []]
+            yield {
+                "id": cve["id"], "summary": summary, "score": score, "severity": severity,
+                "last_modified": cve.get("lastModified", ""), "rejected": cve.get("vulnStatus") == "Rejected",
+                "ranges": [r for r in map(_range, _cpe_matches(nodes)) if r],
+            }
+    else:
+        for item in feed.get("CVE_Items") or []:
+            meta = item["cve"]["CVE_data_meta"]
+            summary = next((d["value"] for d in item["cve"]["description"]["description_data"] if d.get("lang") == "en"), "")
+            impact = item.get("impact") or {}
+            v3 = (impact.get("baseMetricV3") or {}).get("cvssV3") or {}
+            v2 = impact.get("baseMetricV2") or {}
+            yield {
+                "id": meta["ID"], "summary": summary,
+                "score": v3.get("baseScore", (v2.get("cvssV2") or {}).get("baseScore")),
+                "severity": v3.get("baseSeverity", v2.get("severity")),
+                "last_modified": item.get("lastModifiedDate", ""), "rejected": summary.startswith("** REJECT **"),
+                "ranges": [r for r in map(_range, _cpe_matches((item.get("configurations") or {}).get("nodes"))) if r],
+            }
+
+
+class ProductIndex:
+    """
+    All vulnerable version ranges of one product, cut into elementary
+    segments at every range boundary. Each boundary version and each gap
+    between two boundaries knows the CVEs covering it, so a lookup is one
+    bisect no matter how many ranges there are.
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[str, list]]):
+        bounds = set()
+        parsed = []
+        for cve_id, (_, start, start_incl, end, end_incl) in ranges:
+            start = version_key(start) if start else None
+            end = version_key(end) if end else None
+            parsed.append((cve_id, start, start_incl, end, end_incl))
+            bounds.update(b for b in (start, end) if b is not None)
+        self.points = sorted(bounds)
+        n = len(self.points)
+        at: List[set] = [set() for _ in range(n)]
+        # between[j]: versions strictly between points[j-1] and points[j]
+        between: List[set] = [set() for _ in range(n + 1)]
+        for cve_id, start, start_incl, end, end_incl in parsed:
+            a = 0 if start is None else bisect_left(self.points, start)
+            b = n - 1 if end is None else bisect_left(self.points, end)
+            for i in range(a, b + 1):
+                if (i == a and start is not None and not start_incl) or (i == b and end is not None and not end_incl):
+                    continue
+                at[i].add(cve_id)
+            for j in range(0 if start is None else a + 1, (n if end is None else b) + 1):
+                between[j].add(cve_id)
+        self.at = [tuple(sorted(s)) for s in at]
+        self.between = [tuple(sorted(s)) for s in between]
+
+    def lookup(self, version: str) -> Tuple[str, ...]:
+        key = version_key(version)
+        i = bisect_left(self.points, key)
+        if i < len(self.points) and self.points[i] == key:
+            return self.at[i]
+        return self.between[i]
+
+
+class VulnerabilityDB:
+    """
+    CVE records plus a lazily built ProductIndex per CPE vendor:product.
+    Updating replaces whole CVEs and drops only the indexes of the products
+    they touch.
+    """
+
+    def __init__(self, products: Optional[Dict[str, List[str]]] = None):
+        self.cves: Dict[str, dict] = {}
+        self.products = products or {}  # detected name -> CPE vendor:product list
+        self._by_product: Dict[str, set] = {}
+        self._indexes: Dict[str, ProductIndex] = {}
+
+    def _remove(self, cve_id: str):
+        old = self.cves.pop(cve_id, None)
+        for product, *_ in (old or {}).get("ranges", []):
+            self._by_product.get(product, set()).discard(cve_id)
+            self._indexes.pop(product, None)
+
+    def update(self, records: Iterable[dict]) -> int:
+        changed = 0
+        for record in records:
+            current = self.cves.get(record["id"])
+            if current and current.get("last_modified", "") > record.get("last_modified", ""):
+                continue
+            self._remove(record["id"])
+            changed += 1
+            if record.get("rejected") or not record["ranges"]:
+                continue
+            self.cves[record["id"]] = record
+            for product, *_ in record["ranges"]:
+                self._by_product.setdefault(product, set()).add(record["id"])
+                self._indexes.pop(product, None)
+        return changed
+
+    def lookup(self, product: str, version: str) -> List[dict]:
+        """
+        CVEs affecting `version` of a CPE vendor:product.
+        """
+        ids = self._by_product.get(product)
+        if not ids or not version:
+            return []
+        index = self._indexes.get(product)
+        if index is None:
+            ranges = ((i, r) for i in ids for r in self.cves[i]["ranges"] if r[0] == product)
+            index = self._indexes[product] = ProductIndex(ranges)
+        return [self.cves[i] for i in index.lookup(version)]
+
+    def match(self, name: str, version: Optional[str]) -> List[dict]:
+        """
+        CVEs for a product as named by fingerprinting or banner grabbing
+        ("Apache HTTP Server", "OpenSSH").
+        """
+        if not version:
+            return []
+        found = {}
+        for product in self.products.get(name, []):
+            for cve in self.lookup(product, version):
+                found[cve["id"]] = cve
+        return list(found.values())
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(list(self.cves.values()), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "VulnerabilityDB":
+        """
+        The saved database, or the bundled seed feed when none was built yet.
+        """
+        with open(PRODUCTS_PATH, encoding="utf-8") as f:
+            db = cls(json.load(f))
+        path = path or DB_DIR / DB_FILE
+        if path.exists():
+            with _open(path) as f:
+                db.update(json.load(f))
+        else:
+            db.update(parse_feed(SEED_FEED))
+        return db
+
+
+_db: Optional[VulnerabilityDB] = None
+
+
+def get_vulnerability_db() -> VulnerabilityDB:
+    global _db
+    if _db is None:
+        _db = VulnerabilityDB.load()
+    return _db
+
+
+def match_vulnerabilities(tech_stack: List[dict], ports: Iterable) -> List[dict]:
+    """
+    Vulnerabilities for every detected version: web technologies (on their
+    hosts) and banner-identified services (on ip:port). Highest score first.
+    """
+    db = get_vulnerability_db()
+    found: Dict[tuple, dict] = {}
+
+    def add(product: str, version: Optional[str], targets: List[str]):
+        for cve in db.match(product, version):
+            key = (cve["id"], product, version)
+            if key not in found:
+                found[key] = {
+                    "id": cve["id"], "product": product, "version": version, "score": cve.get("score"),
+                    "severity": cve.get("severity"), "summary": cve.get("summary", ""), "targets": [],
+                }
+            found[key]["targets"].extend(t for t in targets if t not in found[key]["targets"])
+
+    for tech in tech_stack:
+        add(tech["name"], tech.get("version"), tech.get("hosts") or [])
+    for result in ports:
+        for port, info in (result.services or {}).items():
+            if info.product:
+                add(info.product, info.version, [f"{result.ip}:{port}"])
+    return sorted(found.values(), key=lambda v: (-(v["score"] or 0), v["id"], v["product"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge NVD feed files into the local CVE database.")
+    parser.add_argument("feeds", nargs="+", type=Path)
+    parser.add_argument("--db", type=Path, default=DB_DIR / DB_FILE)
+    args = parser.parse_args()
+    db = VulnerabilityDB.load(args.db)
+    for feed in args.feeds:
+        print(f"{feed}: {db.update(parse_feed(feed))} CVEs added or updated.")
+    db.save(args.db)
+    print(f"{len(db.cves)} CVEs in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import asyncio
+import secrets
+from typing import Dict, Iterable, Set
+
+from .dns_resolver import AsyncResolver, Resolution
+
+
+class WildcardFilter:
+    """
+    Learns the answers a zone hands out for names that cannot exist, then
+    recognises brute-force hits that are really just that wildcard.
+
+    Zones are tracked per level, so `*.example.com` and `*.dev.example.com`
+    can both be learned and matched independently.
+    """
+
+    def __init__(self, probes: int = 3):
+        self.probes = probes
+        self.addresses: Dict[str, Set[str]] = {}
+        self.cnames: Dict[str, Set[str]] = {}
+
+    @property
+    def zones(self) -> Set[str]:
+        return set(self.addresses) | set(self.cnames)
+
+    async def learn(self, resolver: AsyncResolver, zones: Iterable[str]):
+        """
+        Probe a few random labels under every zone. Several probes per zone
+        catch wildcards backed by round-robin address pools.
+        """
+        zones = {z.lower().rstrip(".") for z in zones}
+
+        async def probe(zone: str):
+            names = [f"{secrets.token_hex(8)}.{zone}" for _ in range(self.probes)]
+            results = await asyncio.gather(*(resolver.resolve(name) for name in names))
+            for result in results:
+                if result:
+                    self.addresses.setdefault(zone, set()).update(result.addresses)
+                    if result.cnames:
+                        self.cnames.setdefault(zone, set()).update(result.cnames)
+            if zone in self.zones:
+                print(f"Wildcard DNS detected for *.{zone}")
+
+        await asyncio.gather(*(probe(zone) for zone in zones))
+
+    def is_wildcard(self, result: Resolution) -> bool:
+        """
+        True if `result` matches the wildcard answer of any zone above it.
+        """
+        if not self.addresses and not self.cnames:
+            return False
+        labels = result.name.lower().rstrip(".").split(".")
+        for i in range(1, len(labels)):
+            zone = ".".join(labels[i:])
+            cnames = self.cnames.get(zone)
+            if cnames and cnames.intersection(result.cnames):
+                return True
+            addresses = self.addresses.get(zone)
+            if addresses and set(result.addresses) <= addresses:
+                return True
+        return False
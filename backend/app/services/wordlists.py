@@ -0,0 +1,334 @@
+"""
+Compiled wordlists. A text list (or several, merged) is compiled once into
+a binary file under RECON_WORDLIST_DIR: deduplicated, with a sorted index
+for membership tests and an iteration order that puts the words with the
+most past hits first (source order breaks ties). Compiled lists are
+memory-mapped, so all worker processes share one copy of the pages, and
+are decoded lazily in chunks.
+
+    python -m app.services.wordlists subdomains.txt [more.txt ...]
+
+compiles (and merges) lists ahead of time and shows the top-ranked words.
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+WORDLISTS_DIR = Path(__file__).resolve().parents[2] / "wordlists"
+DEFAULT_COMPILED_DIR = Path(__file__).resolve().parents[2] / "data" / "wordlists"
+# Seconds between re-rankings of a list whose hit counts changed
+RERANK_INTERVAL = float(os.environ.get("RECON_WORDLIST_RERANK_SECONDS", "600"))
+CHUNK_SIZE = 4096
+
+MAGIC = b"RWL2"
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _stamp(paths: List[Path]) -> list:
+    stamp = []
+    for path in paths:
+        st = path.stat()
+        stamp.append([str(path), st.st_size, st.st_mtime_ns])
+    return stamp
+
+
+def _key(path: Path) -> Optional[str]:
+    """
+    "subdomains-1a2b3c4d5e6f" for ".../subdomains-1a2b3c4d5e6f.<version>.wl",
+    None for a file not named that way.
+    """
+    parts = path.name.rsplit(".", 2)
+    return parts[0] if len(parts) == 3 and len(parts[1]) == 16 else None
+
+
+def _hits_stamp(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def compile_wordlist(sources: List[Path], target: Path, hits: Optional[Dict[str, int]] = None,
+                     meta: Optional[dict] = None) -> int:
+    """
+    Write the deduplicated union of `sources` to `target` (atomically) and
+    return the number of words. Layout, after a JSON header (which also
+    holds the list's suffixes, see Wordlist.suffixes): offsets of
+    the words in sorted order (uint64), the iteration order as indexes
+    into them (uint32), then the word bytes.
+    """
+    first: Dict[bytes, int] = {}  # word -> position of its first occurrence
+    for source in sources:
+        with open(source, "rb") as f:
+            for line in f:
+                word = line.strip()
+                if word and word not in first:
+                    first[word] = len(first)
+    words = sorted(first)
+    hits = {w.encode(): n for w, n in (hits or {}).items()}
+    order = array("I", sorted(range(len(words)), key=lambda i: (-hits.get(words[i], 0), first[words[i]])))
+    offsets = array("Q", [0])
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+
+    # Parent labels of dotted words, read by Wordlist.suffixes()
+    suffixes = sorted({w.split(b".", 1)[1].decode("utf-8", "replace") for w in words if b"." in w})
+    header = json.dumps({**(meta or {}), "count": len(words), "byteorder": sys.byteorder,
+                         "suffixes": suffixes, "compiled": time.time()}).encode()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        start = _align(len(MAGIC) + 4 + len(header))
+        f.write(MAGIC + len(header).to_bytes(4, "little") + header + b"\0" * (start - 8 - len(header)))
+        f.write(offsets.tobytes())
+        f.write(order.tobytes())
+        f.write(b"" if len(words) % 2 == 0 else b"\0" * 4)
+        for word in words:
+            f.write(word)
+    os.replace(tmp, target)
+    return len(words)
+
+
+class Wordlist(Sequence):
+    """
+    Read-only view of a compiled list. Iterating yields words best-ranked
+    first; `in` is a binary search over the sorted index.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            raise ValueError(f"{path} is not a compiled wordlist")
+        size = int.from_bytes(self.map[4:8], "little")
+        self.meta = json.loads(self.map[8:8 + size])
+        self.count = self.meta["count"]
+        start = _align(8 + size)
+        order_start = start + 8 * (self.count + 1)
+        self.data_start = _align(order_start + 4 * self.count)
+        view = memoryview(self.map)
+        self._offsets = view[start:order_start].cast("Q")
+        self._order = view[order_start:order_start + 4 * self.count].cast("I")
+
+    def _word(self, i: int) -> bytes:
+        return self.map[self.data_start + self._offsets[i]:self.data_start + self._offsets[i + 1]]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self._word(self._order[index]).decode("utf-8", "replace")
+
+    def chunks(self, size: int = CHUNK_SIZE) -> Iterator[List[str]]:
+        for start in range(0, self.count, size):
+            yield [self._word(i).decode("utf-8", "replace") for i in self._order[start:start + size]]
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self.chunks():
+            yield from chunk
+
+    def __contains__(self, word) -> bool:
+        if not isinstance(word, str):
+            return False
+        key = word.encode()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < self.count and self._word(lo) == key
+
+    def suffixes(self) -> List[str]:
+        """
+        "dev" and "corp" for "api.dev" and "vpn.eu.corp": the parent labels
+        of dotted words, i.e. the nested zones a subdomain list reaches into.
+        Computed when the list is compiled, so nothing is decoded here.
+        """
+        return self.meta["suffixes"]
+
+
+class WordlistStore:
+    """
+    Compiles lists on first use (and again when a source file changes) and
+    keeps them open for the life of the process. Hit counts are kept next
+    to each compiled list; get() re-ranks by them at most every
+    `rerank_interval` seconds. get() may compile, so async callers run it
+    in a thread; concurrent calls are serialized.
+    """
+
+    def __init__(self, source_dir: Path = WORDLISTS_DIR, compiled_dir: Path = DEFAULT_COMPILED_DIR,
+                 rerank_interval: float = RERANK_INTERVAL):
+        self.source_dir = Path(source_dir)
+        self.compiled_dir = Path(compiled_dir)
+        self.rerank_interval = rerank_interval
+        self._open: Dict[str, Wordlist] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, source: str) -> Optional[Path]:
+        """
+        A path as given (relative to the working directory), else a bundled
+        list of that file name ("subdomains.txt" or just "subdomains").
+        """
+        path = Path(source)
+        for candidate in (path, self.source_dir / path.name, self.source_dir / f"{path.name}.txt"):
+            if candidate.is_file():
+                return candidate.resolve()
+        return None
+
+    def _hits_path(self, wordlist: Wordlist) -> Path:
+        return self.compiled_dir / f"{_key(wordlist.path)}.hits.json"
+
+    def _newest(self, key: str) -> Optional[Path]:
+        return max((path for path in self.compiled_dir.glob("*.wl") if _key(path) == key), default=None)
+
+    def _load_hits(self, path: Path) -> dict:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"runs": 0, "hits": {}}
+
+    def _current(self, wordlist: Optional[Wordlist], stamp: list, hits_path: Path) -> bool:
+        if wordlist is None or wordlist.meta.get("sources") != stamp or wordlist.meta["byteorder"] != sys.byteorder:
+            return False
+        if wordlist.meta.get("hits") == _hits_stamp(hits_path):
+            return True
+        return time.time() - wordlist.meta["compiled"] < self.rerank_interval
+
+    def prune(self):
+        """
+        Delete compiled lists superseded by a newer version, in an old
+        format, or whose source files are gone (temporary lists). A version
+        that is still mapped somewhere cannot be deleted on Windows; it goes
+        on a later prune.
+        """
+        newest = {}
+        for path in sorted(self.compiled_dir.glob("*.wl"), reverse=True):
+            key = _key(path)
+            try:
+                with open(path, "rb") as f:
+                    head = f.read(8)
+                    meta = json.loads(f.read(int.from_bytes(head[4:8], "little")))
+                if key is None or head[:4] != MAGIC:
+                    path.unlink()
+                elif not all(os.path.exists(source) for source, _, _ in meta.get("sources", [])):
+                    path.unlink()
+                    (self.compiled_dir / f"{key}.hits.json").unlink(missing_ok=True)
+                elif newest.setdefault(key, path) != path:
+                    path.unlink()
+            except (OSError, ValueError):
+                continue
+
+    def get(self, *sources: str) -> Optional[Wordlist]:
+        """
+        The compiled list of `sources` merged, or None if none of them exist.
+        """
+        paths = []
+        for source in sources:
+            path = self.resolve(source)
+            if path is None:
+                print(f"Wordlist not found at {source}")
+            elif path not in paths:
+                paths.append(path)
+        if not paths:
+            return None
+        stamp = _stamp(paths)
+        digest = hashlib.sha1("\0".join(map(str, paths)).encode()).hexdigest()[:12]
+        key = f"{'+'.join(p.stem for p in paths)[:64]}-{digest}"
+        with self._lock:
+            return self._get(key, paths, stamp)
+
+    def _get(self, key: str, paths: List[Path], stamp: list) -> Wordlist:
+        hits_path = self.compiled_dir / f"{key}.hits.json"
+        wordlist = self._open.get(key)
+        if self._current(wordlist, stamp, hits_path):
+            return wordlist
+        newest = self._newest(key)
+        try:
+            # Compiled by an earlier run or another process
+            wordlist = Wordlist(newest) if newest else None
+        except (OSError, ValueError):
+            wordlist = None
+        if not self._current(wordlist, stamp, hits_path):
+            # Every compile is a new file: one still mapped (here or by
+            # another worker) cannot be replaced on Windows
+            target = self.compiled_dir / f"{key}.{time.time_ns():016x}.wl"
+            hits_mtime = _hits_stamp(hits_path)
+            hits = self._load_hits(hits_path)["hits"] if hits_mtime else None
+            count = compile_wordlist(paths, target, hits, {"sources": stamp, "hits": hits_mtime})
+            print(f"Compiled wordlist {key} ({count} words)")
+            self.prune()
+            wordlist = Wordlist(target)
+        # The previous version stays mapped until the scans iterating it let go
+        self._open[key] = wordlist
+        return wordlist
+
+    def record_hits(self, wordlist: Wordlist, words: Iterable[str]):
+        """
+        Count one run of `wordlist` and which of its words hit. Best effort:
+        concurrent runs in other processes may drop each other's counts.
+        """
+        path = self._hits_path(wordlist)
+        try:
+            stats = self._load_hits(path)
+            stats["runs"] += 1
+            for word in set(words):
+                if word in wordlist:
+                    stats["hits"][word] = stats["hits"].get(word, 0) + 1
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(stats, f)
+            os.replace(tmp, path)
+        except (OSError, ValueError) as e:
+            print(f"Wordlist hits not saved: {e}")
+
+
+_store: Optional[WordlistStore] = None
+
+
+def get_wordlist_store() -> WordlistStore:
+    """
+    Process-wide store, compiling into RECON_WORDLIST_DIR.
+    """
+    global _store
+    if _store is None:
+        _store = WordlistStore(compiled_dir=os.environ.get("RECON_WORDLIST_DIR", DEFAULT_COMPILED_DIR))
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile (and merge) wordlists for the recon services.")
+    parser.add_argument("sources", nargs="+", help="wordlist files, or names of bundled lists")
+    parser.add_argument("--top", type=int, default=10, help="show this many top-ranked words")
+    args = parser.parse_args()
+    wordlist = get_wordlist_store().get(*args.sources)
+    if wordlist is None:
+        sys.exit(1)
+    print(f"{wordlist.path}: {len(wordlist)} words")
+    for word in wordlist[:args.top]:
+        print(f"  {word}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .cache import get_cache
+from .metrics import ERRORS
+from .scheduler import Stage, StageScheduler
+from .schemas import SubdomainResult, PortResult
+from .services.subdomain import SubdomainService
+from .services.port_scan import PortScanService
+from .services.connect_scan import parse_ports
+from .services.banner import BannerService, HTTP_PORTS, TLS_PORTS
+from .services.dns_resolver import AsyncResolver
+from .services.osint import OsintService, UNREACHABLE
+from .services.fuzzing import FuzzingService
+from .services.visual_recon import VisualReconService
+from .services.soft404 import from_dict, same_page
+from .services.vulnerabilities import match_vulnerabilities
+
+# Minimum seconds between partial-result events from a streaming stage
+PUBLISH_INTERVAL = 1.0
+
+
+class ScanContext:
+    """
+    Shared state passed between recon stages. Each stage only reads fields
+    written by the stages it depends on.
+    """
+
+    def __init__(self, scan_id: str, domain: str, port_spec: Optional[str] = None):
+        self.scan_id = scan_id
+        self.domain = domain
+        self.port_spec = port_spec
+        self.subdomains: List[str] = [domain]
+        self.hosts: Dict[str, List[str]] = {}  # live hostname -> IPs
+        self.ports: List[PortResult] = []
+        self.technologies: List[str] = []
+        self.tech_stack: List[dict] = []  # {name, version, categories, hosts}
+        self.directories: List[str] = []
+        self.screenshots: Dict[str, dict] = {}  # subdomain -> blob refs
+        self.vulnerabilities: List[dict] = []
+        self.http_services: List[str] = []  # base URLs that were fuzzed
+        self.http_fingerprints: Dict[str, dict] = {}  # host -> landing page fingerprint
+        # Previous completed scan of the domain, for incremental re-scans
+        self.baseline: Optional[dict] = None
+        # Set by the runner to persist partial results while stages stream
+        self.on_extend: Optional[Callable[[str, list], Awaitable[None]]] = None
+
+    def baseline_for(self, stage: str) -> Optional[dict]:
+        """
+        The baseline if `stage` completed in it, else None: a stage the
+        previous scan skipped (scan_types) or failed runs in full.
+        """
+        if not self.baseline:
+            return None
+        completed = self.baseline.get("completed_stages")
+        # Scans from before stages were checkpointed ran every stage
+        if completed is None or stage in completed:
+            return self.baseline
+        return None
+
+    async def extend(self, field: str, items: list):
+        """
+        Append to a list field; only the new items are handed to on_extend.
+        """
+        getattr(self, field).extend(items)
+        if self.on_extend:
+            try:
+                await self.on_extend(field, [item.dict() if hasattr(item, "dict") else item for item in items])
+            except Exception as e:
+                print(f"Partial update failed: {e}")
+                ERRORS.inc(component="publish")
+
+    def result(self) -> dict:
+        return {
+            "subdomains": SubdomainResult(subdomains=self.subdomains, count=len(self.subdomains)).dict(),
+            "hosts": self.hosts,
+            "ports": [p.dict() for p in self.ports],
+            "technologies": self.technologies,
+            "tech_stack": self.tech_stack,
+            "directories": self.directories,
+            "screenshots": self.screenshots,
+            "vulnerabilities": self.vulnerabilities,
+            "http_services": self.http_services,
+            "http_fingerprints": self.http_fingerprints,
+        }
+
+    def restore(self, doc: dict, fields: Iterable[str]):
+        """
+        Reload fields saved by a previous run's checkpoints (inverse of result()).
+        """
+        for field in fields:
+            value = doc.get(field)
+            if value is None:
+                continue
+            if field == "subdomains":
+                self.subdomains = value["subdomains"]
+            elif field == "ports":
+                self.ports = [PortResult(**p) for p in value]
+            else:
+                setattr(self, field, value)
+
+
+async def subdomain_stage(ctx: ScanContext):
+    print("Running Subdomain Discovery...")
+    baseline = ctx.baseline_for("subdomains")
+    if baseline:
+        # Incremental: the brute force already ran last time; only CT logs can
+        # add names, and every known name is re-resolved by the next stage
+        known = (baseline.get("subdomains") or {}).get("subdomains") or []
+        passive_subs = await SubdomainService.lookup_ct_logs(ctx.domain)
+        print(f"{len(set(passive_subs) - set(known))} new subdomains in CT logs.")
+        ctx.subdomains = sorted(set(known) | set(passive_subs)) or [ctx.domain]
+        return
+
+    # Passive (CT logs) and active (DNS brute force) discovery run side by side
+    passive_subs, brute_subs = await asyncio.gather(
+        SubdomainService.lookup_ct_logs(ctx.domain),
+        SubdomainService.get_subdomains_bruteforce(ctx.domain),
+    )
+    # Fallback if discovery fails: use the domain itself
+    if not passive_subs and not brute_subs:
+        print("Subdomain discovery failed or returned 0. Using main domain only.")
+        ctx.subdomains = [ctx.domain]
+    else:
+        ctx.subdomains = list(set(passive_subs) | set(brute_subs))
+
+
+async def resolve_stage(ctx: ScanContext):
+    print("Resolving discovered hosts...")
+    async with AsyncResolver(cache=get_cache("dns")) as resolver:
+        names = dict.fromkeys([ctx.domain] + ctx.subdomains)
+        async for hit in resolver.resolve_many(names):
+            ctx.hosts[hit.name] = hit.addresses
+    print(f"{len(ctx.hosts)} of {len(names)} hosts resolved.")
+
+
+async def port_stage(ctx: ScanContext):
+    print("Running Port Scan...")
+    # Every live host, deduplicated by IP
+    ips = sorted({ip for addresses in ctx.hosts.values() for ip in addresses})
+    ports = parse_ports(ctx.port_spec) if ctx.port_spec else None
+    scans = [(ips, ports)]
+    baseline = ctx.baseline_for("ports")
+    if baseline:
+        # Incremental: every IP still gets every port, since newly opened
+        # ports are what a repeat scan is for, but the ports open last time
+        # go first so the connect scan re-checks them early
+        previous = {result["ip"]: result["ports"] for result in baseline.get("ports") or []}
+        every = ports or PortScanService.COMMON_PORTS
+        groups: Dict[tuple, List[str]] = {}
+        for ip in ips:
+            groups.setdefault(tuple(previous.get(ip) or []), []).append(ip)
+        scans = [(group, list(first) + [p for p in every if p not in first]) for first, group in groups.items()]
+
+    for group, group_ports in scans:
+        if not group:
+            continue
+        async for result in PortScanService.scan_common_ports(group, group_ports):
+            if result.ports:
+                print(f"Found ports on {result.ip}: {result.ports}")
+                await ctx.extend("ports", [result])
+
+
+async def banner_stage(ctx: ScanContext):
+    print("Running Banner Grabbing...")
+    # Use a real hostname per IP for SNI and the Host header
+    hostnames = {}
+    for host, addresses in ctx.hosts.items():
+        for ip in addresses:
+            hostnames.setdefault(ip, host)
+    await BannerService.grab_banners(ctx.ports, hostnames)
+
+
+async def osint_stage(ctx: ScanContext):
+    print("Running OSINT...")
+    # Every HTTP(S) service the port scan found, on whatever port it runs
+    targets = http_targets(ctx)
+    detections = await OsintService.detect_hosts(targets)
+    ctx.tech_stack = OsintService.merge(detections)
+    ctx.technologies = OsintService.labels(ctx.tech_stack) if detections else list(UNREACHABLE)
+    print(f"{len(ctx.tech_stack)} technologies on {len(detections)} of {len(targets)} HTTP services.")
+
+
+def http_targets(ctx: ScanContext) -> List[str]:
+    """
+    Base URLs for every live hostname/port pair that looks like HTTP(S).
+    Hostnames rather than IPs are used so virtual hosts are fuzzed separately.
+    """
+    open_ports = {result.ip: result.ports for result in ctx.ports}
+    targets = []
+    for host, addresses in ctx.hosts.items():
+        ports = sorted({p for ip in addresses for p in open_ports.get(ip, []) if p in HTTP_PORTS})
+        for port in ports:
+            scheme = "https" if port in TLS_PORTS else "http"
+            default = 443 if scheme == "https" else 80
+            targets.append(f"{scheme}://{host}" if port == default else f"{scheme}://{host}:{port}")
+    return targets or [f"http://{ctx.domain}"]
+
+
+async def fuzzing_stage(ctx: ScanContext):
+    targets = http_targets(ctx)
+    ctx.http_services = targets
+
+    async def found(url: str, status: int):
+        await ctx.extend("directories", [f"{url} (Status: {status})"])
+
+    baseline = ctx.baseline_for("fuzzing")
+    if baseline:
+        # Incremental: services fuzzed last time only get their known paths
+        # re-checked; new services are fuzzed in full below
+        known = set(baseline.get("http_services") or []) & set(targets)
+        previous = [entry.split(" (Status:")[0] for entry in baseline.get("directories") or []]
+        recheck = [url for url in previous if any(url.startswith(base + "/") for base in known)]
+        print(f"Re-checking {len(recheck)} known paths on {len(known)} HTTP services...")
+        async for response in FuzzingService.recheck_paths(recheck):
+            await found(response.url, response.status)
+        targets = [t for t in targets if t not in known]
+
+    print(f"Running Directory Fuzzing on {len(targets)} HTTP services...")
+    if targets:
+        async for hit in FuzzingService.fuzz_hosts(targets, extensions=FuzzingService.DEFAULT_EXTENSIONS, max_depth=1):
+            await found(hit.url, hit.status)
+
+
+async def screenshot_stage(ctx: ScanContext):
+    print("Running Visual Recon...")
+    # Main domain first, up to the screenshot cap
+    targets_for_screen = ([ctx.domain] + [s for s in ctx.subdomains if s != ctx.domain])[:VisualReconService.MAX_TARGETS]
+    ctx.http_fingerprints = await VisualReconService.fingerprint_hosts(targets_for_screen)
+    baseline = ctx.baseline_for("screenshots")
+    if baseline:
+        # Incremental: keep last screenshot of every page that still looks the same
+        old_prints = baseline.get("http_fingerprints") or {}
+        old_shots = baseline.get("screenshots") or {}
+        changed = []
+        for host, fp in ctx.http_fingerprints.items():
+            if host in old_shots and host in old_prints and same_page(from_dict(fp), from_dict(old_prints[host])):
+                ctx.screenshots[host] = old_shots[host]
+            else:
+                changed.append(host)
+        print(f"{len(ctx.screenshots)} pages unchanged, re-capturing {len(changed)}.")
+        targets_for_screen = changed
+    if targets_for_screen:
+        ctx.screenshots.update(await VisualReconService.take_screenshots(targets_for_screen))
+
+
+async def vuln_stage(ctx: ScanContext):
+    ctx.vulnerabilities = match_vulnerabilities(ctx.tech_stack, ctx.ports)
+
+
+# ScanRequest.scan_types -> the stages that produce them. Stages they depend
+# on run as well (e.g. "directories" needs the port scan); "all" runs everything.
+SCAN_TYPES = {
+    "subdomains": ["subdomains", "resolve"],
+    "ports": ["ports", "banners"],
+    "osint": ["osint"],
+    "directories": ["fuzzing"],
+    "screenshots": ["screenshots"],
+    "vulnerabilities": ["vulnerabilities"],
+}
+
+
+def stages_for(scan_types: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """
+    Stage names for a list of scan types, or None for a full scan. Raises
+    ValueError for unknown types.
+    """
+    scan_types = list(scan_types or ["all"])
+    if "all" in scan_types:
+        return None
+    unknown = [t for t in scan_types if t not in SCAN_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown scan types: {', '.join(unknown)} (expected all, {', '.join(SCAN_TYPES)})")
+    return [stage for t in scan_types for stage in SCAN_TYPES[t]]
+
+
+def build_recon_pipeline() -> StageScheduler:
+    """
+    Recon DAG. Only real data dependencies are declared, everything else runs
+    concurrently: port scanning needs the resolved hosts, tech fingerprinting
+    and fuzzing need the open HTTP ports, screenshots need the subdomain list
+    and vuln matching needs the detected tech stack and service banners.
+    """
+    return StageScheduler([
+        Stage("subdomains", subdomain_stage, outputs=["subdomains"]),
+        Stage("resolve", resolve_stage, depends=["subdomains"], outputs=["hosts"]),
+        Stage("ports", port_stage, depends=["resolve"], outputs=["ports"]),
+        Stage("banners", banner_stage, depends=["ports"], outputs=["ports"]),
+        Stage("osint", osint_stage, depends=["ports"], outputs=["technologies", "tech_stack"]),
+        Stage("fuzzing", fuzzing_stage, depends=["ports"], outputs=["directories", "http_services"]),
+        Stage("screenshots", screenshot_stage, depends=["subdomains"], outputs=["screenshots", "http_fingerprints"]),
+        Stage("vulnerabilities", vuln_stage, depends=["osint", "banners"], outputs=["vulnerabilities"]),
+    ])
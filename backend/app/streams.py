@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def bounded_map(items: Iterable[T], func: Callable[[T], Awaitable[Optional[R]]], concurrency: int) -> AsyncIterator[R]:
+    """
+    Apply `func` to a (possibly huge, lazily produced) iterable with at most
+    `concurrency` calls in flight, yielding non-None results as they complete.
+    Closing the generator early, or a call raising, cancels the outstanding
+    work; the exception is re-raised to the consumer.
+    """
+    items = iter(items)
+    results: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def worker():
+        for item in items:
+            result = await func(item)
+            if result is not None:
+                await results.put(result)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            await results.put(done)
+
+    runner = asyncio.ensure_future(run_workers())
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+        await runner
+    finally:
+        # gather() does not cancel the other workers when one call raises
+        pending = [task for task in workers + [runner] if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
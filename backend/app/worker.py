@@ -0,0 +1,298 @@
+"""
+Scan worker: claims queued scans from the job queue and runs the recon
+pipeline, separately from the API process.
+
+    python -m app.worker [--concurrency 2] [--processes 1] [--metrics-port 9100]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+from uuid import uuid4
+
+from .budgets import budget_owner
+from .events import scan_events
+from .jobs import get_job_queue
+from .metrics import ERRORS, SCANS, SCANS_IN_FLIGHT, STAGE_RUNS, STAGE_SECONDS, render, scan_metrics
+from .scan_diff import diff_scans
+from .stages import PUBLISH_INTERVAL, ScanContext, build_recon_pipeline, stages_for
+from .services.visual_recon import VisualReconService
+
+# Seconds a claimed scan stays ours without a heartbeat
+LEASE_SECONDS = 60.0
+# Seconds between queue polls while idle
+POLL_INTERVAL = 2.0
+
+
+async def run_scan(queue, job: dict, worker_id: str, pipeline_factory=build_recon_pipeline):
+    """
+    Run one claimed scan, checkpointing each finished stage. A scan that was
+    started before (by a worker that died) resumes after its last checkpoint.
+    Only the stages needed for the job's scan_types are run.
+    """
+    with scan_metrics() as tally, budget_owner(job["id"]):
+        status = await _run_scan(queue, job, worker_id, pipeline_factory, tally)
+    SCANS.inc(status=status)
+
+
+async def _run_scan(queue, job: dict, worker_id: str, pipeline_factory, tally: Dict[str, float]) -> str:
+    scan_id, domain = job["id"], job["domain"]
+    pipeline = pipeline_factory()
+    selected = stages_for(job.get("scan_types"))
+    if selected:
+        pipeline = pipeline.only(selected)
+    completed = [name for name in job.get("completed_stages") or [] if name in pipeline.stages]
+    print(f"Starting scan for {domain} (ID: {scan_id})")
+    scan_events.publish(scan_id, {"type": "status", "status": "running"})
+
+    ctx = ScanContext(scan_id, domain, port_spec=job.get("port_spec"))
+    if job.get("incremental"):
+        ctx.baseline = await queue.latest(domain, job["timestamp"])
+        if ctx.baseline:
+            print(f"Incremental scan against {ctx.baseline['id']}")
+        else:
+            print("No previous scan of this domain, running a full scan.")
+    if completed:
+        print(f"Resuming scan {scan_id} after stages {completed}")
+        ctx.restore(job, {field for name in completed for field in pipeline.stages[name].outputs})
+
+    last_event: Dict[str, float] = {}
+
+    async def save_items(field: str, items: list):
+        await queue.append(scan_id, field, items)
+        # Listeners get the whole field at most once per interval, not once per item
+        now = time.monotonic()
+        if now - last_event.get(field, 0.0) >= PUBLISH_INTERVAL:
+            last_event[field] = now
+            scan_events.publish(scan_id, {"type": "partial", "fields": {field: ctx.result()[field]}})
+
+    async def on_stage(stage, event):
+        scan_events.publish(scan_id, event)
+        if event["type"] == "stage_skipped":
+            STAGE_RUNS.inc(stage=stage.name, result="skipped")
+        elif event["type"] == "stage_finished" and not event.get("restored"):
+            STAGE_SECONDS.observe(event["seconds"], stage=stage.name)
+            STAGE_RUNS.inc(stage=stage.name, result="ok" if event["ok"] else "failed")
+        if event["type"] == "stage_finished" and event["ok"] and not event.get("restored"):
+            # Show each stage's results as soon as it finishes, and make it durable
+            result = ctx.result()
+            fields = {field: result[field] for field in stage.outputs}
+            if fields:
+                scan_events.publish(scan_id, {"type": "partial", "fields": fields})
+            await queue.checkpoint(scan_id, worker_id, stage.name, fields)
+
+    ctx.on_extend = save_items
+    try:
+        timings = await pipeline.run(ctx, on_event=on_stage, completed=completed)
+        print(f"Stage timings: {timings}")
+        result = ctx.result()
+        if selected:
+            # Leave out the fields of stages these scan_types did not run
+            outputs = {field for stage in pipeline.stages.values() for field in stage.outputs}
+            result = {field: value for field, value in result.items() if field in outputs}
+        extra = {"stage_timings": timings, "metrics": dict(tally)}
+        if ctx.baseline:
+            extra.update(baseline_id=ctx.baseline["id"], diff=diff_scans(ctx.baseline, result))
+        await queue.finish(scan_id, worker_id, "completed", {**result, **extra})
+        scan_events.publish(scan_id, {"type": "partial", "fields": extra})
+        scan_events.publish(scan_id, {"type": "status", "status": "completed"})
+        print(f"Scan {scan_id} completed.")
+        return "completed"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Scan failed: {e}")
+        try:
+            await queue.finish(scan_id, worker_id, "failed", {"metrics": dict(tally)})
+        except Exception as db_error:
+            print(f"Failure update failed: {db_error}")
+            ERRORS.inc(component="queue")
+        scan_events.publish(scan_id, {"type": "status", "status": "failed"})
+        return "failed"
+
+
+class ScanWorker:
+    """
+    Runs up to `concurrency` scans at a time. Each claimed scan's lease is
+    renewed every third of `lease` seconds; if renewal fails because another
+    worker took the scan over, the local run is cancelled.
+    """
+
+    def __init__(self, queue=None, concurrency: int = 2, lease: float = LEASE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, worker_id: Optional[str] = None,
+                 pipeline_factory=build_recon_pipeline):
+        self.queue = queue or get_job_queue()
+        self.pipeline_factory = pipeline_factory
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.active: Dict[str, asyncio.Task] = {}
+        self.stopping = False
+        self._wakeup = asyncio.Event()
+
+    def notify(self):
+        """
+        Check the queue now instead of at the next poll (a scan was just queued).
+        """
+        self._wakeup.set()
+
+    async def run(self):
+        print(f"Worker {self.worker_id} started ({self.concurrency} concurrent scans).")
+        while not self.stopping:
+            while len(self.active) < self.concurrency and not self.stopping:
+                try:
+                    job = await self.queue.claim(self.worker_id, self.lease)
+                except Exception as e:
+                    print(f"Claim failed: {e}")
+                    ERRORS.inc(component="queue")
+                    break
+                if job is None:
+                    break
+                self.active[job["id"]] = asyncio.ensure_future(self._run_job(job))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """
+        Stop claiming, cancel running scans and hand them back to the queue.
+        """
+        self.stopping = True
+        self._wakeup.set()
+        tasks = list(self.active.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_job(self, job: dict):
+        scan_id = job["id"]
+        heartbeat = asyncio.ensure_future(self._heartbeat(scan_id, asyncio.current_task()))
+        SCANS_IN_FLIGHT.inc()
+        try:
+            await run_scan(self.queue, job, self.worker_id, self.pipeline_factory)
+        except asyncio.CancelledError:
+            if self.stopping:
+                try:
+                    await self.queue.release(scan_id, self.worker_id)
+                except Exception as e:
+                    print(f"Release of {scan_id} failed: {e}")
+                    ERRORS.inc(component="queue")
+        finally:
+            SCANS_IN_FLIGHT.dec()
+            heartbeat.cancel()
+            self.active.pop(scan_id, None)
+            self._wakeup.set()
+
+    async def _heartbeat(self, scan_id: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                owned = await self.queue.heartbeat(scan_id, self.worker_id, self.lease)
+            except Exception as e:
+                print(f"Heartbeat for {scan_id} failed: {e}")
+                ERRORS.inc(component="queue")
+                continue
+            if not owned:
+                print(f"Lost lease on scan {scan_id}, stopping it here.")
+                task.cancel()
+                return
+
+
+async def _metrics_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+        body = render().encode()
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+    """
+    Minimal HTTP server answering every request with this process's metrics,
+    for Prometheus to scrape workers that run outside the API process.
+    """
+    return await asyncio.start_server(_metrics_handler, host, port)
+
+
+async def serve(concurrency: int, metrics_port: Optional[int] = None):
+    worker = ScanWorker(concurrency=concurrency)
+    metrics_server = None
+    if metrics_port:
+        metrics_server = await start_metrics_server(metrics_port)
+        print(f"Serving metrics on port {metrics_port}")
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+    await VisualReconService.start_pool()
+    runner = asyncio.ensure_future(worker.run())
+    try:
+        await stop.wait()
+    finally:
+        print(f"Worker {worker.worker_id} shutting down...")
+        await worker.stop()
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        try:
+            await worker.queue.flush()
+        except Exception as e:
+            print(f"Final result flush failed: {e}")
+        await VisualReconService.stop_pool()
+        if metrics_server:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+
+
+def _serve_process(concurrency: int, metrics_port: Optional[int] = None):
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    asyncio.run(serve(concurrency, metrics_port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run recon scan workers.")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("RECON_WORKER_CONCURRENCY", "2")),
+                        help="scans run at once per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--metrics-port", type=int, default=int(os.environ.get("RECON_METRICS_PORT", "0")) or None,
+                        help="serve Prometheus metrics on this port (process i of --processes uses port + i)")
+    args = parser.parse_args()
+    if os.environ.get("RECON_QUEUE") == "memory":
+        parser.error("RECON_QUEUE=memory only works with the API's embedded worker")
+
+    if args.processes == 1:
+        _serve_process(args.concurrency, args.metrics_port)
+        return
+    processes = [
+        multiprocessing.Process(target=_serve_process, args=(args.concurrency, args.metrics_port and args.metrics_port + i))
+        for i in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Children got the same SIGINT and are shutting down on their own
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Peak memory and time of CT log ingestion: the streaming parser against the
+old response.json() approach, on a recorded crt.sh response.
+
+    python -m benchmarks.bench_ct_logs --record volvo.com   # saves benchmarks/fixtures/crtsh_volvo.com.json
+    python -m benchmarks.bench_ct_logs --fixture benchmarks/fixtures/crtsh_volvo.com.json
+    python -m benchmarks.bench_ct_logs --entries 200000     # synthetic response of that size
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from app.services.ct_logs import CHUNK_SIZE, CRTSH_URL, HEADERS, NameSet, iter_json_array
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def record(domain: str) -> str:
+    os.makedirs(FIXTURES, exist_ok=True)
+    path = os.path.join(FIXTURES, f"crtsh_{domain}.json")
+    params = {"q": f"%.{domain}", "output": "json"}
+    with requests.get(CRTSH_URL, params=params, headers=HEADERS, timeout=120, stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+    return path
+
+
+def synthesize(domain: str, entries: int) -> str:
+    """
+    A response shaped like crt.sh's: many certificates repeating a smaller
+    set of names.
+    """
+    rng = random.Random(0)
+    hosts = [f"host{i}.{domain}" for i in range(max(1, entries // 20))]
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        f.write("[")
+        for i in range(entries):
+            names = "\n".join(rng.sample(hosts, min(3, len(hosts))))
+            entry = {
+                "issuer_ca_id": 183267, "issuer_name": "C=US, O=Let's Encrypt, CN=R3",
+                "common_name": names.split("\n")[0], "name_value": names, "id": 9000000000 + i,
+                "entry_timestamp": "2023-05-01T12:00:00.000", "not_before": "2023-05-01T11:00:00",
+                "not_after": "2023-07-30T11:00:00", "serial_number": f"{rng.getrandbits(128):032x}",
+            }
+            f.write(("," if i else "") + json.dumps(entry))
+        f.write("]")
+    return path
+
+
+def read_chunks(path: str):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def legacy(path: str, domain: str) -> int:
+    # What get_subdomains_crtsh used to do: whole body, then response.json()
+    with open(path, "rb") as f:
+        data = json.loads(f.read())
+    names = set()
+    for entry in data:
+        for sub in entry.get("name_value", "").split("\n"):
+            if sub and "*" not in sub:
+                names.add(sub.lower())
+    return len(names)
+
+
+def streaming(path: str, domain: str) -> int:
+    names = NameSet(domain)
+    for entry in iter_json_array(read_chunks(path)):
+        for sub in (entry.get("name_value") or "").split("\n"):
+            names.add(sub)
+    return len(names)
+
+
+def measure(func, path: str, domain: str) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func(path, domain)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"names": count, "seconds": round(elapsed, 3), "peak_mb": round(peak / 2 ** 20, 2)}
+
+
+def run(path: str, domain: str) -> dict:
+    return {
+        "benchmark": "ct_log_ingestion",
+        "fixture": path,
+        "response_mb": round(os.path.getsize(path) / 2 ** 20, 2),
+        "legacy": measure(legacy, path, domain),
+        "streaming": measure(streaming, path, domain),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="recorded crt.sh JSON response")
+    parser.add_argument("--domain", default="example.com", help="domain the fixture was recorded for")
+    parser.add_argument("--record", metavar="DOMAIN", help="download crt.sh's response for DOMAIN into fixtures/")
+    parser.add_argument("--entries", type=int, default=100000, help="size of the synthetic response")
+    args = parser.parse_args()
+
+    if args.record:
+        path = record(args.record)
+        print(f"Recorded {path}")
+        return
+    if args.fixture:
+        print(json.dumps(run(args.fixture, args.domain), indent=2))
+        return
+    path = synthesize(args.domain, args.entries)
+    try:
+        print(json.dumps(run(path, args.domain), indent=2))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
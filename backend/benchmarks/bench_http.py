@@ -0,0 +1,52 @@
+"""
+Requests per second of HttpEngine against a local uvicorn stand-in server.
+
+    python -m benchmarks.bench_http --requests 5000 --concurrency 50 [--pipeline 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.http_engine import HttpEngine
+from benchmarks.fakes import FakeHttpServer
+
+
+async def run(requests: int, concurrency: int, pipeline: int = 1) -> dict:
+    server = FakeHttpServer({"/admin": (200, b"<html>admin</html>")}).start_in_thread()
+    try:
+        urls = (f"{server.url}/w{i}" for i in range(requests))
+        responses = 0
+        start = time.perf_counter()
+        async with HttpEngine(concurrency=concurrency, per_host=concurrency, pipeline=pipeline) as engine:
+            async for _ in engine.fetch_many(urls):
+                responses += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop_thread()
+    return {
+        "benchmark": "http_fuzz",
+        "requests": requests,
+        "responses": responses,
+        "pipeline": pipeline,
+        "connections": len(server.client_ports),
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pipeline", type=int, default=1)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests, args.concurrency, args.pipeline)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Time of the nmap stage from 1 to 1000 hosts: one nmap process per host, one
+after another (what port_scan used to do through python-nmap), against
+NmapDriver's batched runs. Uses benchmarks/fake_nmap.py unless --nmap
+points at a real binary (then scan hosts you are allowed to scan).
+
+    python -m benchmarks.bench_nmap
+    python -m benchmarks.bench_nmap --hosts 1 10 100 1000 --per-host-max 100
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.nmap_driver import CHUNK_SIZE, NmapDriver
+
+FAKE_NMAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_nmap.py")
+PORTS = [21, 22, 80, 443, 3306, 8080]
+
+
+def targets(count: int):
+    first = ipaddress.ip_address("10.20.0.1")
+    return [str(first + i) for i in range(count)]
+
+
+async def measure(command, ips, chunk_size: int, processes=None) -> dict:
+    driver = NmapDriver(command=command, chunk_size=chunk_size, processes=processes)
+    start = time.perf_counter()
+    results = [r async for r in driver.scan(ips, PORTS)]
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "hosts_per_second": round(len(results) / elapsed, 1) if elapsed else None,
+            "processes": driver.runs, "failed": len(driver.failed)}
+
+
+async def main(args) -> list:
+    command = [args.nmap] if args.nmap else [sys.executable, FAKE_NMAP]
+    rows = []
+    for count in args.hosts:
+        ips = targets(count)
+        row = {"hosts": count, "batched": await measure(command, ips, args.chunk_size)}
+        if count <= args.per_host_max:
+            row["per_host"] = await measure(command, ips, 1, processes=1)
+            row["speedup"] = round(row["per_host"]["seconds"] / row["batched"]["seconds"], 1)
+        rows.append(row)
+        print(json.dumps(row), file=sys.stderr)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-host nmap runs against batched NmapDriver runs.")
+    parser.add_argument("--hosts", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--per-host-max", type=int, default=100,
+                        help="skip the per-host runs above this many hosts (they take minutes)")
+    parser.add_argument("--nmap", help="real nmap binary to use instead of the fake one")
+    print(json.dumps(asyncio.run(main(parser.parse_args())), indent=2))
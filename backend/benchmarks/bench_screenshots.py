@@ -0,0 +1,87 @@
+"""
+Screenshots per minute of VisualReconService against a local static site,
+comparing the shared BrowserPool with the old launch-per-call serial loop.
+
+    python -m benchmarks.bench_screenshots --targets 50 --tabs 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from app.services.browser_pool import BrowserPool
+from app.services.visual_recon import VisualReconService
+from benchmarks.fakes import FakeHttpServer
+
+PAGE = b"<html><head><title>stand-in</title></head><body><h1>It works</h1>" + b"<p>lorem ipsum</p>" * 200 + b"</body></html>"
+
+
+async def serial_baseline(targets) -> int:
+    """
+    What take_screenshots did before the pool: a fresh browser per call and
+    one page at a time.
+    """
+    taken = 0
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(viewport={"width": 1280, "height": 720})
+        for target in targets:
+            page = await context.new_page()
+            try:
+                await page.goto(f"http://{target}", timeout=10000, wait_until="domcontentloaded")
+                await page.screenshot(type="jpeg", quality=50)
+                taken += 1
+            except Exception as e:
+                print(f"Failed to screenshot {target}: {e}")
+            finally:
+                await page.close()
+        await browser.close()
+    return taken
+
+
+async def run(targets: int, tabs: int) -> dict:
+    server = FakeHttpServer({}, default=(200, PAGE)).start_in_thread()
+    try:
+        hosts = [f"127.0.0.1:{server.port}/site{i}" for i in range(targets)]
+
+        start = time.perf_counter()
+        serial = await serial_baseline(hosts)
+        serial_elapsed = time.perf_counter() - start
+
+        pool = BrowserPool(tabs=tabs)
+        await pool.start()
+        try:
+            start = time.perf_counter()
+            pooled = len(await VisualReconService.take_screenshots(hosts, pool=pool, limit=targets))
+            pooled_elapsed = time.perf_counter() - start
+        finally:
+            await pool.stop()
+    finally:
+        server.stop_thread()
+    return {
+        "benchmark": "screenshots",
+        "targets": targets,
+        "tabs": tabs,
+        "serial": {"taken": serial, "seconds": round(serial_elapsed, 2),
+                   "per_minute": round(serial / serial_elapsed * 60, 1)},
+        "pooled": {"taken": pooled, "seconds": round(pooled_elapsed, 2),
+                   "per_minute": round(pooled / pooled_elapsed * 60, 1)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", type=int, default=50)
+    parser.add_argument("--tabs", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.targets, args.tabs)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
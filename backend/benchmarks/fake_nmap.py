@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the nmap binary, for benchmarks and tests: takes the arguments
+NmapDriver passes (-p PORTS -oX - HOSTS...) and writes XML in the layout of
+benchmarks/fixtures/nmap_hosts.xml, host by host as it "finishes" them.
+
+Every host is up with the requested ports that are in FAKE_NMAP_OPEN open.
+Timing mimics nmap: FAKE_NMAP_STARTUP seconds before the first host, then
+FAKE_NMAP_HOST_SECONDS per group of FAKE_NMAP_PARALLEL hosts scanned side
+by side. FAKE_NMAP_FAIL=N exits with an error after N hosts.
+
+    python benchmarks/fake_nmap.py -T4 -n -p 22,80 -oX - 10.0.0.1 10.0.0.2
+"""
+import os
+import sys
+import time
+
+STARTUP = float(os.environ.get("FAKE_NMAP_STARTUP", "0.1"))
+HOST_SECONDS = float(os.environ.get("FAKE_NMAP_HOST_SECONDS", "0.05"))
+PARALLEL = int(os.environ.get("FAKE_NMAP_PARALLEL", "64"))
+OPEN = {int(p) for p in os.environ.get("FAKE_NMAP_OPEN", "22,80,443").split(",") if p}
+FAIL = os.environ.get("FAKE_NMAP_FAIL")
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE nmaprun>
+<nmaprun scanner="nmap" args="{args}" start="{start}" version="7.94SVN" xmloutputversion="1.05">
+<scaninfo type="connect" protocol="tcp" numservices="{count}" services="{ports}"/>
+<verbose level="0"/>
+<debugging level="0"/>
+"""
+HOST = """<hosthint><status state="up" reason="unknown-response" reason_ttl="0"/>
+<address addr="{ip}" addrtype="{family}"/>
+<hostnames>
+</hostnames>
+</hosthint>
+<host starttime="{start}" endtime="{end}"><status state="up" reason="syn-ack" reason_ttl="0"/>
+<address addr="{ip}" addrtype="{family}"/>
+<hostnames>
+</hostnames>
+<ports><extraports state="closed" count="{closed}">
+</extraports>
+{ports}</ports>
+</host>
+"""
+PORT = '<port protocol="tcp" portid="{port}"><state state="open" reason="syn-ack" reason_ttl="0"/></port>\n'
+FOOTER = """<runstats><finished time="{end}" elapsed="{elapsed:.2f}" exit="success"/><hosts up="{up}" down="0" total="{up}"/>
+</runstats>
+</nmaprun>
+"""
+
+
+def parse_ports(spec: str):
+    ports = set()
+    for part in spec.split(","):
+        low, _, high = part.partition("-")
+        ports.update(range(int(low), int(high or low) + 1))
+    return sorted(ports)
+
+
+def main(argv):
+    ports, hosts, family = [], [], "ipv4"
+    args = iter(argv)
+    for arg in args:
+        if arg == "-p":
+            ports = parse_ports(next(args))
+        elif arg == "-oX":
+            next(args)
+        elif arg == "-6":
+            family = "ipv6"
+        elif not arg.startswith("-"):
+            hosts.append(arg)
+    if not hosts:
+        print("WARNING: No targets were specified, so 0 hosts scanned.", file=sys.stderr)
+        return 0
+
+    started = time.time()
+    out = sys.stdout
+    out.write(HEADER.format(args=" ".join(["nmap", *argv]), start=int(started), count=len(ports),
+                            ports=",".join(map(str, ports))))
+    out.flush()
+    time.sleep(STARTUP)
+    open_ports = [p for p in ports if p in OPEN]
+    done = 0
+    for i in range(0, len(hosts), PARALLEL):
+        time.sleep(HOST_SECONDS)
+        for ip in hosts[i:i + PARALLEL]:
+            if FAIL is not None and done >= int(FAIL):
+                out.flush()
+                print("nmap: fake failure", file=sys.stderr)
+                return 1
+            out.write(HOST.format(ip=ip, family=family, start=int(started), end=int(time.time()),
+                                  closed=len(ports) - len(open_ports),
+                                  ports="".join(PORT.format(port=p) for p in open_ports)))
+            done += 1
+        out.flush()
+    out.write(FOOTER.format(end=int(time.time()), elapsed=time.time() - started, up=len(hosts)))
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
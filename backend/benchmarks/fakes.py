@@ -0,0 +1,338 @@
+"""
+Local stand-ins for the external systems the recon services talk to, so
+services can be tested and benchmarked without touching the network.
+"""
+import asyncio
+import json
+import socket
+import struct
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import uvicorn
+
+from app.services.blob_store import blob_id
+
+
+def _is_ipv4(value: str) -> bool:
+    try:
+        socket.inet_aton(value)
+        return value.count(".") == 3
+    except OSError:
+        return False
+
+
+def _encode_name(name: str) -> bytes:
+    return b"".join(bytes([len(l)]) + l.encode() for l in name.rstrip(".").split(".")) + b"\x00"
+
+
+class StubDnsServer:
+    """
+    Minimal authoritative UDP DNS server. `records` maps names to IPv4
+    addresses, or to another hostname which is then served as a CNAME chain.
+    A key like "*.example.com" acts as a wildcard for every name below it that
+    has no more specific record. Unknown names get NXDOMAIN.
+    Responses are hand-encoded so the stub is never the bottleneck.
+    """
+
+    def __init__(self, records: Optional[Dict[str, str]] = None, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.records = {k.lower().rstrip("."): v for k, v in (records or {}).items()}
+        self.latency = latency
+        self.host = host
+        self.port = None
+        self.queries = 0
+        self.transport = None
+        self._thread = None
+        self._loop = None
+
+    def lookup(self, name: str) -> Optional[str]:
+        name = name.lower().rstrip(".")
+        if name in self.records:
+            return self.records[name]
+        labels = name.split(".")
+        for i in range(1, len(labels)):
+            wildcard = "*." + ".".join(labels[i:])
+            if wildcard in self.records:
+                return self.records[wildcard]
+        return None
+
+    def answer(self, data: bytes) -> Optional[bytes]:
+        if len(data) < 12:
+            return None
+        qid = data[:2]
+        pos = 12
+        labels = []
+        while pos < len(data) and data[pos] != 0:
+            length = data[pos]
+            labels.append(data[pos + 1:pos + 1 + length].decode("ascii", "replace"))
+            pos += length + 1
+        question_end = pos + 5
+        question = data[12:question_end]
+        qtype = struct.unpack("!H", data[pos + 1:pos + 3])[0]
+        value = self.lookup(".".join(labels))
+        if value is None:
+            # QR, RD, RA, NXDOMAIN
+            return qid + struct.pack("!HHHHH", 0x8183, 1, 0, 0, 0) + question
+        if qtype != 1:
+            return qid + struct.pack("!HHHHH", 0x8180, 1, 0, 0, 0) + question
+
+        answers = []
+        owner = struct.pack("!H", 0xC00C)
+        for _ in range(8):
+            if value is None or _is_ipv4(value):
+                break
+            target = _encode_name(value)
+            answers.append(owner + struct.pack("!HHIH", 5, 1, 60, len(target)) + target)
+            owner = target
+            value = self.lookup(value)
+        if value is not None and _is_ipv4(value):
+            answers.append(owner + struct.pack("!HHIH", 1, 1, 60, 4) + socket.inet_aton(value))
+        return qid + struct.pack("!HHHHH", 0x8180, 1, len(answers), 0, 0) + question + b"".join(answers)
+
+    async def start(self):
+        server = self
+
+        class Protocol(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                server.transport = transport
+
+            def datagram_received(self, data, addr):
+                server.queries += 1
+                response = server.answer(data)
+                if response is None:
+                    return
+                if server.latency:
+                    asyncio.get_running_loop().call_later(server.latency, server.transport.sendto, response, addr)
+                else:
+                    server.transport.sendto(response, addr)
+
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(Protocol, local_addr=(self.host, 0))
+        self.port = self.transport.get_extra_info("sockname")[1]
+        return self
+
+    def stop(self):
+        if self.transport:
+            self.transport.close()
+
+    def start_in_thread(self):
+        """
+        Serve from a dedicated thread/event loop, so benchmarks measure the
+        client rather than a server sharing its loop.
+        """
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self.stop)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+
+
+class FakeHttpServer:
+    """
+    Tiny ASGI site served by uvicorn from a background thread. `routes` maps
+    paths to (status, body[, headers]); everything else gets `default`, so a
+    200 default turns it into a catch-all (soft-404) host. Paths listed in
+    `slow` sleep that many seconds before answering. Distinct client ports
+    are recorded, which shows whether connections are being reused.
+    `port` 0 picks a free port.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Tuple]] = None, default: Tuple = (404, b"Not Found"),
+                 slow: Optional[Dict[str, float]] = None, host: str = "127.0.0.1", port: int = 0):
+        self.routes = routes or {}
+        self.default = default
+        self.slow = slow or {}
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.client_ports = set()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.requests += 1
+        if scope.get("client"):
+            self.client_ports.add(scope["client"][1])
+        path = scope["path"]
+        if path in self.slow:
+            await asyncio.sleep(self.slow[path])
+        route = self.routes.get(path, self.default)
+        status, body = route[0], route[1]
+        if callable(body):
+            body = body(path)
+        headers = [(b"content-type", b"text/html"), (b"content-length", str(len(body)).encode())]
+        for name, value in (route[2] if len(route) > 2 else {}).items():
+            headers.append((name.lower().encode(), value.encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def start_in_thread(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # Accepted sockets inherit this; without it Nagle + delayed ACK add
+        # ~40ms to every response uvicorn writes in two parts
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.bind((self.host, self.port or 0))
+        self.port = sock.getsockname()[1]
+        config = uvicorn.Config(self.app, interface="asgi3", log_level="error", access_log=False, lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, kwargs={"sockets": [sock]}, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop_thread(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+
+class FakeCTLogServer(FakeHttpServer):
+    """
+    crt.sh and Cert Spotter stand-in serving `names` for any domain: crt.sh
+    JSON at "/" and Cert Spotter issuances at "/v1/issuances", paged by
+    `after` like the real API. Point the services at it with
+    RECON_CRTSH_URL / RECON_CERTSPOTTER_URL.
+    """
+
+    def __init__(self, names, per_certificate: int = 5, page_size: int = 100, host: str = "127.0.0.1"):
+        super().__init__(host=host)
+        names = list(names)
+        self.certificates = [names[i:i + per_certificate] for i in range(0, len(names), per_certificate)]
+        self.page_size = page_size
+
+    @property
+    def crtsh_url(self) -> str:
+        return self.url + "/"
+
+    @property
+    def certspotter_url(self) -> str:
+        return self.url + "/v1/issuances"
+
+    def crtsh_body(self) -> bytes:
+        return json.dumps([
+            {"id": i, "common_name": group[0], "name_value": "\n".join(group)}
+            for i, group in enumerate(self.certificates)
+        ]).encode()
+
+    def certspotter_body(self, query: bytes) -> bytes:
+        after = parse_qs(query.decode()).get("after")
+        start = int(after[0]) + 1 if after else 0
+        page = range(start, min(start + self.page_size, len(self.certificates)))
+        return json.dumps([{"id": str(i), "dns_names": self.certificates[i]} for i in page]).encode()
+
+    async def app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.requests += 1
+        if scope["path"] == "/v1/issuances":
+            body = self.certspotter_body(scope.get("query_string", b""))
+        else:
+            body = self.crtsh_body()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class ListenerFarm:
+    """
+    `count` TCP listeners on one address, for port scan benchmarks. Each
+    accepted connection gets `banner` (if any) and is closed.
+    """
+
+    def __init__(self, count: int, banner: bytes = b"", host: str = "127.0.0.1"):
+        self.count = count
+        self.banner = banner
+        self.host = host
+        self.ports = []
+        self.connections = 0
+        self._servers = []
+        self._thread = None
+        self._loop = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            if self.banner:
+                writer.write(self.banner)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        for _ in range(self.count):
+            server = await asyncio.start_server(self._handle, self.host, 0)
+            self._servers.append(server)
+            self.ports.append(server.sockets[0].getsockname()[1])
+        self.ports.sort()
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.close()
+
+    def start_in_thread(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop_thread(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self.stop)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+
+
+class MemoryBlobStore:
+    """
+    Blob store kept in a dict (same interface as FileBlobStore), so
+    screenshot benchmarks measure capturing rather than disk writes.
+    """
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+
+    async def put(self, data: bytes) -> str:
+        bid = blob_id(data)
+        self.blobs[bid] = data
+        return bid
+
+    async def size(self, bid: str) -> Optional[int]:
+        data = self.blobs.get(bid)
+        return len(data) if data is not None else None
+
+    async def open(self, bid: str):
+        yield self.blobs[bid]
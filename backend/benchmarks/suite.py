@@ -0,0 +1,377 @@
+"""
+Every recon service, and a whole scan, against local stand-ins (stub DNS,
+fake crt.sh / Cert Spotter, a fake nmap, a TCP listener farm, HTTP servers with
+catch-all and slow endpoints, the in-memory scan queue). Results go to one
+JSON report; with --baseline, benchmarks that got slower are listed and the
+exit code is 1.
+
+    python -m benchmarks.suite [--quick] [--only ports fuzzing] [--output report.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import CACHE_CONFIG, get_cache
+from app.jobs import MemoryJobQueue
+from app.metrics import scan_metrics
+from app.services import blob_store, wordlists
+from app.services.banner import HTTP_PORTS
+from app.services.browser_pool import BrowserPool
+from app.services.dns_resolver import AsyncResolver
+from app.services.fuzzing import FuzzingService
+from app.services.nmap_driver import CHUNK_SIZE
+from app.services.osint import OsintService
+from app.services.port_scan import PortScanService
+from app.services.subdomain import SubdomainService
+from app.services.visual_recon import VisualReconService
+from app.worker import run_scan
+from benchmarks.bench_nmap import FAKE_NMAP, measure, targets
+from benchmarks.fakes import FakeCTLogServer, FakeHttpServer, ListenerFarm, MemoryBlobStore, StubDnsServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DOMAIN = "bench.test"
+# A benchmark this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 0.25
+
+SIZES = {
+    "full": {"words": 20000, "ct_names": 50000, "ports": 5000, "listeners": 50, "paths": 2000,
+             "pages": 500, "screenshots": 40, "scan_hosts": 50, "nmap_hosts": 1000},
+    "quick": {"words": 2000, "ct_names": 2000, "ports": 500, "listeners": 10, "paths": 200,
+              "pages": 50, "screenshots": 5, "scan_hosts": 10, "nmap_hosts": 100},
+}
+
+WORDPRESS_PAGE = (
+    b'<html><head><meta name="generator" content="WordPress 6.2.1" />'
+    b'<script src="/wp-includes/js/jquery/jquery.min.js?ver=3.6.4"></script></head>'
+    b"<body>" + b"<p>lorem ipsum dolor sit amet</p>" * 300 + b"</body></html>"
+)
+
+
+def _wordlist(words) -> str:
+    f = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+    with f:
+        f.write("\n".join(words))
+    return f.name
+
+
+def _free_port(candidates) -> int:
+    """
+    First port in `candidates` nothing listens on, or 0 (any port).
+    """
+    for port in candidates:
+        with socket.socket() as sock:
+            try:
+                sock.bind(("127.0.0.1", port))
+                return port
+            except OSError:
+                continue
+    return 0
+
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 1) if seconds else 0.0
+
+
+async def bench_subdomains(size: dict) -> dict:
+    """
+    DNS brute force through SubdomainService: 5% of the words exist and a
+    wildcard zone (*.dev) answers for a tenth of them, which must be dropped.
+    """
+    words = size["words"]
+    records = {f"w{i}.{DOMAIN}": "10.0.0.1" for i in range(0, words, 20)}
+    records[f"*.dev.{DOMAIN}"] = "10.0.0.99"
+    prefixes = [f"w{i}" for i in range(words)] + [f"w{i}.dev" for i in range(words // 10)]
+    path = _wordlist(prefixes)
+    server = StubDnsServer(records).start_in_thread()
+    try:
+        resolver = AsyncResolver(nameservers=[server.host], port=server.port, timeout=2)
+        start = time.perf_counter()
+        async with resolver:
+            found = await SubdomainService.get_subdomains_bruteforce(DOMAIN, path, resolver=resolver)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop_thread()
+        os.unlink(path)
+    return {"names": len(prefixes), "found": len(found), "expected": len(records) - 1,
+            "queries": server.queries, "seconds": round(elapsed, 3), "qps": _rate(server.queries, elapsed)}
+
+
+async def bench_ct_logs(size: dict) -> dict:
+    """
+    Both CT sources (crt.sh in one response, Cert Spotter paged) from the
+    fake CT server, through the shared cache like a scan.
+    """
+    names = [f"h{i}.{DOMAIN}" for i in range(size["ct_names"])]
+    server = FakeCTLogServer(names).start_in_thread()
+    os.environ["RECON_CRTSH_URL"], os.environ["RECON_CERTSPOTTER_URL"] = server.crtsh_url, server.certspotter_url
+    try:
+        start = time.perf_counter()
+        found = await SubdomainService.lookup_ct_logs(DOMAIN)
+        elapsed = time.perf_counter() - start
+    finally:
+        del os.environ["RECON_CRTSH_URL"], os.environ["RECON_CERTSPOTTER_URL"]
+        server.stop_thread()
+    return {"names": len(names), "found": len(found), "requests": server.requests,
+            "seconds": round(elapsed, 3), "names_per_second": _rate(len(found), elapsed)}
+
+
+async def bench_ports(size: dict) -> dict:
+    """
+    PortScanService over a listener farm hidden among closed ports.
+    """
+    farm = ListenerFarm(size["listeners"]).start_in_thread()
+    try:
+        low = 40000
+        ports = sorted(set(farm.ports) | set(range(low, low + size["ports"])))
+        start = time.perf_counter()
+        results = [r async for r in PortScanService.scan_common_ports(["127.0.0.1"], ports)]
+        elapsed = time.perf_counter() - start
+    finally:
+        farm.stop_thread()
+    found = {p for r in results for p in r.ports}
+    return {"probes": len(ports), "open": len(found), "listeners_found": len(found & set(farm.ports)),
+            "listeners": len(farm.ports), "seconds": round(elapsed, 3), "probes_per_second": _rate(len(ports), elapsed)}
+
+
+async def bench_nmap(size: dict) -> dict:
+    """
+    NmapDriver's batched runs over many hosts, with benchmarks/fake_nmap.py
+    standing in for nmap.
+    """
+    result = await measure([sys.executable, FAKE_NMAP], targets(size["nmap_hosts"]), CHUNK_SIZE)
+    return {"hosts": size["nmap_hosts"], **result}
+
+
+async def bench_fuzzing(size: dict) -> dict:
+    """
+    FuzzingService on two hosts at once: a normal one with a few real and
+    slow paths, and a catch-all host answering 200 everywhere (soft 404s).
+    """
+    paths = size["paths"]
+    words = [f"p{i}" for i in range(paths)]
+    real = {f"/p{i}": (200, b"<html>real page</html>") for i in range(0, paths, 50)}
+    slow = {f"/p{i}": 0.2 for i in range(1, paths, 200)}
+    normal = FakeHttpServer(real, slow=slow).start_in_thread()
+    catch_all = FakeHttpServer(default=(200, b"<html>Welcome to our site</html>")).start_in_thread()
+    path = _wordlist(words)
+    try:
+        start = time.perf_counter()
+        hits = [hit async for hit in FuzzingService.fuzz_hosts([normal.url, catch_all.url], path,
+                                                              extensions=FuzzingService.DEFAULT_EXTENSIONS)]
+        elapsed = time.perf_counter() - start
+    finally:
+        normal.stop_thread()
+        catch_all.stop_thread()
+        os.unlink(path)
+    requests = normal.requests + catch_all.requests
+    return {"words": paths, "requests": requests, "hits": len(hits), "expected_hits": len(real),
+            "seconds": round(elapsed, 3), "rps": _rate(requests, elapsed)}
+
+
+async def bench_osint(size: dict) -> dict:
+    """
+    OsintService fingerprinting many sites (one server, distinct paths).
+    """
+    server = FakeHttpServer(default=(200, WORDPRESS_PAGE, {"Server": "Apache/2.4.49 (Debian)"})).start_in_thread()
+    hosts = [f"{server.host}:{server.port}/site{i}" for i in range(size["pages"])]
+    try:
+        start = time.perf_counter()
+        detections = await OsintService.detect_hosts(hosts)
+        stack = OsintService.merge(detections)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop_thread()
+    return {"hosts": len(hosts), "fingerprinted": len(detections), "technologies": len(stack),
+            "seconds": round(elapsed, 3), "hosts_per_second": _rate(len(detections), elapsed)}
+
+
+async def bench_screenshots(size: dict) -> dict:
+    """
+    VisualReconService landing page fingerprints and screenshots on a shared
+    browser pool, stored in memory.
+    """
+    server = FakeHttpServer(default=(200, WORDPRESS_PAGE)).start_in_thread()
+    hosts = [f"{server.host}:{server.port}/site{i}" for i in range(size["screenshots"])]
+    pool = BrowserPool(tabs=8)
+    try:
+        try:
+            await pool.start()
+        except Exception as e:
+            return {"skipped": f"no browser: {e}".splitlines()[0]}
+        start = time.perf_counter()
+        fingerprints = await VisualReconService.fingerprint_hosts(hosts)
+        shots = await VisualReconService.take_screenshots(hosts, pool=pool, limit=len(hosts), store=MemoryBlobStore())
+        elapsed = time.perf_counter() - start
+    finally:
+        await pool.stop()
+        server.stop_thread()
+    return {"targets": len(hosts), "fingerprinted": len(fingerprints), "taken": len(shots),
+            "seconds": round(elapsed, 2), "per_minute": _rate(len(shots) * 60, elapsed)}
+
+
+async def bench_scan(size: dict) -> dict:
+    """
+    A complete scan (run_scan, every stage) of "localhost" through the
+    in-memory queue. DNS, CT logs, the scanned ports and the website are all
+    local stand-ins; the default wordlists are used.
+    """
+    names = [f"h{i}.localhost" for i in range(size["scan_hosts"])]
+    # Each subdomain on its own loopback address, so the port scan spans hosts
+    records = {"localhost": "127.0.0.1", **{name: f"127.0.0.{i + 2}" for i, name in enumerate(names)}}
+    dns = StubDnsServer(records).start_in_thread()
+    ct = FakeCTLogServer(names).start_in_thread()
+    farm = ListenerFarm(3, banner=b"SSH-2.0-OpenSSH_8.9p1 Ubuntu-3\r\n").start_in_thread()
+    # Only well-known HTTP ports are fuzzed, so serve the site on one of those
+    web_port = _free_port(sorted(p for p in HTTP_PORTS if p > 1024))
+    routes = {f"/{w}": (200, b"<html>found</html>") for w in ("admin", "backup", "login")}
+    routes["/"] = (200, WORDPRESS_PAGE, {"Server": "Apache/2.4.49 (Debian)"})
+    web = FakeHttpServer(routes, port=web_port).start_in_thread()
+
+    blob_dir = tempfile.TemporaryDirectory()
+    wordlist_dir = tempfile.TemporaryDirectory()
+    env = {
+        "RECON_NAMESERVERS": dns.host, "RECON_DNS_PORT": str(dns.port),
+        "RECON_CRTSH_URL": ct.crtsh_url, "RECON_CERTSPOTTER_URL": ct.certspotter_url,
+        "RECON_BLOB_DIR": blob_dir.name, "RECON_WORDLIST_DIR": wordlist_dir.name,
+    }
+    saved_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    # The process-wide stores read their directories when first created
+    saved_stores = blob_store._store, wordlists._store
+    blob_store._store = wordlists._store = None
+    queue = MemoryJobQueue()
+    port_spec = ",".join(map(str, sorted({web.port, *farm.ports, 22, 443})))
+    try:
+        await queue.enqueue({"id": "bench", "domain": "localhost", "timestamp": datetime.now(), "port_spec": port_spec})
+        job = await queue.claim("bench", lease=3600)
+        start = time.perf_counter()
+        await run_scan(queue, job, "bench")
+        elapsed = time.perf_counter() - start
+        doc = await queue.get("bench")
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        blob_store._store, wordlists._store = saved_stores
+        for server in (web, farm, ct, dns):
+            server.stop_thread()
+        blob_dir.cleanup()
+        wordlist_dir.cleanup()
+    return {
+        "status": doc["status"],
+        "subdomains": (doc.get("subdomains") or {}).get("count", 0),
+        "hosts": len(doc.get("hosts") or {}),
+        "open_ports": sum(len(p["ports"]) for p in doc.get("ports") or []),
+        "directories": len(doc.get("directories") or []),
+        "vulnerabilities": len(doc.get("vulnerabilities") or []),
+        "screenshots": len(doc.get("screenshots") or {}),
+        "seconds": round(elapsed, 3),
+        "stage_timings": doc.get("stage_timings"),
+        "scan_metrics": doc.get("metrics"),
+    }
+
+
+BENCHMARKS = {
+    "subdomains": bench_subdomains,
+    "ct_logs": bench_ct_logs,
+    "ports": bench_ports,
+    "nmap": bench_nmap,
+    "fuzzing": bench_fuzzing,
+    "osint": bench_osint,
+    "screenshots": bench_screenshots,
+    "scan": bench_scan,
+}
+
+
+async def run(names, size: dict) -> list:
+    results = []
+    for name in names:
+        # Every benchmark starts cold
+        for cache in CACHE_CONFIG:
+            get_cache(cache).clear()
+        print(f"Running {name}...", file=sys.stderr)
+        with scan_metrics() as counters:
+            result = await BENCHMARKS[name](size)
+        results.append({"benchmark": name, **result, "counters": dict(sorted(counters.items()))})
+    return results
+
+
+def compare(results: list, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """
+    Benchmarks that took more than `threshold` longer than in `baseline`.
+    """
+    previous = {r["benchmark"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        old = previous.get(result["benchmark"])
+        if not old or "seconds" not in old or "seconds" not in result:
+            continue
+        if result["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append({"benchmark": result["benchmark"], "seconds": result["seconds"],
+                                "baseline_seconds": old["seconds"],
+                                "change": round(result["seconds"] / old["seconds"] - 1, 3) if old["seconds"] else None})
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the recon services against local stand-ins.")
+    parser.add_argument("--quick", action="store_true", help="small workloads, for a fast check")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    size_name = "quick" if args.quick else "full"
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": size_name,
+        "results": asyncio.run(run(args.only, SIZES[size_name])),
+    }
+    code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("size") != size_name:
+            print(f"Baseline is a {baseline.get('size')} run, not comparing.", file=sys.stderr)
+        else:
+            report["baseline_commit"] = baseline.get("commit")
+            report["regressions"] = compare(report["results"], baseline, args.threshold)
+            for r in report["regressions"]:
+                print(f"REGRESSION {r['benchmark']}: {r['baseline_seconds']}s -> {r['seconds']}s", file=sys.stderr)
+            code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import pytest
+
+from app.services import wordlists
+
+
+@pytest.fixture(autouse=True)
+def wordlist_dir(tmp_path, monkeypatch):
+    """
+    Compile wordlists and record hits under the test's tmp_path, not in
+    backend/data/wordlists.
+    """
+    monkeypatch.setenv("RECON_WORDLIST_DIR", str(tmp_path / "wordlists"))
+    monkeypatch.setattr(wordlists, "_store", None)
+    return tmp_path / "wordlists"
@@ -0,0 +1,80 @@
+import asyncio
+import shutil
+import ssl
+import subprocess
+
+import pytest
+
+from app.schemas import PortResult
+from app.services.banner import BannerService, match_banner
+
+
+async def serve(handler, ssl_ctx=None):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0, ssl=ssl_ctx)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_signature_table():
+    assert match_banner("SSH-2.0-OpenSSH_8.9p1 Ubuntu-3") == ("ssh", "OpenSSH", "8.9p1")
+    assert match_banner("220 (vsFTPd 3.0.3)") == ("ftp", "vsftpd", "3.0.3")
+    assert match_banner("HTTP/1.1 200 OK\r\nServer: nginx/1.18.0\r\n") == ("http", "nginx", "1.18.0")
+    assert match_banner("+PONG") == ("redis", "Redis", None)
+    assert match_banner("garbage") is None
+
+
+def test_greeting_and_http_probes():
+    async def ssh(reader, writer):
+        writer.write(b"SSH-2.0-OpenSSH_9.6\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def http(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nServer: Apache/2.4.49\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        ssh_server, ssh_port = await serve(ssh)
+        http_server, http_port = await serve(http)
+        result = PortResult(ip="127.0.0.1", ports=[ssh_port, http_port])
+        await BannerService.grab_banners([result], budget=10)
+        ssh_server.close()
+        http_server.close()
+        return result, ssh_port, http_port
+
+    result, ssh_port, http_port = asyncio.run(run())
+    assert result.services[str(ssh_port)].product == "OpenSSH"
+    assert result.services[str(ssh_port)].version == "9.6"
+    assert result.services[str(http_port)].product == "Apache httpd"
+    assert result.services[str(http_port)].version == "2.4.49"
+    assert result.banners[str(ssh_port)].startswith("SSH-2.0")
+
+
+@pytest.mark.skipif(not shutil.which("openssl"), reason="openssl CLI needed to mint a test certificate")
+def test_tls_certificate_names(tmp_path):
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-keyout", str(key), "-out", str(cert), "-subj", "/CN=recon.test",
+        "-addext", "subjectAltName=DNS:recon.test,DNS:www.recon.test",
+    ], check=True, capture_output=True)
+    server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    server_ctx.load_cert_chain(str(cert), str(key))
+
+    async def https(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nServer: nginx\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server, port = await serve(https, server_ctx)
+        grabbed = await BannerService.grab("127.0.0.1", port, "recon.test", tls=True)
+        server.close()
+        return grabbed
+
+    banner, info = asyncio.run(run())
+    assert info.tls_cn == "recon.test"
+    assert info.tls_san == ["recon.test", "www.recon.test"]
+    assert info.service == "https"
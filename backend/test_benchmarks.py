@@ -0,0 +1,25 @@
+import asyncio
+
+from benchmarks.suite import SIZES, compare, run
+
+
+def test_quick_suite_against_local_stand_ins():
+    results = {r["benchmark"]: r for r in asyncio.run(run(["subdomains", "ct_logs", "ports", "scan"], SIZES["quick"]))}
+
+    assert results["subdomains"]["found"] == results["subdomains"]["expected"]
+    assert results["ct_logs"]["found"] == results["ct_logs"]["names"]
+    assert results["ct_logs"]["counters"] == {"ct_queries.certspotter.ok": 1, "ct_queries.crtsh.ok": 1}
+    assert results["ports"]["listeners_found"] == results["ports"]["listeners"]
+    scan = results["scan"]
+    assert scan["status"] == "completed"
+    assert scan["hosts"] == SIZES["quick"]["scan_hosts"] + 1
+    assert scan["vulnerabilities"] > 0  # OpenSSH 8.9p1 banner and Apache 2.4.49
+    assert set(scan["stage_timings"]) >= {"subdomains", "resolve", "ports", "fuzzing"}
+    assert scan["scan_metrics"]["dns_queries"] > 0
+
+
+def test_slower_benchmarks_are_regressions():
+    baseline = {"results": [{"benchmark": "ports", "seconds": 1.0}, {"benchmark": "osint", "seconds": 1.0}]}
+    results = [{"benchmark": "ports", "seconds": 1.2}, {"benchmark": "osint", "seconds": 1.5},
+               {"benchmark": "scan", "seconds": 9.0}, {"benchmark": "screenshots", "skipped": "no browser"}]
+    assert [r["benchmark"] for r in compare(results, baseline, threshold=0.25)] == ["osint"]
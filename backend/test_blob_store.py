@@ -0,0 +1,58 @@
+import asyncio
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.services import blob_store
+from app.services.blob_store import FileBlobStore, make_thumbnail
+
+
+def _jpeg(color, size=(1280, 720)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def test_identical_images_are_stored_once(tmp_path):
+    store = FileBlobStore(str(tmp_path))
+    parked = _jpeg("white")
+
+    async def run():
+        first = await store.put(parked)
+        second = await store.put(parked)
+        other = await store.put(_jpeg("black"))
+        body = b"".join([chunk async for chunk in store.open(first)])
+        return first, second, other, body
+
+    first, second, other, body = asyncio.run(run())
+    assert first == second != other
+    assert body == parked
+    assert len(list(tmp_path.rglob("*"))) == 4  # two shard dirs, two blobs
+
+
+def test_thumbnail_is_small():
+    full = _jpeg("red")
+    thumb = make_thumbnail(full)
+    assert Image.open(io.BytesIO(thumb)).size == (320, 180)
+    assert len(thumb) < len(full)
+
+
+def test_blob_endpoint_streams_with_cache_headers(tmp_path, monkeypatch):
+    from app.main import app
+    store = FileBlobStore(str(tmp_path))
+    monkeypatch.setattr(blob_store, "_store", store)
+    image = _jpeg("blue")
+    bid = asyncio.run(store.put(image))
+
+    client = TestClient(app)
+    response = client.get(f"/api/blobs/{bid}")
+    assert response.status_code == 200
+    assert response.content == image
+    assert response.headers["content-type"] == "image/jpeg"
+    assert "immutable" in response.headers["cache-control"]
+
+    cached = client.get(f"/api/blobs/{bid}", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert client.get("/api/blobs/" + "0" * 64).status_code == 404
+    assert client.get("/api/blobs/../etc").status_code == 404
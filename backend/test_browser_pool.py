@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.services.browser_pool import BrowserPool
+from app.services.visual_recon import VisualReconService
+from benchmarks.fakes import FakeHttpServer
+
+
+async def _started_pool(tabs):
+    pool = BrowserPool(tabs=tabs, timeout_ms=5000)
+    try:
+        await pool.start()
+    except Exception as e:
+        pytest.skip(f"Chromium not available: {e}")
+    return pool
+
+
+def test_pool_captures_in_parallel_and_survives_crash():
+    server = FakeHttpServer({}, default=(200, b"<html><body>hello</body></html>")).start_in_thread()
+
+    async def run():
+        pool = await _started_pool(tabs=4)
+        try:
+            hosts = [f"127.0.0.1:{server.port}/p{i}" for i in range(8)]
+            shots = await VisualReconService.take_screenshots(hosts, pool=pool)
+            assert set(shots) == set(hosts)
+            assert all(s.startswith("data:image/jpeg;base64,") for s in shots.values())
+
+            # Kill the browser out from under the workers
+            await pool.browser.close()
+            await asyncio.sleep(0.5)
+            image = await pool.capture(f"http://127.0.0.1:{server.port}/after-crash")
+            assert image[:2] == b"\xff\xd8"
+            assert pool.relaunches == 1
+        finally:
+            await pool.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.stop_thread()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from app.cache import TTLCache
+from app.services.dns_resolver import AsyncResolver
+from benchmarks.fakes import StubDnsServer
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("t", ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache("t", maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_lookups_share_one_load():
+    cache = TTLCache("t")
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["www.example.test"]
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("example.test", loader) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == ["www.example.test"] for r in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 4
+
+
+def test_failed_load_is_not_cached():
+    cache = TTLCache("t")
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return 42
+
+    async def run():
+        results = await asyncio.gather(cache.get_or_load("k", failing), cache.get_or_load("k", failing),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await cache.get_or_load("k", ok)
+
+    assert asyncio.run(run()) == 42
+
+
+def test_nxdomain_is_negatively_cached():
+    async def run():
+        server = await StubDnsServer({"www.example.test": "10.0.0.1"}).start()
+        try:
+            cache = TTLCache("dns", negative_ttl=60)
+            async with AsyncResolver(nameservers=[server.host], port=server.port, timeout=0.5, cache=cache) as resolver:
+                for _ in range(3):
+                    assert await resolver.resolve("nope.example.test") is None
+                    assert (await resolver.resolve("www.example.test")).addresses == ["10.0.0.1"]
+                return resolver.queries_sent, cache.stats()
+        finally:
+            server.stop()
+
+    sent, stats = asyncio.run(run())
+    assert sent == 2
+    assert stats["negative_hits"] == 2 and stats["hits"] == 2
+
+
+def test_timeouts_are_not_cached():
+    async def run():
+        cache = TTLCache("dns")
+        # Nothing listens on 127.0.0.2, so every attempt times out
+        async with AsyncResolver(nameservers=["127.0.0.2"], port=53535, timeout=0.05, retries=0,
+                                 cache=cache) as resolver:
+            assert await resolver.resolve("www.example.test") is None
+            assert await resolver.resolve("www.example.test") is None
+            return resolver.queries_sent
+
+    assert asyncio.run(run()) == 2
@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.budgets import FairSemaphore, budget_owner
+from app.campaigns import normalize_domain, parse_domains
+from app.jobs import MemoryJobQueue
+from app.scheduler import Stage, StageScheduler
+from app.stages import build_recon_pipeline, stages_for
+from app.worker import run_scan
+
+
+def test_domain_lists_are_normalized():
+    assert normalize_domain("https://WWW.Example.com:8443/login") == "www.example.com"
+    assert normalize_domain("*.example.org.") == "example.org"
+    assert normalize_domain("bücher.de") == "xn--bcher-kva.de"
+    assert normalize_domain("localhost") == ""
+    domains, invalid = parse_domains(["example.com, api.example.com", "# scope", "example.com  not_a_domain!", ""])
+    assert domains == ["example.com", "api.example.com"]
+    assert invalid == ["not_a_domain!"]
+
+
+def test_scan_types_select_stages_and_their_dependencies():
+    pipeline = build_recon_pipeline()
+    assert set(pipeline.only(stages_for(["subdomains"])).stages) == {"subdomains", "resolve"}
+    assert set(pipeline.only(stages_for(["directories"])).stages) == {"subdomains", "resolve", "ports", "fuzzing"}
+    assert stages_for(["all"]) is None and stages_for(None) is None
+    with pytest.raises(ValueError, match="nope"):
+        stages_for(["subdomains", "nope"])
+
+
+def test_worker_runs_only_the_requested_scan_types():
+    ran = []
+
+    def stage(name):
+        async def func(ctx):
+            ran.append(name)
+        return func
+
+    pipeline = lambda: StageScheduler([
+        Stage("subdomains", stage("subdomains"), outputs=["subdomains"]),
+        Stage("resolve", stage("resolve"), depends=["subdomains"], outputs=["hosts"]),
+        Stage("screenshots", stage("screenshots"), depends=["subdomains"], outputs=["screenshots"]),
+    ])
+
+    async def run():
+        queue = MemoryJobQueue()
+        await queue.enqueue({"id": "s", "domain": "a.com", "timestamp": datetime(2024, 1, 1), "scan_types": ["subdomains"]})
+        await run_scan(queue, await queue.claim("w", 30), "w", pipeline)
+        return await queue.get("s")
+
+    doc = asyncio.run(run())
+    assert sorted(ran) == ["resolve", "subdomains"]
+    assert doc["status"] == "completed" and "hosts" in doc and "screenshots" not in doc
+
+
+def test_budget_slots_are_shared_fairly():
+    async def run():
+        budget = FairSemaphore("test", limit=2)
+        order = []
+
+        async def job(owner, i):
+            with budget_owner(owner):
+                async with budget.slot():
+                    order.append(owner)
+                    await asyncio.sleep(0.01)
+
+        # "big" queues 10 jobs before "small" asks for anything
+        big = [asyncio.ensure_future(job("big", i)) for i in range(10)]
+        await asyncio.sleep(0)
+        small = [asyncio.ensure_future(job("small", i)) for i in range(3)]
+        await asyncio.gather(*big, *small)
+        assert budget.in_use == 0 and not budget.held and not budget.waiters
+        return order
+
+    order = asyncio.run(run())
+    # Small gets every other slot instead of waiting behind all of big
+    assert order.index("small") <= 3
+    assert order[:8].count("small") == 3
+
+
+def test_cancelled_waiters_give_their_slot_back():
+    async def run():
+        budget = FairSemaphore("test", limit=1)
+        await budget.acquire()
+        waiter = asyncio.ensure_future(budget.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        budget.release(None)
+        assert budget.in_use == 0 and not budget.waiters
+
+    asyncio.run(run())
+
+
+def test_campaign_endpoints(monkeypatch):
+    import app.main
+    queue = MemoryJobQueue()
+    monkeypatch.setattr(app.main, "queue", queue)
+    client = TestClient(app.main.app)
+
+    response = client.post("/api/campaigns", json={"domains": ["a.com", "b.com", "a.com", "??"], "scan_types": ["subdomains"]})
+    assert response.status_code == 200
+    campaign = response.json()
+    assert (campaign["total"], campaign["pending"], campaign["invalid"]) == (2, 2, ["??"])
+    docs = [d for d in queue.docs.values() if d.get("campaign_id") == campaign["id"]]
+    assert sorted(d["domain"] for d in docs) == ["a.com", "b.com"]
+    assert all(d["scan_types"] == ["subdomains"] for d in docs)
+
+    docs[0]["status"] = "completed"
+    progress = client.get(f"/api/campaigns/{campaign['id']}").json()
+    assert (progress["completed"], progress["pending"], progress["progress"], progress["done"]) == (1, 1, 0.5, False)
+    listed = client.get("/api/scans", params={"campaign": campaign["id"]}).json()["items"]
+    assert len(listed) == 2 and all(item["campaign_id"] == campaign["id"] for item in listed)
+
+    upload = client.post("/api/campaigns/upload?scan_types=subdomains&scan_types=ports",
+                         content=b"\xef\xbb\xbfc.com\n# comment\nd.com\n")
+    assert upload.status_code == 200 and upload.json()["total"] == 2
+
+    assert client.post("/api/campaigns", json={"domains": ["a.com"], "scan_types": ["bogus"]}).status_code == 400
+    assert client.post("/api/campaigns", json={"domains": ["??"]}).status_code == 400
+    assert client.post("/api/scan", json={"domain": "a.com", "scan_types": ["bogus"]}).status_code == 400
+    assert client.get("/api/campaigns/missing").status_code == 404
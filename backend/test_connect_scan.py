@@ -0,0 +1,113 @@
+import asyncio
+import socket
+
+import pytest
+
+from app.services.connect_scan import ConnectScanner, parse_ports
+
+
+def listen(ip):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((ip, 0))
+    sock.listen(128)
+    return sock
+
+
+def test_parse_ports():
+    assert parse_ports("22,80,8000-8002") == [22, 80, 8000, 8001, 8002]
+    assert len(parse_ports("1-65535")) == 65535
+    with pytest.raises(ValueError):
+        parse_ports("0-70000")
+
+
+def test_scans_multiple_loopback_hosts():
+    listeners = [listen("127.0.0.1"), listen("127.0.0.1"), listen("127.0.0.2")]
+    try:
+        open_by_ip = {}
+        for sock in listeners:
+            ip, port = sock.getsockname()
+            open_by_ip.setdefault(ip, []).append(port)
+        ports = sorted({p for ps in open_by_ip.values() for p in ps}) + [1, 2, 3]
+
+        async def run():
+            scanner = ConnectScanner(concurrency=64, timeout=0.5)
+            return [r async for r in scanner.scan(["127.0.0.1", "127.0.0.2", "127.0.0.1"], ports)]
+
+        results = asyncio.run(run())
+    finally:
+        for sock in listeners:
+            sock.close()
+
+    assert sorted(r.ip for r in results) == ["127.0.0.1", "127.0.0.2"]
+    for result in results:
+        assert result.ports == sorted(open_by_ip[result.ip])
+
+
+def test_full_range_scan_probes_every_port_once():
+    listener = listen("127.0.0.3")
+    try:
+        port = listener.getsockname()[1]
+
+        async def run():
+            scanner = ConnectScanner(concurrency=500)
+            return scanner, [r async for r in scanner.scan(["127.0.0.3"], parse_ports("1-65535"))]
+
+        scanner, results = asyncio.run(run())
+    finally:
+        listener.close()
+
+    assert port in results[0].ports
+    assert scanner.probes == 65535 + scanner.retries
+
+
+def test_timed_out_probes_are_retried_before_counting_as_closed():
+    listener = listen("127.0.0.1")
+    port = listener.getsockname()[1]
+
+    class SlowFirstAnswer(ConnectScanner):
+        """Every port's first probe times out, as on a loaded host."""
+
+        async def _probe(self, ip, port, host, timeout=None):
+            if timeout is None:
+                self.timeouts += 1
+                return None
+            return await super()._probe(ip, port, host, timeout)
+
+    async def run():
+        scanner = SlowFirstAnswer(concurrency=8)
+        return scanner, [r async for r in scanner.scan(["127.0.0.1"], [port, 1])]
+
+    try:
+        scanner, results = asyncio.run(run())
+    finally:
+        listener.close()
+    assert [(r.ip, r.ports) for r in results] == [("127.0.0.1", [port])]
+    assert scanner.retries == 2
+
+
+def test_socket_errors_do_not_abort_the_scan(monkeypatch):
+    listener = listen("127.0.0.1")
+    port = listener.getsockname()[1]
+    real_socket = socket.socket
+    failures = [OSError(24, "Too many open files")] * 3
+
+    def flaky_socket(*args):
+        if failures:
+            raise failures.pop()
+        return real_socket(*args)
+
+    async def run():
+        scanner = ConnectScanner(concurrency=4)
+        monkeypatch.setattr(socket, "socket", flaky_socket)
+        try:
+            return scanner, [r async for r in scanner.scan(["127.0.0.1"], [port, 1, 2])]
+        finally:
+            monkeypatch.setattr(socket, "socket", real_socket)
+
+    try:
+        scanner, results = asyncio.run(run())
+    finally:
+        listener.close()
+    assert scanner.socket_errors == 3
+    assert [(r.ip, r.ports) for r in results] == [("127.0.0.1", [port])]
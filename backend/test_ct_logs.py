@@ -0,0 +1,82 @@
+import json
+
+import pytest
+import requests
+
+from app.services.ct_logs import CERTSPOTTER_URL, CRTSH_URL, CTLogService, iter_json_array, normalize_name
+
+
+def chunked(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_array_elements_survive_any_chunk_boundary():
+    doc = [{"name_value": "a.example.com\n*.b.example.com", "id": 12345}, {"name_value": "é.example.com"}, 7, "x"]
+    data = json.dumps(doc, ensure_ascii=False).encode()
+    for size in (1, 2, 5, 64):
+        assert list(iter_json_array(chunked(data, size))) == doc
+
+
+def test_truncated_or_non_array_response_is_an_error():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[{"name_value": "a.example.com"}, {"name_']))
+    with pytest.raises(ValueError):
+        list(iter_json_array([b"<html>502 Bad Gateway</html>"]))
+
+
+def test_names_are_normalized_to_the_domain():
+    assert normalize_name(" WWW.Example.com. ", "example.com") == "www.example.com"
+    assert normalize_name("*.dev.example.com", "example.com") == "dev.example.com"
+    assert normalize_name("example.com", "example.com") == "example.com"
+    assert normalize_name("badexample.com", "example.com") is None
+    assert normalize_name("admin@example.com", "example.com") is None
+
+
+class FakeResponse:
+    def __init__(self, body, status=200):
+        self.body = json.dumps(body).encode() if not isinstance(body, bytes) else body
+        self.status = status
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.HTTPError(str(self.status))
+
+    def iter_content(self, size):
+        return chunked(self.body, 3)
+
+
+class FakeSession:
+    def __init__(self, crtsh, certspotter_pages):
+        self.crtsh = crtsh
+        self.pages = certspotter_pages
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append((url, dict(params)))
+        if url == CRTSH_URL:
+            return self.crtsh
+        return FakeResponse(self.pages.get(params.get("after"), []))
+
+
+def test_sources_are_merged_and_paged():
+    session = FakeSession(
+        FakeResponse([{"name_value": "www.example.com\nmail.example.com"}, {"name_value": "www.example.com\nother.org"}]),
+        {None: [{"id": "1", "dns_names": ["api.example.com", "*.example.com"]}],
+         "1": [{"id": "2", "dns_names": ["WWW.example.com"]}]},
+    )
+    names = CTLogService.collect_names("example.com", session=session)
+    assert sorted(names) == ["api.example.com", "example.com", "mail.example.com", "www.example.com"]
+    afters = [params.get("after") for url, params in session.requests if url == CERTSPOTTER_URL]
+    assert afters == [None, "1", "2"]
+
+
+def test_one_failing_source_keeps_the_others():
+    session = FakeSession(FakeResponse(b"", status=503), {None: [{"id": "1", "dns_names": ["api.example.com"]}]})
+    assert CTLogService.collect_names("example.com", session=session) == ["api.example.com"]
+    assert CTLogService.collect_names("example.com", ["crtsh"], session=session) is None
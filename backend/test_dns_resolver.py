@@ -0,0 +1,49 @@
+import asyncio
+
+from app.services.dns_resolver import AsyncResolver
+from app.services.subdomain import SubdomainService
+from benchmarks.fakes import StubDnsServer
+
+
+def test_resolve_many_streams_hits():
+    async def run():
+        server = await StubDnsServer({"www.example.test": "10.0.0.1", "mail.example.test": "10.0.0.2"}).start()
+        try:
+            resolver = AsyncResolver(nameservers=[server.host], port=server.port, concurrency=20, timeout=0.5)
+            names = [f"{w}.example.test" for w in ["www", "mail", "nope", "ftp"]]
+            async with resolver:
+                return {hit.name: hit.addresses async for hit in resolver.resolve_many(names)}
+        finally:
+            server.stop()
+
+    hits = asyncio.run(run())
+    assert hits == {"www.example.test": ["10.0.0.1"], "mail.example.test": ["10.0.0.2"]}
+
+
+def test_retries_rotate_to_next_nameserver():
+    async def run():
+        server = await StubDnsServer({"www.example.test": "10.0.0.1"}).start()
+        try:
+            # 127.0.0.2 has nothing listening; the retry must land on the stub
+            resolver = AsyncResolver(nameservers=["127.0.0.2", server.host], port=server.port, timeout=0.2, retries=2)
+            async with resolver:
+                return await resolver.resolve("www.example.test")
+        finally:
+            server.stop()
+
+    assert asyncio.run(run()).addresses == ["10.0.0.1"]
+
+
+def test_bruteforce_uses_wordlist(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("www\nadmin\n\nmissing\n")
+
+    async def run():
+        server = await StubDnsServer({"www.example.test": "10.0.0.1", "admin.example.test": "10.0.0.3"}).start()
+        try:
+            resolver = AsyncResolver(nameservers=[server.host], port=server.port, timeout=0.5)
+            return await SubdomainService.get_subdomains_bruteforce("example.test", str(wordlist), resolver=resolver)
+        finally:
+            server.stop()
+
+    assert sorted(asyncio.run(run())) == ["admin.example.test", "www.example.test"]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.events import RESYNC, EventBus
+from app.jobs import MemoryJobQueue
+
+
+def test_subscribers_get_events_for_their_topic_only():
+    async def run():
+        bus = EventBus()
+        a, b = bus.subscribe("scan-a"), bus.subscribe("scan-b")
+        bus.publish("scan-a", {"type": "status", "status": "running"})
+        assert await a.get(timeout=0.1) == {"type": "status", "status": "running"}
+        assert await b.get(timeout=0.05) is None
+        a.close()
+        b.close()
+        assert bus.subscribers == {}
+
+    asyncio.run(run())
+
+
+def test_slow_subscriber_is_resynced_not_blocking():
+    async def run():
+        bus = EventBus(maxsize=4)
+        slow = bus.subscribe("scan")
+        for i in range(10):
+            bus.publish("scan", {"type": "partial", "n": i})
+        assert slow.dropped == 10
+        first = await slow.get(timeout=0.1)
+        assert first is RESYNC
+        bus.publish("scan", {"type": "partial", "n": 10})
+        assert (await slow.get(timeout=0.1))["n"] == 10
+
+    asyncio.run(run())
+
+
+def test_finished_scan_stream_is_just_a_snapshot(monkeypatch):
+    import app.main
+    queue = MemoryJobQueue()
+    monkeypatch.setattr(app.main, "queue", queue)
+    queue.docs["done-scan"] = {"id": "done-scan", "domain": "example.com", "status": "completed",
+                               "timestamp": datetime(2024, 1, 1), "technologies": ["nginx"]}
+    response = TestClient(app.main.app).get("/api/scan/done-scan/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert len(frames) == 1
+    assert frames[0]["type"] == "snapshot"
+    assert frames[0]["scan"]["technologies"] == ["nginx"]
+
+
+
+def test_failed_resync_read_sends_no_empty_snapshot(monkeypatch):
+    import app.main
+
+    class FlakyQueue(MemoryJobQueue):
+        reads = 0
+
+        async def get(self, scan_id):
+            self.reads += 1
+            if self.reads == 2:
+                # The scan finishes while the store is unreachable
+                self.docs[scan_id]["status"] = "completed"
+                raise ConnectionError("no primary")
+            return await super().get(scan_id)
+
+    class Subscription:
+        # Fell behind twice; the events in between were dropped
+        events = [RESYNC, RESYNC]
+
+        async def get(self, timeout=None):
+            return self.events.pop(0) if self.events else None
+
+        def close(self):
+            pass
+
+    class Bus:
+        def subscribe(self, scan_id):
+            return Subscription()
+
+    queue = FlakyQueue()
+    queue.docs["s1"] = {"id": "s1", "domain": "example.com", "status": "running", "timestamp": datetime(2024, 1, 1)}
+    monkeypatch.setattr(app.main, "queue", queue)
+    monkeypatch.setattr(app.main, "scan_events", Bus())
+    response = TestClient(app.main.app).get("/api/scan/s1/events")
+    frames = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [(f["type"], f["scan"]["status"]) for f in frames] == [("snapshot", "running"), ("snapshot", "completed")]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.fuzz_scheduler import FuzzScheduler, expand_words
+from app.services.http_engine import HttpEngine
+from benchmarks.fakes import FakeHttpServer
+
+
+def test_expand_words():
+    assert list(expand_words(["admin", "robots.txt"], [".php", ".bak"])) == [
+        "admin", "admin.php", "admin.bak", "robots.txt",
+    ]
+
+
+def test_recurses_across_hosts_and_isolates_slow_host():
+    fast = FakeHttpServer({
+        "/admin": (301, b"", {"Location": "/admin/"}),
+        "/admin/config.bak": (200, b"secret"),
+        "/login.php": (200, b"<form>"),
+    }).start_in_thread()
+    words = ["admin", "config", "login"] + [f"w{i}" for i in range(20)]
+    slow = FakeHttpServer(
+        {"/config": (200, b"slow config")},
+        slow={f"/{w}{ext}": 0.1 for w in words for ext in ["", ".php", ".bak"]},
+    ).start_in_thread()
+    try:
+        async def run():
+            async with HttpEngine(concurrency=20, per_host=2, timeout=5) as engine:
+                scheduler = FuzzScheduler(engine, words, [".php", ".bak"], max_depth=1, workers=20, per_host=2)
+                scheduler.add_host(fast.url)
+                scheduler.add_host(slow.url)
+                found = []
+                fast_done_at = None
+                start = time.perf_counter()
+                async for hit in scheduler.run():
+                    found.append(hit.url)
+                    if hit.path == "/admin/config.bak":
+                        fast_done_at = time.perf_counter() - start
+                return found, fast_done_at
+
+        found, fast_done_at = asyncio.run(run())
+    finally:
+        fast.stop_thread()
+        slow.stop_thread()
+
+    assert sorted(found) == sorted([
+        f"{fast.url}/admin", f"{fast.url}/admin/config.bak", f"{fast.url}/login.php", f"{slow.url}/config",
+    ])
+    # The slow host (~69 paths x 0.1s over 2 slots) must not hold up the fast one
+    assert fast_done_at < 2
+
+
+def test_a_failing_fetch_stops_the_other_workers():
+    class FailingEngine:
+        calls = 0
+
+        async def fetch(self, url):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            if url.endswith("/w5"):
+                raise ConnectionError("connection pool closed")
+            return None
+
+    engine = FailingEngine()
+
+    async def run():
+        scheduler = FuzzScheduler(engine, [f"w{i}" for i in range(2000)], workers=8, per_host=8)
+        scheduler.add_host("http://a.test")
+        with pytest.raises(ConnectionError):
+            async for _ in scheduler.run():
+                pass
+        seen = engine.calls
+        await asyncio.sleep(0.2)
+        return seen
+
+    seen = asyncio.run(run())
+    assert engine.calls == seen
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.history import decode_cursor, encode_cursor, history_filter, page_in_memory
+
+
+def _scans(n):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": f"scan-{i:03d}",
+            "domain": "a.com" if i % 2 else "b.com",
+            "status": "completed",
+            # Pairs share a timestamp so the id tie-break is exercised
+            "timestamp": start + timedelta(minutes=i // 2),
+            "ports": [{"ip": "1.1.1.1", "ports": [80, 443]}, {"ip": "2.2.2.2", "ports": [22]}],
+            "screenshots": {"a.com": {"blob": "x"}},
+            "directories": ["/admin (Status: 200)"] * 1000,
+        }
+        for i in range(n)
+    ]
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    ts = datetime(2024, 5, 6, 7, 8, 9, 123000)
+    assert decode_cursor(encode_cursor(ts, "abc|def")) == (ts, "abc|def")
+    with pytest.raises(ValueError):
+        history_filter(cursor="not-a-cursor")
+
+
+def test_pages_cover_everything_once_newest_first():
+    docs = _scans(25)
+    seen, cursor = [], None
+    while True:
+        page = page_in_memory(docs, 10, cursor=cursor)
+        seen += page
+        if len(page) < 10:
+            break
+        cursor = encode_cursor(page[-1]["timestamp"], page[-1]["id"])
+    assert [s["id"] for s in seen] == [f"scan-{i:03d}" for i in reversed(range(25))]
+    assert seen[0]["port_count"] == 3
+    assert seen[0]["directory_count"] == 1000
+    assert "directories" not in seen[0]
+
+
+def test_filters_by_domain_and_status():
+    docs = _scans(10)
+    docs[1]["status"] = "failed"
+    page = page_in_memory(docs, 50, domain="a.com", status="completed")
+    assert {s["id"] for s in page} == {"scan-003", "scan-005", "scan-007", "scan-009"}
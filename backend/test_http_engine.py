@@ -0,0 +1,62 @@
+import asyncio
+
+from app.services.fuzzing import FuzzingService
+from app.services.http_engine import HttpEngine
+from benchmarks.fakes import FakeHttpServer
+
+
+def test_fetch_many_reuses_connections():
+    server = FakeHttpServer({"/admin": (200, b"x" * 20000)}).start_in_thread()
+    try:
+        async def run():
+            async with HttpEngine(concurrency=4, per_host=4, max_body=100) as engine:
+                urls = [f"{server.url}/p{i}" for i in range(200)] + [f"{server.url}/admin"]
+                return [r async for r in engine.fetch_many(urls)]
+
+        responses = asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+    assert len(responses) == 201
+    admin = next(r for r in responses if r.url.endswith("/admin"))
+    assert admin.status == 200 and len(admin.body) == 100
+    # 201 requests over a handful of kept-alive connections
+    assert len(server.client_ports) <= 8
+
+
+def test_stream_directories(tmp_path):
+    wordlist = tmp_path / "dirs.txt"
+    wordlist.write_text("admin\nlogin\nmissing\n.git\n")
+    server = FakeHttpServer({
+        "/admin": (301, b"", {"Location": "/admin/"}),
+        "/login": (200, b"<form>"),
+        "/.git": (403, b"Forbidden"),
+    }).start_in_thread()
+    try:
+        async def run():
+            domain = f"{server.host}:{server.port}"
+            return [found async for found in FuzzingService.stream_directories(domain, str(wordlist))]
+
+        found = asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+    assert sorted(found) == ["/.git (Status: 403)", "/admin (Status: 301)", "/login (Status: 200)"]
+
+
+def test_pipelined_requests_share_one_connection():
+    server = FakeHttpServer({"/a": (200, b"alpha")}).start_in_thread()
+    try:
+        async def run():
+            async with HttpEngine(concurrency=16, per_host=1, pipeline=8) as engine:
+                urls = [f"{server.url}/a" if i % 5 == 0 else f"{server.url}/n{i}" for i in range(50)]
+                return [r async for r in engine.fetch_many(urls)], engine.connections_opened
+
+        responses, opened = asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+    assert opened == 1
+    assert len(responses) == 50
+    assert all(r.body == b"alpha" for r in responses if r.url.endswith("/a"))
+    assert all(r.status == 404 for r in responses if not r.url.endswith("/a"))
@@ -0,0 +1,92 @@
+import asyncio
+
+from app.scan_diff import diff_scans
+from app.services.visual_recon import VisualReconService
+from app.services.port_scan import PortScanService
+from app.stages import ScanContext, fuzzing_stage, port_stage, screenshot_stage
+from benchmarks.fakes import FakeHttpServer
+
+
+def test_diff_reports_added_and_removed():
+    old = {
+        "hosts": {"a.example.com": ["1.1.1.1"], "old.example.com": ["2.2.2.2"]},
+        "ports": [{"ip": "1.1.1.1", "ports": [80, 22]}],
+        "directories": ["http://a.example.com/admin (Status: 200)"],
+        "technologies": ["nginx"],
+    }
+    new = {
+        "hosts": {"a.example.com": ["1.1.1.1"], "new.example.com": ["3.3.3.3"]},
+        "ports": [{"ip": "1.1.1.1", "ports": [80, 443]}],
+        "directories": ["http://a.example.com/admin (Status: 403)"],
+        "technologies": ["nginx", "PHP"],
+    }
+    diff = diff_scans(old, new)
+    assert diff["subdomains"] == {"added": ["new.example.com"], "removed": ["old.example.com"]}
+    assert diff["ports"] == {"added": ["1.1.1.1:443"], "removed": ["1.1.1.1:22"]}
+    assert diff["directories"] == {"added": [], "removed": []}
+    assert diff["technologies"] == {"added": ["PHP"], "removed": []}
+
+
+def test_incremental_fuzzing_only_rechecks_known_paths():
+    server = FakeHttpServer({"/admin": (200, b"admin")}).start_in_thread()
+    try:
+        ctx = ScanContext("scan", "127.0.0.1")
+        ctx.baseline = {
+            "http_services": [server.url],
+            "directories": [f"{server.url}/admin (Status: 200)", f"{server.url}/gone (Status: 200)"],
+        }
+        # http_targets() falls back to http://<domain> with no open ports known
+        ctx.domain = f"127.0.0.1:{server.port}"
+        asyncio.run(fuzzing_stage(ctx))
+    finally:
+        server.stop_thread()
+    assert ctx.directories == [f"{server.url}/admin (Status: 200)"]
+    assert server.requests == 2
+
+
+def _scanned_groups(ctx, monkeypatch) -> list:
+    groups = []
+
+    async def scan(ips, ports=None):
+        groups.append((sorted(ips), ports))
+        return
+        yield
+
+    monkeypatch.setattr(PortScanService, "scan_common_ports", staticmethod(scan))
+    asyncio.run(port_stage(ctx))
+    return sorted(groups, key=str)
+
+
+def test_incremental_port_scan_checks_known_open_ports_first(monkeypatch):
+    ctx = ScanContext("scan", "example.com", port_spec="22,80,443")
+    ctx.hosts = {"a.example.com": ["1.1.1.1"], "b.example.com": ["2.2.2.2"], "new.example.com": ["3.3.3.3"]}
+    ctx.baseline = {
+        "hosts": {"a.example.com": ["1.1.1.1"], "b.example.com": ["2.2.2.2"]},
+        "ports": [{"ip": "1.1.1.1", "ports": [80]}],
+        "completed_stages": ["subdomains", "resolve", "ports", "banners"],
+    }
+    # Every IP gets every port, so a port opened since the last scan is found
+    assert _scanned_groups(ctx, monkeypatch) == [(["1.1.1.1"], [80, 22, 443]), (["2.2.2.2", "3.3.3.3"], [22, 80, 443])]
+
+
+def test_stages_missing_from_the_baseline_run_in_full(monkeypatch):
+    ctx = ScanContext("scan", "example.com", port_spec="22,80")
+    ctx.hosts = {"a.example.com": ["1.1.1.1"]}
+    # The previous scan only looked for subdomains
+    ctx.baseline = {"hosts": {"a.example.com": ["1.1.1.1"]}, "completed_stages": ["subdomains", "resolve"]}
+    assert ctx.baseline_for("subdomains") is ctx.baseline and ctx.baseline_for("ports") is None
+    assert _scanned_groups(ctx, monkeypatch) == [(["1.1.1.1"], [22, 80])]
+
+
+def test_unchanged_pages_keep_their_screenshot():
+    server = FakeHttpServer({}, default=(200, b"<html><body>parked domain, generated 1700000000</body></html>")).start_in_thread()
+    host = f"127.0.0.1:{server.port}"
+    try:
+        previous = asyncio.run(VisualReconService.fingerprint_hosts([host]))
+        ctx = ScanContext("second", host)
+        ctx.baseline = {"http_fingerprints": previous, "screenshots": {host: {"blob": "b" * 64}}}
+        asyncio.run(screenshot_stage(ctx))
+    finally:
+        server.stop_thread()
+    assert ctx.screenshots == {host: {"blob": "b" * 64}}
+
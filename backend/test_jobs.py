@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.jobs import MemoryJobQueue
+from app.scheduler import Stage, StageScheduler
+from app.worker import ScanWorker
+
+
+def _scan(scan_id, minutes=0):
+    return {"id": scan_id, "domain": f"{scan_id}.com", "timestamp": datetime(2024, 1, 1) + timedelta(minutes=minutes)}
+
+
+def test_claims_are_exclusive_and_expired_leases_are_reclaimed():
+    async def run():
+        queue = MemoryJobQueue(max_attempts=2)
+        await queue.enqueue(_scan("new", 5))
+        await queue.enqueue(_scan("old", 1))
+
+        first = await queue.claim("w1", lease=0.05)
+        second = await queue.claim("w2", lease=30)
+        assert (first["id"], second["id"]) == ("old", "new")
+        assert await queue.claim("w3", lease=30) is None
+
+        # w1 goes silent: its scan is handed to w3 and w1 finds out on heartbeat
+        await asyncio.sleep(0.1)
+        retried = await queue.claim("w3", lease=0.05)
+        assert retried["id"] == "old" and retried["attempts"] == 2
+        assert not await queue.heartbeat("old", "w1", 30)
+
+        # Out of attempts: failed instead of claimed a third time
+        await asyncio.sleep(0.1)
+        assert await queue.claim("w4", lease=30) is None
+        assert (await queue.get("old"))["status"] == "failed"
+
+    asyncio.run(run())
+
+
+def test_resumed_scan_skips_checkpointed_stages():
+    runs = {"osint": 0, "slow": 0}
+
+    def pipeline_factory(hang):
+        async def osint(ctx):
+            runs["osint"] += 1
+            ctx.technologies = ["nginx"]
+
+        async def slow(ctx):
+            runs["slow"] += 1
+            if hang:
+                await asyncio.Event().wait()
+            ctx.vulnerabilities = [f"{t}: check" for t in ctx.technologies]
+
+        return lambda: StageScheduler([
+            Stage("osint", osint, outputs=["technologies"]),
+            Stage("slow", slow, depends=["osint"], outputs=["vulnerabilities"]),
+        ])
+
+    async def run():
+        queue = MemoryJobQueue()
+        await queue.enqueue(_scan("scan"))
+
+        crashed = ScanWorker(queue, lease=0.1, poll_interval=0.01, pipeline_factory=pipeline_factory(hang=True))
+        runner = asyncio.ensure_future(crashed.run())
+        while runs["slow"] == 0:
+            await asyncio.sleep(0.01)
+        # Simulate the process dying: everything stops, nothing is released
+        runner.cancel()
+        for task in crashed.active.values():
+            task.cancel()
+        await asyncio.sleep(0.2)
+
+        resumed = ScanWorker(queue, lease=5, poll_interval=0.01, pipeline_factory=pipeline_factory(hang=False))
+        runner = asyncio.ensure_future(resumed.run())
+        while (await queue.get("scan"))["status"] != "completed":
+            await asyncio.sleep(0.01)
+        await resumed.stop()
+        runner.cancel()
+        return await queue.get("scan")
+
+    scan = asyncio.run(run())
+    assert runs == {"osint": 1, "slow": 2}
+    assert scan["vulnerabilities"] == ["nginx: check"]
+    assert scan["completed_stages"] == ["osint", "slow"]
+    assert "lease_owner" not in scan
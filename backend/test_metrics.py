@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.jobs import MemoryJobQueue
+from app.metrics import Counter, DNS_QUERIES, Histogram, REGISTRY, render, scan_metrics
+from app.scheduler import Stage, StageScheduler
+from app.worker import run_scan, start_metrics_server
+
+
+def _unregister(*metrics):
+    for metric in metrics:
+        REGISTRY.remove(metric)
+
+
+def test_counters_and_histograms_render_in_prometheus_format():
+    requests = Counter("test_requests_total", "Requests.", ["kind"])
+    latency = Histogram("test_latency_seconds", "Latency.", buckets=[0.1, 1])
+    try:
+        requests.inc(kind="timeout")
+        requests.inc(2, kind='a"b')
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+        text = render()
+    finally:
+        _unregister(requests, latency)
+
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{kind="timeout"} 1' in text
+    assert 'test_requests_total{kind="a\\"b"} 2' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_sum 5.55" in text
+    assert "test_latency_seconds_count 3" in text
+
+
+def test_scan_tally_follows_tasks_and_threads_only():
+    async def run():
+        with scan_metrics() as tally:
+            await asyncio.gather(*(asyncio.to_thread(DNS_QUERIES.inc) for _ in range(3)))
+            await asyncio.ensure_future(asyncio.sleep(0, DNS_QUERIES.inc()))
+        # Outside the scan: process-wide only
+        DNS_QUERIES.inc()
+        return tally
+
+    assert asyncio.run(run()) == {"dns_queries": 4}
+
+
+def test_scan_document_keeps_its_metrics_and_timings():
+    async def resolve(ctx):
+        DNS_QUERIES.inc(5)
+
+    async def broken(ctx):
+        raise RuntimeError("nmap missing")
+
+    async def after(ctx):
+        pass
+
+    pipeline = lambda: StageScheduler([
+        Stage("resolve", resolve), Stage("ports", broken), Stage("after", after, depends=["ports"]),
+    ])
+
+    async def run():
+        queue = MemoryJobQueue()
+        await queue.enqueue({"id": "s1", "domain": "example.com", "timestamp": datetime(2024, 1, 1)})
+        job = await queue.claim("w1", 30)
+        await run_scan(queue, job, "w1", pipeline)
+        return await queue.get("s1")
+
+    doc = asyncio.run(run())
+    assert doc["status"] == "completed"
+    assert doc["metrics"] == {
+        "dns_queries": 5, "stage_runs.resolve.ok": 1, "stage_runs.ports.failed": 1, "stage_runs.after.skipped": 1,
+    }
+    assert set(doc["stage_timings"]) == {"resolve", "ports"}
+    text = render()
+    assert 'recon_stage_runs_total{stage="after",result="skipped"}' in text
+    assert 'recon_stage_runs_total{stage="ports",result="failed"}' in text
+    assert 'recon_stage_seconds_count{stage="resolve"}' in text
+
+
+def test_metrics_endpoints(monkeypatch):
+    import app.main
+    queue = MemoryJobQueue()
+    monkeypatch.setattr(app.main, "queue", queue)
+    queue.docs["waiting"] = {"id": "waiting", "domain": "example.com", "status": "pending",
+                             "timestamp": datetime(2024, 1, 1)}
+    response = TestClient(app.main.app).get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "recon_queue_depth 1" in response.text.splitlines()
+
+    async def scrape_worker():
+        server = await start_metrics_server(0, "127.0.0.1")
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: worker\r\n\r\n")
+            data = await reader.read()
+            writer.close()
+            return data
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    data = asyncio.run(scrape_worker())
+    assert data.startswith(b"HTTP/1.1 200 OK")
+    assert b"# TYPE recon_dns_queries_total counter" in data
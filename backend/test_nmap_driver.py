@@ -0,0 +1,110 @@
+import asyncio
+import os
+import socket
+import sys
+
+from app.services.nmap_driver import NmapDriver, NmapXmlStream, format_ports
+from app.services.port_scan import PortScanService
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+FAKE_NMAP = os.path.join(BENCHMARKS, "fake_nmap.py")
+FIXTURE = os.path.join(BENCHMARKS, "fixtures", "nmap_hosts.xml")
+
+
+def _with_env(env: dict, func):
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        return func()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def test_port_ranges_are_compacted():
+    assert format_ports([443, 22, 80, 81, 82, 22]) == "22,80-82,443"
+    assert format_ports([]) == ""
+
+
+def test_recorded_output_is_parsed_as_it_arrives():
+    with open(FIXTURE, "rb") as f:
+        data = f.read()
+    stream = NmapXmlStream()
+    results = []
+    for i in range(0, len(data), 97):
+        results += stream.feed(data[i:i + 97])
+    stream.close()
+    # Filtered ports are not open; the host nmap found down is not in the output
+    assert [(r.ip, r.ports) for r in results] == [("45.33.32.156", [22, 80]), ("45.33.32.157", [80, 443])]
+    assert len(stream.root) == 4  # finished hosts are not kept
+
+
+def test_hosts_are_scanned_in_chunks():
+    ips = [f"10.0.0.{i}" for i in range(1, 11)]
+
+    async def scan():
+        driver = NmapDriver(command=[sys.executable, FAKE_NMAP], chunk_size=4, processes=2)
+        return driver, [r async for r in driver.scan(ips + ips[:2], [22, 25, 80])]
+
+    driver, results = _with_env({"FAKE_NMAP_STARTUP": "0", "FAKE_NMAP_HOST_SECONDS": "0"}, lambda: asyncio.run(scan()))
+    assert driver.runs == 3 and driver.failed == []
+    assert sorted(r.ip for r in results) == sorted(ips)
+    assert all(r.ports == [22, 80] for r in results)
+
+
+def test_failed_runs_fall_back_to_connect_scan():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+
+    async def scan():
+        driver = NmapDriver(command=[sys.executable, FAKE_NMAP], chunk_size=2)
+        partial = [r async for r in driver.scan(["10.0.0.1", "10.0.0.2", "10.0.0.3"], [22])]
+        os.environ["FAKE_NMAP_FAIL"] = "0"
+        fallback = [r async for r in PortScanService.scan_common_ports(["127.0.0.1"], [port])]
+        return driver, partial, fallback
+
+    env = {"FAKE_NMAP_STARTUP": "0", "FAKE_NMAP_HOST_SECONDS": "0", "FAKE_NMAP_PARALLEL": "1",
+           "FAKE_NMAP_FAIL": "1", "RECON_NMAP": FAKE_NMAP}
+    try:
+        driver, partial, fallback = _with_env(env, lambda: asyncio.run(scan()))
+    finally:
+        listener.close()
+    # Each run reported its first host before failing
+    assert sorted(r.ip for r in partial) == ["10.0.0.1", "10.0.0.3"]
+    assert driver.failed == ["10.0.0.2"]
+    assert [(r.ip, r.ports) for r in fallback] == [("127.0.0.1", [port])]
+
+
+def test_cancelled_scan_kills_nmap():
+    marker = "10.254.0.77"
+
+    def running() -> bool:
+        for pid in os.listdir("/proc"):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    if marker.encode() in f.read():
+                        return True
+            except (OSError, ValueError):
+                continue
+        return False
+
+    async def scan():
+        driver = NmapDriver(command=[sys.executable, FAKE_NMAP])
+        task = asyncio.ensure_future(driver.scan([marker], [22]).__anext__())
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if running():
+                break
+        assert running()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    if not os.path.isdir("/proc"):
+        return
+    _with_env({"FAKE_NMAP_STARTUP": "30"}, lambda: asyncio.run(scan()))
+    assert not running()
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.jobs import MemoryJobQueue
+from app.metrics import render
+from app.persistence import MemoryBackend, ScanWriter, apply_update
+
+
+def _doc(scan_id="s1", **fields):
+    return {"id": scan_id, "domain": "example.com", "status": "running", "timestamp": datetime(2024, 1, 1), **fields}
+
+
+def test_changes_are_coalesced_into_one_bulk_write():
+    backend = MemoryBackend({"s1": _doc(), "s2": _doc("s2", directories=["/a"])})
+
+    async def run():
+        writer = ScanWriter(backend, interval=60, max_changes=1000)
+        for path in ("/a", "/b", "/a", "/c"):
+            await writer.add_to_set("s2", "directories", [path])
+        await writer.add_to_set("s1", "ports", [{"ip": "10.0.0.1", "ports": [22]}])
+        await writer.add_to_set("s1", "ports", [{"ip": "10.0.0.2", "ports": [80]}, {"ip": "10.0.0.1", "ports": [22]}])
+        assert backend.writes == 0
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(run())
+    assert backend.writes == 1 and writer.pending_changes == 0
+    assert backend.docs["s1"]["ports"] == [{"ip": "10.0.0.1", "ports": [22]}, {"ip": "10.0.0.2", "ports": [80]}]
+    assert backend.docs["s2"]["directories"] == ["/a", "/b", "/c"]
+
+
+def test_flushes_on_size_and_time():
+    backend = MemoryBackend({"s1": _doc()})
+
+    async def run():
+        writer = ScanWriter(backend, interval=0.05, max_changes=10)
+        await writer.add_to_set("s1", "directories", [f"/{i}" for i in range(9)])
+        assert backend.writes == 0
+        await writer.add_to_set("s1", "directories", ["/9"])
+        assert backend.writes == 1
+        await writer.add_to_set("s1", "directories", ["/10"])
+        await asyncio.sleep(0.15)
+        assert backend.writes == 2
+
+    asyncio.run(run())
+    assert backend.docs["s1"]["directories"] == [f"/{i}" for i in range(11)]
+    assert "recon_persist_flush_seconds_count" in render()
+
+
+def test_failed_flush_keeps_changes_in_order():
+    class FlakyBackend(MemoryBackend):
+        failures = 1
+
+        async def bulk_write(self, operations):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("no primary")
+            await super().bulk_write(operations)
+
+    backend = FlakyBackend({"s1": _doc()})
+
+    async def run():
+        writer = ScanWriter(backend, interval=60)
+        await writer.add_to_set("s1", "directories", ["/a"])
+        await writer.add_to_set("s1", "technologies", ["nginx"])
+        with pytest.raises(ConnectionError):
+            await writer.flush()
+        await writer.add_to_set("s1", "directories", ["/b"])
+        await writer.add_to_set("s1", "technologies", ["nginx", "php"])
+        await writer.flush()
+
+    asyncio.run(run())
+    assert backend.docs["s1"]["directories"] == ["/a", "/b"]
+    assert backend.docs["s1"]["technologies"] == ["nginx", "php"]
+
+
+def test_checkpoints_are_lease_guarded_and_reads_see_buffered_changes():
+    async def run():
+        queue = MemoryJobQueue()
+        await queue.enqueue(_doc())
+        job = await queue.claim("w1", lease=30)
+        await queue.append(job["id"], "directories", ["/admin"])
+        # Not written yet, but served to readers from the cache
+        assert "directories" not in queue.docs["s1"]
+        assert (await queue.get("s1"))["directories"] == ["/admin"]
+
+        await queue.checkpoint("s1", "w2", "fuzzing", {"http_services": ["http://x"]})
+        assert "http_services" not in queue.docs["s1"] and "http_services" not in await queue.get("s1")
+        await queue.checkpoint("s1", "w1", "fuzzing", {"http_services": ["http://x"]})
+        assert queue.docs["s1"]["directories"] == ["/admin"]
+        assert queue.docs["s1"]["completed_stages"] == ["fuzzing"]
+
+        await queue.finish("s1", "w1", "completed", {"technologies": []})
+        assert (await queue.get("s1"))["status"] == "completed"
+        # Finished scans no longer change, so they stay cached
+        hits, misses = queue.writer.hits, queue.writer.misses
+        assert (await queue.get("s1"))["technologies"] == []
+        assert (queue.writer.hits, queue.writer.misses) == (hits + 1, misses)
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_read_from_the_store():
+    async def run():
+        queue = MemoryJobQueue()
+        await queue.enqueue(_doc())
+        await queue.claim("w1", lease=0.01)
+        await asyncio.sleep(0.05)
+        # Another process took the scan over and wrote to it
+        apply_update(queue.docs["s1"], {"$set": {"lease_owner": "w9", "technologies": ["iis"]}})
+        misses = queue.writer.misses
+        doc = await queue.get("s1")
+        assert doc["technologies"] == ["iis"] and queue.writer.misses == misses + 1
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from app.scheduler import Stage, StageScheduler
+
+
+def test_independent_stages_overlap():
+    order = []
+
+    def sleeper(name, delay):
+        async def run(ctx):
+            await asyncio.sleep(delay)
+            order.append(name)
+        return run
+
+    scheduler = StageScheduler([
+        Stage("a", sleeper("a", 0.2)),
+        Stage("b", sleeper("b", 0.2)),
+        Stage("c", sleeper("c", 0.05), depends=["a"]),
+    ])
+    start = time.perf_counter()
+    timings = asyncio.run(scheduler.run(None))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.4
+    assert order.index("c") > order.index("a")
+    assert set(timings) == {"a", "b", "c"}
+
+
+def test_failed_stage_skips_dependents():
+    ran = []
+
+    async def boom(ctx):
+        raise RuntimeError("boom")
+
+    async def record(ctx):
+        ran.append(True)
+
+    scheduler = StageScheduler([
+        Stage("a", boom),
+        Stage("b", record, depends=["a"]),
+        Stage("c", record),
+    ])
+    timings = asyncio.run(scheduler.run(None))
+
+    assert ran == [True]
+    assert "b" not in timings
+
+
+def test_cycle_is_rejected():
+    async def noop(ctx):
+        pass
+
+    with pytest.raises(ValueError):
+        StageScheduler([Stage("a", noop, depends=["b"]), Stage("b", noop, depends=["a"])])
+
+
+def test_stage_events_are_reported():
+    events = []
+
+    async def boom(ctx):
+        raise RuntimeError("boom")
+
+    async def noop(ctx):
+        pass
+
+    async def on_event(stage, event):
+        events.append((event["stage"], event["type"], event.get("ok")))
+
+    scheduler = StageScheduler([
+        Stage("a", boom),
+        Stage("b", noop, depends=["a"]),
+        Stage("c", noop),
+    ])
+    asyncio.run(scheduler.run(None, on_event=on_event))
+
+    assert ("a", "stage_finished", False) in events
+    assert ("b", "stage_skipped", None) in events
+    assert [e for e in events if e[0] == "c"] == [("c", "stage_started", None), ("c", "stage_finished", True)]
@@ -0,0 +1,57 @@
+import asyncio
+
+from app.services.fuzzing import FuzzingService
+from app.services.http_engine import HttpResponse
+from app.services.soft404 import Soft404Filter, fingerprint, same_page
+from benchmarks.fakes import FakeHttpServer
+
+
+def catch_all_page(path):
+    return f"<html><h1>Oops</h1><p>{path} was not found. Request id 81723</p></html>".encode()
+
+
+def response(path, status=200, body=b"", headers=None):
+    return HttpResponse(f"http://t{path}", status, headers or {}, body, 0.0)
+
+
+def test_fingerprint_ignores_reflected_path_and_volatile_numbers():
+    a = fingerprint(response("/abc", body=catch_all_page("/abc").replace(b"81723", b"1")))
+    b = fingerprint(response("/admin-panel", body=catch_all_page("/admin-panel")))
+    assert same_page(a, b)
+    real = fingerprint(response("/admin", body=b"<html><form>Login to the admin console</form></html>"))
+    assert not same_page(a, real)
+
+
+def test_redirect_targets_are_compared():
+    a = fingerprint(response("/x1", 302, headers={"location": "/login?next=x1"}))
+    b = fingerprint(response("/x2", 302, headers={"location": "/login?next=x2"}))
+    c = fingerprint(response("/x3", 302, headers={"location": "/dashboard/"}))
+    assert same_page(a, b)
+    assert not same_page(a, c)
+
+
+def test_catch_all_host_is_filtered(tmp_path):
+    wordlist = tmp_path / "dirs.txt"
+    wordlist.write_text("admin\nbackup\nlogin\nconfig\n")
+    server = FakeHttpServer(
+        {"/admin": (200, b"<html><form>Admin console sign in</form></html>")},
+        default=(200, catch_all_page),
+    ).start_in_thread()
+    try:
+        async def run():
+            domain = f"{server.host}:{server.port}"
+            return [found async for found in FuzzingService.stream_directories(domain, str(wordlist))]
+
+        found = asyncio.run(run())
+    finally:
+        server.stop_thread()
+
+    assert found == ["/admin (Status: 200)"]
+
+
+def test_stops_early_on_pure_catch_all():
+    soft404 = Soft404Filter(abort_after=5)
+    soft404.baselines = [fingerprint(response("/zz", body=catch_all_page("/zz")))]
+    for i in range(5):
+        assert soft404.is_soft_404(response(f"/w{i}", body=catch_all_page(f"/w{i}")))
+    assert soft404.catch_all
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.streams import bounded_map
+
+
+def test_results_stream_with_bounded_concurrency():
+    running = 0
+    peak = 0
+
+    async def double(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return n * 2 if n % 3 else None
+
+    async def run():
+        return sorted([r async for r in bounded_map(range(100), double, 8)])
+
+    assert asyncio.run(run()) == sorted(n * 2 for n in range(100) if n % 3)
+    assert peak == 8
+
+
+def test_a_raising_call_stops_further_calls():
+    calls = 0
+
+    async def fetch(n):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if n == 5:
+            raise ConnectionError("boom")
+        return n
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            async for _ in bounded_map(range(10000), fetch, 4):
+                pass
+        seen = calls
+        await asyncio.sleep(0.2)
+        return seen
+
+    seen = asyncio.run(run())
+    assert calls == seen < 20
@@ -0,0 +1,89 @@
+import asyncio
+import re
+
+from app.services.osint import OsintService
+from app.services.tech_fingerprint import TechMatcher, get_tech_matcher, keyword, trie_regex
+from app.services.vulnerabilities import match_vulnerabilities
+from app.schemas import PortResult
+from app.stages import ScanContext, osint_stage
+from benchmarks.fakes import FakeHttpServer
+
+WORDPRESS_PAGE = b"""<html><head>
+<meta name="generator" content="WordPress 6.2.1" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/jquery/3.4.1/jquery.min.js"></script>
+<link rel="stylesheet" href="/wp-content/themes/x/style.css">
+</head><body data-reactroot=""></body></html>"""
+
+
+def test_keyword_is_a_required_literal():
+    assert keyword(r"<[^>]+\sdata-v-[0-9a-f]{8}") == "data-v-"
+    assert keyword(r"jquery(?:\.min)?\.js") == "jquery"
+    assert keyword(r"colou?r") == "colo"
+    assert keyword(r"react|vue") is None
+    assert keyword(r"ab") is None
+
+
+def test_trie_regex_finds_every_word():
+    words = ["react", "reactdom", "wp-content", "content/plugins", "vue"]
+    regex = re.compile(trie_regex(words))
+    assert all(regex.fullmatch(w) for w in words)
+    # Overlapping keywords are all reported
+    matcher = TechMatcher({"A": {"body": ["wp-content"]}, "B": {"body": ["content/plugins"]}, "C": {"body": ["wp-con"]}})
+    assert set(matcher.match({}, b"/wp-content/plugins/x.js")) == {"A", "B", "C"}
+
+
+def test_headers_cookies_meta_and_scripts():
+    headers = {
+        "server": "Apache/2.4.49 (Debian)",
+        "set-cookie": "PHPSESSID=abc; path=/\nBIGipServerweb_pool=1234; path=/",
+        "cf-ray": "7d1c",
+    }
+    found = get_tech_matcher().match(headers, WORDPRESS_PAGE)
+    assert found["Apache HTTP Server"] == "2.4.49"
+    assert found["WordPress"] == "6.2.1"
+    assert found["jQuery"] == "3.4.1"
+    assert {"Debian", "PHP", "F5 BIG-IP", "Cloudflare", "React"} <= set(found)
+
+
+def test_only_the_body_prefix_is_searched():
+    found = get_tech_matcher().match({}, b" " * 70000 + b'<meta name="generator" content="Drupal 9">')
+    assert "Drupal" not in found
+
+
+def test_live_hosts_are_fingerprinted_and_matched():
+    server = FakeHttpServer({"/": (200, WORDPRESS_PAGE, {"Server": "Apache/2.4.49"})}).start_in_thread()
+    try:
+        host = f"{server.host}:{server.port}"
+        detections = asyncio.run(OsintService.detect_hosts([host, "127.0.0.1:1"]))
+    finally:
+        server.stop_thread()
+
+    assert list(detections) == [host]
+    stack = OsintService.merge(detections)
+    apache = next(t for t in stack if t["name"] == "Apache HTTP Server")
+    assert apache["version"] == "2.4.49" and apache["hosts"] == [host]
+    assert "WordPress 6.2.1" in OsintService.labels(stack)
+    ids = {v["id"] for v in match_vulnerabilities(stack, [])}
+    assert {"CVE-2021-41773", "CVE-2020-11022"} <= ids
+
+
+def test_osint_fingerprints_every_http_service(monkeypatch):
+    server = FakeHttpServer({"/": (200, WORDPRESS_PAGE)}).start_in_thread()
+    fetched = []
+
+    async def detect_hosts(targets):
+        fetched.extend(targets)
+        # Base URLs are fetched as given, not as http://<host>/
+        return await real_detect_hosts([server.url])
+
+    real_detect_hosts = OsintService.detect_hosts
+    monkeypatch.setattr(OsintService, "detect_hosts", staticmethod(detect_hosts))
+    ctx = ScanContext("scan", "example.com")
+    ctx.hosts = {"example.com": ["1.1.1.1"], "app.example.com": ["2.2.2.2"]}
+    ctx.ports = [PortResult(ip="1.1.1.1", ports=[22, 443]), PortResult(ip="2.2.2.2", ports=[80, 8080])]
+    try:
+        asyncio.run(osint_stage(ctx))
+    finally:
+        server.stop_thread()
+    assert fetched == ["https://example.com", "http://app.example.com", "http://app.example.com:8080"]
+    assert "WordPress 6.2.1" in ctx.technologies
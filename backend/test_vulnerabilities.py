@@ -0,0 +1,103 @@
+import gzip
+import json
+import time
+
+from app.schemas import PortResult, ServiceInfo
+from app.services.vulnerabilities import ProductIndex, VulnerabilityDB, match_vulnerabilities, parse_feed, version_key
+
+
+def cve(cve_id, matches, modified="2024-01-01T00:00:00.000", status="Analyzed", score=9.8):
+    return {"cve": {
+        "id": cve_id, "vulnStatus": status, "lastModified": modified,
+        "descriptions": [{"lang": "en", "value": f"{cve_id} summary"}],
+        "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": score, "baseSeverity": "CRITICAL"}}]},
+        "configurations": [{"nodes": [{"operator": "OR", "cpeMatch": [
+            {"vulnerable": True, "criteria": criteria, **bounds} for criteria, bounds in matches
+        ]}]}],
+    }}
+
+
+def write_feed(path, items):
+    with gzip.open(path, "wt") as f:
+        json.dump({"format": "NVD_CVE", "version": "2.0", "vulnerabilities": items}, f)
+    return path
+
+
+ANY = "cpe:2.3:a:acme:server:*:*:*:*:*:*:*:*"
+
+
+def test_version_order():
+    assert version_key("2.4.49") < version_key("2.4.50") < version_key("2.10")
+    assert version_key("8.9p1") < version_key("9.3") < version_key("9.3p1")
+
+
+def test_interval_bounds():
+    index = ProductIndex([
+        ("A", ["acme:server", "1.0", True, "2.0", False]),
+        ("B", ["acme:server", "1.5", False, "3.0", True]),
+        ("C", ["acme:server", "2.0", True, "2.0", True]),
+        ("D", ["acme:server", None, True, "1.2", True]),
+    ])
+    assert index.lookup("0.1") == ("D",)
+    assert index.lookup("1.0") == ("A", "D")
+    assert index.lookup("1.5") == ("A",)
+    assert index.lookup("1.7") == ("A", "B")
+    assert index.lookup("2.0") == ("B", "C")
+    assert index.lookup("3.0") == ("B",)
+    assert index.lookup("3.1") == ()
+
+
+def test_feed_updates_replace_cves(tmp_path):
+    db = VulnerabilityDB({"Acme Server": ["acme:server"]})
+    db.update(parse_feed(write_feed(tmp_path / "base.json.gz", [
+        cve("CVE-1", [(ANY, {"versionEndExcluding": "2.0"})]),
+        cve("CVE-2", [(ANY, {"versionStartIncluding": "1.5"})]),
+    ])))
+    assert [c["id"] for c in db.match("Acme Server", "1.6")] == ["CVE-1", "CVE-2"]
+
+    changed = db.update(parse_feed(write_feed(tmp_path / "modified.json.gz", [
+        # Fixed range, rejected CVE, and a stale revision that must not win
+        cve("CVE-1", [(ANY, {"versionEndExcluding": "1.6"})], modified="2024-02-01T00:00:00.000"),
+        cve("CVE-2", [], modified="2024-02-01T00:00:00.000", status="Rejected"),
+        cve("CVE-1", [(ANY, {})], modified="2023-01-01T00:00:00.000"),
+    ])))
+    assert changed == 2
+    assert db.match("Acme Server", "1.6") == []
+    assert [c["id"] for c in db.match("Acme Server", "1.5")] == ["CVE-1"]
+
+
+def test_saved_database_round_trips(tmp_path):
+    db = VulnerabilityDB()
+    db.update(parse_feed(write_feed(tmp_path / "feed.json.gz", [cve("CVE-1", [("cpe:2.3:a:acme:server:1.0:*:*:*:*:*:*:*", {})])])))
+    db.save(tmp_path / "db.json.gz")
+    loaded = VulnerabilityDB.load(tmp_path / "db.json.gz")
+    assert [c["id"] for c in loaded.lookup("acme:server", "1.0")] == ["CVE-1"]
+
+
+def test_lookup_is_fast_with_many_ranges():
+    db = VulnerabilityDB({"Acme Server": ["acme:server"]})
+    db.update({"id": f"CVE-{i}", "last_modified": "", "summary": "", "ranges": [
+        ["acme:server", f"{i}.0", True, f"{i + 5}.0", False]]} for i in range(2000))
+    db.match("Acme Server", "1.0")  # builds the index
+    start = time.perf_counter()
+    for i in range(1000):
+        db.match("Acme Server", f"{i}.5")
+    assert (time.perf_counter() - start) / 1000 < 0.001
+    assert len(db.match("Acme Server", "10.5")) == 5
+
+
+def test_scan_findings_from_tech_stack_and_banners():
+    tech_stack = [{"name": "Apache HTTP Server", "version": "2.4.49", "hosts": ["www.example.com"]},
+                  {"name": "WordPress", "version": None, "hosts": ["www.example.com"]}]
+    ports = [PortResult(ip="10.0.0.1", ports=[22, 80], services={
+        "22": ServiceInfo(service="ssh", product="OpenSSH", version="8.9p1"),
+        "80": ServiceInfo(service="http", product="Apache httpd", version="2.4.49"),
+    })]
+    found = match_vulnerabilities(tech_stack, ports)
+    ids = [v["id"] for v in found]
+    assert found[0]["score"] >= found[-1]["score"]
+    assert "CVE-2024-6387" in ids
+    apache = next(v for v in found if v["id"] == "CVE-2021-41773" and v["product"] == "Apache HTTP Server")
+    assert apache["targets"] == ["www.example.com"]
+    banner = next(v for v in found if v["id"] == "CVE-2021-41773" and v["product"] == "Apache httpd")
+    assert banner["targets"] == ["10.0.0.1:80"]
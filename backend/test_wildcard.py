@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services.dns_resolver import AsyncResolver, Resolution
+from app.services.subdomain import SubdomainService
+from app.services.wildcard import WildcardFilter
+from benchmarks.fakes import StubDnsServer
+
+
+RECORDS = {
+    "*.example.test": "10.9.9.9",
+    "www.example.test": "10.0.0.1",
+    "*.dev.example.test": "parking.example.net",
+    "parking.example.net": "10.8.8.8",
+    "api.dev.example.test": "10.0.0.2",
+}
+
+
+def run_with_stub(records, coro_factory):
+    async def run():
+        server = await StubDnsServer(records).start()
+        try:
+            resolver = AsyncResolver(nameservers=[server.host], port=server.port, timeout=0.5)
+            async with resolver:
+                return await coro_factory(resolver)
+        finally:
+            server.stop()
+
+    return asyncio.run(run())
+
+
+def test_learns_per_level_wildcards():
+    async def learn(resolver):
+        wildcards = WildcardFilter()
+        await wildcards.learn(resolver, ["example.test", "dev.example.test", "other.test"])
+        return wildcards
+
+    wildcards = run_with_stub(RECORDS, learn)
+    assert wildcards.zones == {"example.test", "dev.example.test"}
+    assert wildcards.addresses["example.test"] == {"10.9.9.9"}
+    assert wildcards.cnames["dev.example.test"] == {"parking.example.net"}
+
+    assert wildcards.is_wildcard(Resolution("junk.example.test", ["10.9.9.9"], []))
+    assert wildcards.is_wildcard(Resolution("junk.dev.example.test", ["10.8.8.8"], ["parking.example.net"]))
+    assert not wildcards.is_wildcard(Resolution("www.example.test", ["10.0.0.1"], []))
+    assert not wildcards.is_wildcard(Resolution("api.dev.example.test", ["10.0.0.2"], []))
+
+
+def test_bruteforce_drops_wildcard_hits(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("\n".join(["www", "mail", "ftp", "admin", "api.dev", "junk.dev"]))
+
+    found = run_with_stub(
+        RECORDS,
+        lambda resolver: SubdomainService.get_subdomains_bruteforce("example.test", str(wordlist), resolver=resolver),
+    )
+    assert sorted(found) == ["api.dev.example.test", "www.example.test"]
+
+
+def test_no_wildcard_keeps_everything(tmp_path):
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("www\nmail\n")
+
+    found = run_with_stub(
+        {"www.plain.test": "10.0.0.1", "mail.plain.test": "10.0.0.2"},
+        lambda resolver: SubdomainService.get_subdomains_bruteforce("plain.test", str(wordlist), resolver=resolver),
+    )
+    assert sorted(found) == ["mail.plain.test", "www.plain.test"]
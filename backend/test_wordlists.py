@@ -0,0 +1,70 @@
+import os
+
+from app.services.fuzzing import hit_word
+from app.services.wordlists import WORDLISTS_DIR, WordlistStore
+
+
+def _store(tmp_path, **kwargs) -> WordlistStore:
+    return WordlistStore(source_dir=tmp_path, compiled_dir=tmp_path / "compiled", **kwargs)
+
+
+def test_lists_are_compiled_deduplicated_and_read_lazily(tmp_path):
+    (tmp_path / "words.txt").write_text("www\nmail\n\n  api \nwww\nadmin\nmail\napi.dev\n")
+    words = _store(tmp_path).get("words")
+
+    assert list(words) == ["www", "mail", "api", "admin", "api.dev"]
+    assert len(words) == 5 and words[1] == "mail" and words[-1] == "api.dev"
+    assert "admin" in words and "adm" not in words and "zzz" not in words
+    assert list(words.chunks(2)) == [["www", "mail"], ["api", "admin"], ["api.dev"]]
+    assert words.suffixes() == ["dev"]
+
+
+def test_compiled_file_is_reused_until_the_source_changes(tmp_path):
+    source = tmp_path / "words.txt"
+    source.write_text("a\nb\n")
+    first = _store(tmp_path).get(str(source))
+    compiled = first.path.stat().st_mtime_ns
+
+    # Another process (a fresh store) maps the same file instead of compiling
+    again = _store(tmp_path).get(str(source))
+    assert again.path == first.path and again.path.stat().st_mtime_ns == compiled
+
+    source.write_text("a\nb\nc\n")
+    os.utime(source, ns=(compiled + 10**9, compiled + 10**9))
+    second = _store(tmp_path).get(str(source))
+    assert list(second) == ["a", "b", "c"]
+    # A new file rather than a replaced one (Windows can't replace a mapped
+    # file); the old one is pruned but stays readable while in use
+    assert second.path != first.path
+    assert list((tmp_path / "compiled").glob("*.wl")) == [second.path]
+    assert list(first) == ["a", "b"]
+
+
+def test_merged_lists_rank_words_by_hits(tmp_path):
+    (tmp_path / "common.txt").write_text("admin\nlogin\nbackup\n")
+    (tmp_path / "extra.txt").write_text("backup\nconfig\nold\n")
+    store = _store(tmp_path, rerank_interval=0)
+    merged = store.get("common.txt", "extra.txt", "missing.txt")
+    assert list(merged) == ["admin", "login", "backup", "config", "old"]
+
+    store.record_hits(merged, ["old", "backup", "nope"])
+    store.record_hits(merged, ["old"])
+    assert list(store.get("common.txt", "extra.txt")) == ["old", "backup", "admin", "login", "config"]
+    assert store.get("missing.txt") is None
+
+
+def test_bundled_lists_resolve_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = _store(tmp_path)
+    store.source_dir = WORDLISTS_DIR
+    assert store.resolve("subdomains.txt") == (WORDLISTS_DIR / "subdomains.txt").resolve()
+    assert store.resolve("backend/wordlists/dir_common.txt") == (WORDLISTS_DIR / "dir_common.txt").resolve()
+
+
+def test_fuzz_hits_map_back_to_words(tmp_path):
+    (tmp_path / "dirs.txt").write_text("admin\nbackup\nrobots.txt\n")
+    words = _store(tmp_path).get("dirs")
+    assert hit_word("/admin/", words, [".php"]) == "admin"
+    assert hit_word("/admin/backup.php", words, [".php"]) == "backup"
+    assert hit_word("/robots.txt", words, [".php"]) == "robots.txt"
+    assert hit_word("/unknown", words, [".php"]) is None
@@ -13,9 +13,39 @@ interface SubdomainResult {
     count: number;
 }
 
+interface ServiceInfo {
+    service?: string;
+    product?: string;
+    version?: string;
+    tls_cn?: string;
+}
+
 interface PortResult {
     ip: string;
     ports: number[];
+    banners?: Record<string, string> | null;
+    services?: Record<string, ServiceInfo> | null;
+}
+
+interface ScreenshotRef {
+    blob: string;
+    thumbnail?: string | null;
+    size: number;
+}
+
+interface Vulnerability {
+    id: string;
+    product: string;
+    version?: string | null;
+    score?: number | null;
+    severity?: string | null;
+    summary: string;
+    targets: string[];
+}
+
+interface FieldDiff {
+    added: string[];
+    removed: string[];
 }
 
 interface ScanResult {
@@ -27,42 +57,69 @@ interface ScanResult {
     ports: PortResult[] | null;
     technologies: string[] | null;
     directories?: string[];
-    screenshots?: Record<string, string>;
-    vulnerabilities?: string[];
+    screenshots?: Record<string, ScreenshotRef | string>;
+    vulnerabilities?: (Vulnerability | string)[];
+    baseline_id?: string | null;
+    diff?: Record<string, FieldDiff> | null;
 }
 
+type StageState = "running" | "done" | "failed" | "skipped";
+
+type ScanEvent =
+    | { type: "snapshot"; scan: ScanResult }
+    | { type: "partial"; fields: Partial<ScanResult> }
+    | { type: "status"; status: ScanResult["status"] }
+    | { type: "stage_started" | "stage_skipped"; stage: string }
+    | { type: "stage_finished"; stage: string; ok: boolean; seconds: number };
+
+const blobUrl = (id: string) => `http://localhost:8000/api/blobs/${id}`;
+
+// Older scans stored the image inline as a base64 data URL
+const screenshotSrc = (shot: ScreenshotRef | string, thumbnail = false) =>
+    typeof shot === "string" ? shot : blobUrl((thumbnail && shot.thumbnail) || shot.blob);
+
 export default function ScanResultsPage() {
 
     const params = useParams();
     const [results, setResults] = useState<ScanResult | null>(null);
     const [loading, setLoading] = useState(true);
 
-    const fetchResults = async () => {
-        try {
-            const res = await fetch(`http://localhost:8000/api/scan/${params.id}`);
-            if (res.ok) {
-                const data = await res.json();
-                setResults(data);
-                if (data.status === "completed" || data.status === "failed") {
-                    setLoading(false);
-                }
-            }
-        } catch (error) {
-            console.error(error);
-        }
-    };
+    const [stages, setStages] = useState<Record<string, StageState>>({});
 
     useEffect(() => {
-        fetchResults();
-        // Poll every 2 seconds if running
-        const interval = setInterval(() => {
-            if (results?.status !== "completed" && results?.status !== "failed") {
-                fetchResults();
+        // The server sends a snapshot first, then pushes updates as stages run
+        const source = new EventSource(`http://localhost:8000/api/scan/${params.id}/events`);
+        source.onmessage = (message) => {
+            const event: ScanEvent = JSON.parse(message.data);
+            switch (event.type) {
+                case "snapshot":
+                    setResults(event.scan);
+                    break;
+                case "partial":
+                    setResults((prev) => (prev ? { ...prev, ...event.fields } : prev));
+                    break;
+                case "status":
+                    setResults((prev) => (prev ? { ...prev, status: event.status } : prev));
+                    break;
+                case "stage_started":
+                    setStages((prev) => ({ ...prev, [event.stage]: "running" }));
+                    break;
+                case "stage_finished":
+                    setStages((prev) => ({ ...prev, [event.stage]: event.ok ? "done" : "failed" }));
+                    break;
+                case "stage_skipped":
+                    setStages((prev) => ({ ...prev, [event.stage]: "skipped" }));
+                    break;
             }
-        }, 2000);
-
-        return () => clearInterval(interval);
-    }, [results?.status]);
+            const status = event.type === "snapshot" ? event.scan.status : event.type === "status" ? event.status : null;
+            if (status === "completed" || status === "failed") {
+                // Done: close before the browser tries to reconnect
+                source.close();
+                setLoading(false);
+            }
+        };
+        return () => source.close();
+    }, [params.id]);
 
     if (!results && loading) return (
         <div className="flex flex-col items-center justify-center h-[50vh]">
@@ -82,6 +139,19 @@ export default function ScanResultsPage() {
                         <span className="text-sm">Scanned on {new Date(results?.timestamp || "").toLocaleString()}</span>
                         {results?.status === 'running' && <span className="text-blue-400 animate-pulse text-sm ml-2 font-medium">• Scanning in Progress...</span>}
                     </div>
+                    {Object.keys(stages).length > 0 && (
+                        <div className="flex flex-wrap gap-2 mt-3">
+                            {Object.entries(stages).map(([stage, state]) => (
+                                <Badge
+                                    key={stage}
+                                    variant={state === "failed" ? "destructive" : state === "done" ? "default" : "secondary"}
+                                    className={`capitalize ${state === "running" ? "animate-pulse" : ""}`}
+                                >
+                                    {stage}: {state}
+                                </Badge>
+                            ))}
+                        </div>
+                    )}
                 </div>
                 <div className="text-right">
                     <Button variant="outline" onClick={() => window.location.reload()}>Refresh Results</Button>
@@ -106,7 +176,7 @@ export default function ScanResultsPage() {
                         <Server className="h-4 w-4 text-muted-foreground" />
                     </CardHeader>
                     <CardContent>
-                        <div className="text-2xl font-bold">{results?.ports?.[0]?.ports.length || 0}</div>
+                        <div className="text-2xl font-bold">{results?.ports?.reduce((total, host) => total + host.ports.length, 0) || 0}</div>
                         <p className="text-xs text-muted-foreground">Active services</p>
                     </CardContent>
                 </Card>
@@ -140,11 +210,21 @@ export default function ScanResultsPage() {
                     </CardHeader>
                     <CardContent>
                         {results?.ports && results.ports.length > 0 ? (
-                            <div className="flex flex-wrap gap-2">
-                                {results.ports[0].ports.map((port: number) => (
-                                    <Badge key={port} variant="secondary" className="px-3 py-1 text-sm bg-green-950 text-green-400 hover:bg-green-900 border-green-900">
-                                        Port {port}
-                                    </Badge>
+                            <div className="space-y-4">
+                                {results.ports.map((host: PortResult) => (
+                                    <div key={host.ip}>
+                                        <p className="text-xs font-mono text-muted-foreground mb-2">{host.ip}</p>
+                                        <div className="flex flex-wrap gap-2">
+                                            {host.ports.map((port: number) => {
+                                                const svc = host.services?.[String(port)];
+                                                return (
+                                                    <Badge key={port} variant="secondary" title={host.banners?.[String(port)]} className="px-3 py-1 text-sm bg-green-950 text-green-400 hover:bg-green-900 border-green-900">
+                                                        Port {port}{svc?.product && ` • ${svc.product}${svc.version ? ` ${svc.version}` : ""}`}
+                                                    </Badge>
+                                                );
+                                            })}
+                                        </div>
+                                    </div>
                                 ))}
                             </div>
                         ) : (
@@ -174,6 +254,34 @@ export default function ScanResultsPage() {
                 </Card>
             </div>
 
+            {/* Changes since the previous scan (incremental scans) */}
+            {results?.diff && (
+                <Card>
+                    <CardHeader>
+                        <CardTitle>Changes Since Last Scan</CardTitle>
+                        <CardDescription>
+                            Compared with <a href={`/scan/${results.baseline_id}`} className="text-blue-500 hover:underline">the previous scan</a> of this domain.
+                        </CardDescription>
+                    </CardHeader>
+                    <CardContent>
+                        <div className="grid grid-cols-1 md:grid-cols-2 gap-4 text-sm">
+                            {Object.entries(results.diff).map(([field, change]) => (
+                                <div key={field}>
+                                    <h3 className="font-semibold capitalize mb-1">{field}</h3>
+                                    {change.added.length === 0 && change.removed.length === 0 && (
+                                        <p className="text-muted-foreground">No changes.</p>
+                                    )}
+                                    <ul className="space-y-1 font-mono text-xs">
+                                        {change.added.map((item) => <li key={`+${item}`} className="text-green-500">+ {item}</li>)}
+                                        {change.removed.map((item) => <li key={`-${item}`} className="text-red-500">- {item}</li>)}
+                                    </ul>
+                                </div>
+                            ))}
+                        </div>
+                    </CardContent>
+                </Card>
+            )}
+
             {/* Visual Recon Gallery */}
             {results?.screenshots && Object.keys(results.screenshots).length > 0 && (
                 <Card>
@@ -183,15 +291,16 @@ export default function ScanResultsPage() {
                     </CardHeader>
                     <CardContent>
                         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                            {Object.entries(results.screenshots).map(([domain, b64]: [string, any]) => (
+                            {Object.entries(results.screenshots).map(([domain, shot]) => (
                                 <div key={domain} className="group relative border rounded-lg overflow-hidden bg-background">
-                                    <div className="aspect-video w-full bg-muted relative">
+                                    <a href={screenshotSrc(shot)} target="_blank" className="block aspect-video w-full bg-muted relative">
                                         <img
-                                            src={b64}
+                                            src={screenshotSrc(shot, true)}
                                             alt={`Screenshot of ${domain}`}
+                                            loading="lazy"
                                             className="object-cover w-full h-full transition-transform group-hover:scale-105"
                                         />
-                                    </div>
+                                    </a>
                                     <div className="p-3 border-t">
                                         <h3 className="font-semibold text-sm truncate">{domain}</h3>
                                         <a href={`http://${domain}`} target="_blank" className="text-xs text-blue-500 hover:underline flex items-center mt-1">
@@ -236,15 +345,33 @@ export default function ScanResultsPage() {
                     </CardHeader>
                     <CardContent>
                         <div className="space-y-4">
-                            {results.vulnerabilities.map((vuln: string, i: number) => (
+                            {results.vulnerabilities.map((vuln, i) => (
                                 <div key={i} className="flex items-start p-3 bg-red-950/20 rounded-md border border-red-900/30">
                                     <AlertTriangle className="w-5 h-5 text-red-500 mr-3 mt-0.5" />
-                                    <div>
-                                        <p className="font-medium text-red-100">{vuln}</p>
-                                        <p className="text-sm text-red-300/80 mt-1">
-                                            Check version against NVD or run targeted exploit check.
-                                        </p>
-                                    </div>
+                                    {typeof vuln === "string" ? (
+                                        <div>
+                                            <p className="font-medium text-red-100">{vuln}</p>
+                                            <p className="text-sm text-red-300/80 mt-1">
+                                                Check version against NVD or run targeted exploit check.
+                                            </p>
+                                        </div>
+                                    ) : (
+                                        <div>
+                                            <p className="font-medium text-red-100">
+                                                <a href={`https://nvd.nist.gov/vuln/detail/${vuln.id}`} target="_blank" rel="noreferrer" className="hover:underline">
+                                                    {vuln.id}
+                                                </a>
+                                                {" "}&middot; {vuln.product} {vuln.version}
+                                                {vuln.severity && (
+                                                    <Badge variant="outline" className="ml-2 border-red-800 text-red-300">
+                                                        {vuln.severity}{vuln.score != null ? ` ${vuln.score}` : ""}
+                                                    </Badge>
+                                                )}
+                                            </p>
+                                            <p className="text-sm text-red-300/80 mt-1">{vuln.summary}</p>
+                                            <p className="text-xs text-muted-foreground mt-1 font-mono">{vuln.targets.join(", ")}</p>
+                                        </div>
+                                    )}
                                 </div>
                             ))}
                         </div>
@@ -8,36 +8,58 @@ import { Button } from "@/components/ui/button";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Loader2, ArrowRight, Calendar, ExternalLink } from "lucide-react";
 
-interface ScanResult {
+interface ScanSummary {
     id: string;
     domain: string;
     status: string;
     timestamp: string;
-    subdomains: any;
-    ports: any;
-    technologies: any;
+    subdomain_count: number;
+    port_count: number;
+    technology_count: number;
 }
 
+interface ScanPage {
+    items: ScanSummary[];
+    next_cursor: string | null;
+}
+
+const PAGE_SIZE = 25;
+
 export default function HistoryPage() {
-    const [scans, setScans] = useState<ScanResult[]>([]);
+    const [scans, setScans] = useState<ScanSummary[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [domain, setDomain] = useState("");
+    const [status, setStatus] = useState("");
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
 
-    useEffect(() => {
-        const fetchHistory = async () => {
-            try {
-                const res = await fetch("http://localhost:8000/api/scans");
-                if (res.ok) {
-                    const data = await res.json();
-                    setScans(data);
-                }
-            } catch (err) {
-                console.error(err);
-            } finally {
-                setLoading(false);
+    const fetchPage = async (cursor: string | null) => {
+        const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+        if (cursor) params.set("cursor", cursor);
+        if (domain) params.set("domain", domain);
+        if (status) params.set("status", status);
+        try {
+            const res = await fetch(`http://localhost:8000/api/scans?${params}`);
+            if (res.ok) {
+                const data: ScanPage = await res.json();
+                setScans((prev) => (cursor ? [...prev, ...data.items] : data.items));
+                setNextCursor(data.next_cursor);
             }
-        };
-        fetchHistory();
-    }, []);
+        } catch (err) {
+            console.error(err);
+        }
+    };
+
+    useEffect(() => {
+        setLoading(true);
+        fetchPage(null).finally(() => setLoading(false));
+    }, [domain, status]);
+
+    const loadMore = async () => {
+        setLoadingMore(true);
+        await fetchPage(nextCursor);
+        setLoadingMore(false);
+    };
 
     if (loading) return (
         <div className="flex flex-col items-center justify-center h-[50vh]">
@@ -61,9 +83,30 @@ export default function HistoryPage() {
             </div>
 
             <Card>
-                <CardHeader>
-                    <CardTitle>Recent Scans</CardTitle>
-                    <CardDescription>A list of all requested domain scans.</CardDescription>
+                <CardHeader className="flex flex-row items-start justify-between space-y-0">
+                    <div>
+                        <CardTitle>Recent Scans</CardTitle>
+                        <CardDescription>A list of all requested domain scans.</CardDescription>
+                    </div>
+                    <div className="flex space-x-2">
+                        <input
+                            placeholder="Filter by domain"
+                            defaultValue={domain}
+                            onKeyDown={(e) => e.key === "Enter" && setDomain(e.currentTarget.value.trim())}
+                            className="h-9 rounded-md border bg-background px-3 text-sm"
+                        />
+                        <select
+                            value={status}
+                            onChange={(e) => setStatus(e.target.value)}
+                            className="h-9 rounded-md border bg-background px-2 text-sm"
+                        >
+                            <option value="">All statuses</option>
+                            <option value="pending">Pending</option>
+                            <option value="running">Running</option>
+                            <option value="completed">Completed</option>
+                            <option value="failed">Failed</option>
+                        </select>
+                    </div>
                 </CardHeader>
                 <CardContent>
                     {scans.length === 0 ? (
@@ -98,9 +141,9 @@ export default function HistoryPage() {
                                         </TableCell>
                                         <TableCell>
                                             <div className="flex space-x-2 text-xs text-muted-foreground">
-                                                {scan.subdomains?.count > 0 && <span>{scan.subdomains.count} Subs</span>}
-                                                {scan.ports?.length > 0 && <span>• {scan.ports[0].ports.length} Ports</span>}
-                                                {scan.technologies?.length > 0 && <span>• {scan.technologies.length} Techs</span>}
+                                                {scan.subdomain_count > 0 && <span>{scan.subdomain_count} Subs</span>}
+                                                {scan.port_count > 0 && <span>• {scan.port_count} Ports</span>}
+                                                {scan.technology_count > 0 && <span>• {scan.technology_count} Techs</span>}
                                             </div>
                                         </TableCell>
                                         <TableCell className="text-right">
@@ -115,6 +158,14 @@ export default function HistoryPage() {
                             </TableBody>
                         </Table>
                     )}
+                    {nextCursor && (
+                        <div className="flex justify-center pt-4">
+                            <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                                {loadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                                Load more
+                            </Button>
+                        </div>
+                    )}
                 </CardContent>
             </Card>
         </div>
@@ -8,6 +8,7 @@ import { Search, Loader2 } from "lucide-react";
 
 export function ScanForm() {
     const [domain, setDomain] = useState("");
+    const [incremental, setIncremental] = useState(false);
     const [loading, setLoading] = useState(false);
     const router = useRouter();
 
@@ -21,7 +22,7 @@ export function ScanForm() {
                 headers: {
                     "Content-Type": "application/json",
                 },
-                body: JSON.stringify({ domain, scan_types: ["all"] }),
+                body: JSON.stringify({ domain, scan_types: ["all"], incremental }),
             });
 
             if (!res.ok) {
@@ -45,24 +46,30 @@ export function ScanForm() {
     };
 
     return (
-        <div className="flex w-full max-w-lg items-center space-x-2 pt-6">
-            <Input
-                type="text"
-                placeholder="Enter target domain (e.g. google.com)"
-                className="h-12 text-lg shadow-sm"
-                value={domain}
-                onChange={(e) => setDomain(e.target.value)}
-                onKeyDown={(e) => e.key === "Enter" && handleScan()}
-            />
-            <Button
-                size="lg"
-                className="h-12 px-8 font-semibold shadow-md transition-all hover:scale-105"
-                onClick={handleScan}
-                disabled={loading}
-            >
-                {loading ? <Loader2 className="mr-2 h-5 w-5 animate-spin" /> : <Search className="mr-2 h-5 w-5" />}
-                {loading ? "Scanning..." : "Start Scan"}
-            </Button>
+        <div className="flex w-full max-w-lg flex-col items-center space-y-3 pt-6">
+            <div className="flex w-full items-center space-x-2">
+                <Input
+                    type="text"
+                    placeholder="Enter target domain (e.g. google.com)"
+                    className="h-12 text-lg shadow-sm"
+                    value={domain}
+                    onChange={(e) => setDomain(e.target.value)}
+                    onKeyDown={(e) => e.key === "Enter" && handleScan()}
+                />
+                <Button
+                    size="lg"
+                    className="h-12 px-8 font-semibold shadow-md transition-all hover:scale-105"
+                    onClick={handleScan}
+                    disabled={loading}
+                >
+                    {loading ? <Loader2 className="mr-2 h-5 w-5 animate-spin" /> : <Search className="mr-2 h-5 w-5" />}
+                    {loading ? "Scanning..." : "Start Scan"}
+                </Button>
+            </div>
+            <label className="flex items-center space-x-2 text-sm text-muted-foreground">
+                <input type="checkbox" checked={incremental} onChange={(e) => setIncremental(e.target.checked)} />
+                <span>Incremental: only re-check what changed since the last scan of this domain</span>
+            </label>
         </div>
     );
 }